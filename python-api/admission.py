@@ -0,0 +1,194 @@
+"""
+Control de admisión con colas acotadas y dos carriles de prioridad.
+
+Cada imagen que llega al modelo ocupa un lugar de ``capacity`` (lo que puede
+estar en decodificación, forward o post-procesamiento a la vez). Cuando no
+hay lugar espera en la cola de su carril:
+
+- ``interactive``: subidas individuales desde la app (``UploadScreen``).
+- ``bulk``: ``/predict/batch`` y clasificación en segundo plano.
+
+Las colas tienen un máximo de imágenes en espera; si está llena la petición
+se rechaza de inmediato (``AdmissionRejected`` → 503 con ``Retry-After``) en
+vez de acumular latencia hasta que el cliente corte. Al liberarse un lugar
+siempre pasa primero ``interactive``, y ``bulk`` nunca ocupa los ``reserved``
+lugares reservados: una ráfaga de lotes no deja esperando a quien sube una
+foto desde la app.
+"""
+
+import asyncio
+import math
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Deque, Dict, Tuple
+
+LANES = ("interactive", "bulk")
+
+
+class AdmissionRejected(Exception):
+    """Cola del carril llena: reintentar después de ``retry_after`` segundos"""
+
+    def __init__(self, lane: str, retry_after: int):
+        super().__init__(f"Servidor saturado (cola {lane} llena), reintentar en {retry_after}s")
+        self.lane = lane
+        self.retry_after = retry_after
+
+
+class LaneStats:
+    def __init__(self):
+        self.admitted = 0
+        self.rejected = 0
+        self.wait_sum = 0.0
+        self.wait_max = 0.0
+
+    def snapshot(self) -> Dict:
+        return {
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "avg_wait_ms": round(1000 * self.wait_sum / self.admitted, 3) if self.admitted else 0.0,
+            "max_wait_ms": round(1000 * self.wait_max, 3),
+        }
+
+
+class AdmissionController:
+    """Semáforo con prioridad estricta para ``interactive`` y colas acotadas por carril"""
+
+    def __init__(self, capacity: int, queue_depth: int = 32, bulk_queue_depth: int = 128, reserved: int = -1):
+        self.capacity = max(1, capacity)
+        # Por defecto un cuarto de la capacidad queda solo para interactive
+        self.reserved = max(1, self.capacity // 4) if reserved < 0 and self.capacity > 1 else max(0, reserved)
+        self.reserved = min(self.reserved, self.capacity - 1)
+        self.queue_limits = {"interactive": max(0, queue_depth), "bulk": max(0, bulk_queue_depth)}
+        self.stats = {lane: LaneStats() for lane in LANES}
+        self._in_service = {lane: 0 for lane in LANES}
+        self._waiting: Dict[str, Deque[Tuple[int, asyncio.Future]]] = {lane: deque() for lane in LANES}
+        self._service_time = 0.0  # media móvil de lo que dura cada lugar ocupado
+
+    # ------------------------------------------------------------ lectura
+
+    def queue_depth(self, lane: str) -> int:
+        """Imágenes esperando en la cola del carril"""
+        return sum(weight for weight, _ in self._waiting[lane])
+
+    def in_service(self, lane: str) -> int:
+        return self._in_service[lane]
+
+    def retry_after(self, lane: str) -> int:
+        """Segundos estimados hasta que se vacíe lo que hay delante"""
+        ahead = sum(self._in_service.values()) + self.queue_depth("interactive")
+        if lane == "bulk":
+            ahead += self.queue_depth("bulk")
+        seconds = ahead / self.capacity * (self._service_time or 1.0)
+        return int(min(60, max(1, math.ceil(seconds))))
+
+    def snapshot(self) -> Dict:
+        return {
+            "capacity": self.capacity,
+            "reserved_interactive": self.reserved,
+            "lanes": {
+                lane: {
+                    "in_service": self._in_service[lane],
+                    "queue_depth": self.queue_depth(lane),
+                    "queue_limit": self.queue_limits[lane],
+                    **self.stats[lane].snapshot(),
+                }
+                for lane in LANES
+            },
+            "avg_service_ms": round(1000 * self._service_time, 3),
+        }
+
+    # ------------------------------------------------------------ admisión
+
+    def lane_limit(self, lane: str) -> int:
+        """Lugares que puede ocupar el carril (bulk nunca toma los reservados): el peso máximo de un ``acquire``"""
+        return self.capacity if lane == "interactive" else self.capacity - self.reserved
+
+    def max_request(self, lane: str) -> int:
+        """Imágenes que puede traer una petición: más no caben nunca en la cola ni en servicio"""
+        return max(self.queue_limits[lane], self.lane_limit(lane))
+
+    def _fits(self, lane: str, weight: int) -> bool:
+        if sum(self._in_service.values()) + weight > self.capacity:
+            return False
+        return lane == "interactive" or self._in_service["bulk"] + weight <= self.lane_limit("bulk")
+
+    def _dispatch(self):
+        """Despertar a los que esperan: primero interactive; bulk solo sin interactive en cola"""
+        for lane in LANES:
+            waiting = self._waiting[lane]
+            while waiting:
+                weight, future = waiting[0]
+                if future.cancelled():
+                    waiting.popleft()
+                    continue
+                if not self._fits(lane, weight):
+                    break
+                waiting.popleft()
+                self._in_service[lane] += weight
+                future.set_result(None)
+            if waiting:
+                return  # interactive en espera: bulk no pasa delante
+
+    def check(self, lane: str, weight: int = 1):
+        """Rechazar ya si ``weight`` imágenes no caben en la cola del carril"""
+        if self.queue_depth(lane) + weight > self.queue_limits[lane] and not self._fits(lane, weight):
+            self.stats[lane].rejected += weight
+            raise AdmissionRejected(lane, self.retry_after(lane))
+
+    async def acquire(self, lane: str, weight: int = 1, bounded: bool = True):
+        """Esperar lugar para ``weight`` imágenes; ``bounded=False`` si la petición ya fue admitida.
+
+        Un peso mayor que ``lane_limit(lane)`` es un error: achicarlo en silencio
+        dejaría en curso más imágenes de las que registra el controlador.
+        """
+        if lane not in LANES:
+            raise ValueError(f"Carril desconocido: {lane} (opciones: {', '.join(LANES)})")
+        if weight > self.lane_limit(lane):
+            raise ValueError(f"{weight} imágenes no caben en el carril {lane} (máximo {self.lane_limit(lane)})")
+        weight = max(1, weight)
+        started = time.perf_counter()
+        stats = self.stats[lane]
+
+        if not self._waiting["interactive"] and not self._waiting[lane] and self._fits(lane, weight):
+            self._in_service[lane] += weight
+        else:
+            if bounded:
+                self.check(lane, weight)
+            future = asyncio.get_running_loop().create_future()
+            self._waiting[lane].append((weight, future))
+            try:
+                await future
+            except asyncio.CancelledError:
+                if future.done() and not future.cancelled():
+                    # Se otorgó justo antes de cancelar: devolver el lugar
+                    self._release(lane, weight, 0.0)
+                else:
+                    try:
+                        self._waiting[lane].remove((weight, future))
+                    except ValueError:
+                        pass
+                    self._dispatch()
+                raise
+
+        waited = time.perf_counter() - started
+        stats.admitted += weight
+        stats.wait_sum += waited * weight
+        stats.wait_max = max(stats.wait_max, waited)
+        return weight
+
+    def _release(self, lane: str, weight: int, held: float):
+        self._in_service[lane] -= weight
+        if held > 0:
+            self._service_time = held if not self._service_time else 0.9 * self._service_time + 0.1 * held
+        self._dispatch()
+
+    @asynccontextmanager
+    async def slot(self, lane: str, weight: int = 1, bounded: bool = True):
+        """``async with admission.slot("interactive"):`` alrededor del cálculo"""
+        weight = await self.acquire(lane, weight, bounded)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._release(lane, weight, (time.perf_counter() - started) / weight)
@@ -0,0 +1,302 @@
+"""
+Backends de inferencia intercambiables para CustomClothingModel.
+
+Todos exponen la misma interfaz que el modelo eager: se llaman con un tensor
+``pixel_values`` [B, 3, 224, 224] y devuelven un dict con
+``category_logits``, ``climate_logits`` y ``embedding`` (el ``pooler_output``
+de 768 del backbone, para ``/similar``). Los artefactos exportados antes de
+agregar ``embedding`` siguen funcionando, pero sin esa salida.
+
+- ``eager``: el nn.Module de PyTorch tal cual.
+- ``torchscript``: módulo trazado con torch.jit (se carga desde un artefacto .pt).
+- ``compile``: ``torch.compile`` sobre el modelo eager.
+- ``onnx``: ONNX Runtime en CPU con todas las optimizaciones de grafo.
+
+Los artefactos se generan con ``python export_model.py``, que guarda en ellos
+la versión del checkpoint y la cantidad de clases y climas. Al cargarlos se
+comparan con el checkpoint actual: si no coinciden (artefacto de un
+checkpoint anterior) se usa el backend eager y se avisa que hay que
+regenerarlo.
+
+Los backends ``eager`` y ``compile`` aceptan además una precisión reducida:
+
+- ``int8``: cuantización dinámica de las capas lineales del backbone (pesos
+  en int8, activaciones cuantizadas al vuelo). Las cabezas quedan en fp32.
+- ``bf16``: todo el modelo en bfloat16; solo conviene en CPUs con soporte
+  nativo (AVX512-BF16 / AMX).
+
+Antes de activarlas hay que medir la concordancia con fp32 usando
+``python -m benchmarks.eval_precision``.
+"""
+
+import inspect
+import json
+import logging
+import os
+import time
+from typing import Callable, Dict, Optional
+
+import torch
+import torch.nn as nn
+
+logger = logging.getLogger(__name__)
+
+BACKENDS = ("eager", "torchscript", "compile", "onnx")
+PRECISIONS = ("fp32", "int8", "bf16")
+OUTPUT_NAMES = ("category_logits", "climate_logits", "embedding")
+METADATA_FILE = "metadata.json"  # archivo extra del artefacto TorchScript con los metadatos
+
+
+class TupleOutput(nn.Module):
+    """Adaptador que devuelve una tupla en lugar de un dict (requerido para trazar/exportar)"""
+
+    def __init__(self, model: nn.Module):
+        super().__init__()
+        self.model = model
+
+    def forward(self, pixel_values):
+        outputs = self.model(pixel_values)
+        return tuple(outputs[name] for name in OUTPUT_NAMES)
+
+
+def example_input(batch_size: int = 2) -> torch.Tensor:
+    return torch.randn(batch_size, 3, 224, 224)
+
+
+def bf16_supported() -> bool:
+    """True si la CPU tiene instrucciones nativas de bfloat16"""
+    try:
+        return bool(torch.ops.mkldnn._is_mkldnn_bf16_supported())
+    except (AttributeError, RuntimeError):
+        return False
+
+
+def apply_precision(model: nn.Module, precision: str) -> nn.Module:
+    """Convertir el modelo eager a la precisión pedida (fp32 lo deja igual)"""
+    if precision not in PRECISIONS:
+        raise ValueError(f"Precisión desconocida: {precision} (opciones: {', '.join(PRECISIONS)})")
+
+    if precision == "int8":
+        from torch.ao.quantization import quantize_dynamic
+
+        # Solo el backbone: ahí están casi todos los parámetros y el tiempo de CPU
+        model.backbone = quantize_dynamic(model.backbone, {nn.Linear}, dtype=torch.qint8)
+    elif precision == "bf16":
+        if not bf16_supported():
+            logger.warning("⚠️ Esta CPU no tiene bfloat16 nativo: el modo bf16 será más lento que fp32")
+        model = model.to(torch.bfloat16)
+    return model.eval()
+
+
+def _cast_outputs(outputs: Dict[str, torch.Tensor]) -> Dict[str, torch.Tensor]:
+    # El post-procesamiento (softmax, topk, JSON) siempre trabaja en fp32
+    return {name: value.float() for name, value in outputs.items()}
+
+
+class EagerBackend:
+    name = "eager"
+
+    def __init__(self, model: nn.Module, dtype: torch.dtype = torch.float32):
+        self.model = model.eval()
+        self.dtype = dtype
+
+    def __call__(self, pixel_values: torch.Tensor) -> Dict[str, torch.Tensor]:
+        with torch.no_grad():
+            if self.dtype == torch.float32:
+                return self.model(pixel_values)
+            return _cast_outputs(self.model(pixel_values.to(self.dtype)))
+
+
+class TorchScriptBackend:
+    name = "torchscript"
+
+    def __init__(self, module: torch.jit.ScriptModule, metadata: Optional[Dict[str, str]] = None):
+        self.metadata = metadata or {}
+        # freeze pliega los pesos como constantes y permite fusiones al optimizar
+        self.module = torch.jit.optimize_for_inference(torch.jit.freeze(module.eval()))
+
+    @classmethod
+    def load(cls, path: str) -> "TorchScriptBackend":
+        extra_files = {METADATA_FILE: ""}
+        module = torch.jit.load(path, map_location="cpu", _extra_files=extra_files)
+        # Los artefactos exportados antes de guardar metadatos no traen el archivo
+        return cls(module, json.loads(extra_files[METADATA_FILE] or "{}"))
+
+    def __call__(self, pixel_values: torch.Tensor) -> Dict[str, torch.Tensor]:
+        with torch.no_grad():
+            return dict(zip(OUTPUT_NAMES, self.module(pixel_values)))
+
+
+class CompiledBackend(EagerBackend):
+    name = "compile"
+
+    def __init__(self, model: nn.Module, dtype: torch.dtype = torch.float32):
+        super().__init__(torch.compile(model.eval()), dtype=dtype)
+
+
+class OnnxBackend:
+    name = "onnx"
+
+    def __init__(self, path: str, threads: int = 0):
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads > 0:
+            options.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(path, sess_options=options, providers=["CPUExecutionProvider"])
+        # Los artefactos anteriores a ``embedding`` solo tienen los logits
+        available = {output.name for output in self.session.get_outputs()}
+        self.output_names = [name for name in OUTPUT_NAMES if name in available]
+        self.metadata = dict(self.session.get_modelmeta().custom_metadata_map)
+        # Ancho fijo de las salidas de logits (el batch es dinámico)
+        self.widths = {output.name: output.shape[1] for output in self.session.get_outputs()
+                       if len(output.shape) == 2 and isinstance(output.shape[1], int)}
+
+    def __call__(self, pixel_values: torch.Tensor) -> Dict[str, torch.Tensor]:
+        outputs = self.session.run(self.output_names, {"pixel_values": pixel_values.detach().cpu().numpy()})
+        return {name: torch.from_numpy(value) for name, value in zip(self.output_names, outputs)}
+
+
+def export_torchscript(model: nn.Module, path: str, metadata: Optional[Dict[str, str]] = None):
+    """Trazar el modelo y guardarlo como artefacto TorchScript (metadatos en ``metadata.json``)"""
+    with torch.no_grad():
+        traced = torch.jit.trace(TupleOutput(model.eval()), example_input(), strict=False)
+    traced.save(path, _extra_files={METADATA_FILE: json.dumps(metadata or {})})
+
+
+def export_onnx(model: nn.Module, path: str, opset: int = 17, metadata: Optional[Dict[str, str]] = None):
+    """Exportar el modelo a ONNX con el batch como eje dinámico (metadatos en ``metadata_props``)"""
+    kwargs = {}
+    # A partir de torch 2.9 el exportador por defecto es el de torch.export; el de
+    # TorchScript sigue siendo el más robusto para el ViT de transformers
+    if "dynamo" in inspect.signature(torch.onnx.export).parameters:
+        kwargs["dynamo"] = False
+    dynamic_axes = {name: {0: "batch"} for name in ("pixel_values",) + OUTPUT_NAMES}
+    with torch.no_grad():
+        torch.onnx.export(
+            TupleOutput(model.eval()),
+            (example_input(),),
+            path,
+            input_names=["pixel_values"],
+            output_names=list(OUTPUT_NAMES),
+            dynamic_axes=dynamic_axes,
+            opset_version=opset,
+            **kwargs
+        )
+    if metadata:
+        import onnx
+
+        exported = onnx.load(path)
+        onnx.helper.set_model_props(exported, {key: str(value) for key, value in metadata.items()})
+        onnx.save(exported, path)
+
+
+EXPORTERS = {
+    "torchscript": export_torchscript,
+    "onnx": export_onnx,
+}
+
+
+ARTIFACT_SUFFIXES = {
+    "onnx": ".onnx",
+    "torchscript": ".ts.pt",
+    "safetensors": ".safetensors",
+}
+
+
+def default_artifact_path(checkpoint_path: str, backend: str) -> str:
+    """Ruta del artefacto junto al checkpoint: vit_clothes_prediction.onnx / .ts.pt / .safetensors"""
+    root, _ = os.path.splitext(checkpoint_path)
+    return root + ARTIFACT_SUFFIXES.get(backend, ".ts.pt")
+
+
+def artifact_metadata(version: str, num_classes: int, num_climates: int) -> Dict[str, str]:
+    """Metadatos que export_model.py guarda en los artefactos ONNX y TorchScript"""
+    return {"version": version, "num_classes": str(num_classes), "num_climates": str(num_climates)}
+
+
+def artifact_mismatch(backend, expected: Dict[str, str]) -> Optional[str]:
+    """Motivo por el que un artefacto no corresponde al checkpoint esperado, o None"""
+    metadata = backend.metadata
+    widths = getattr(backend, "widths", {})  # solo ONNX conoce el ancho sin correr el modelo
+    for key, output in (("num_classes", "category_logits"), ("num_climates", "climate_logits")):
+        # El ancho real de la salida (ONNX) o el registrado al exportar
+        width = widths.get(output) or (int(metadata[key]) if metadata.get(key) else None)
+        if width is not None and width != int(expected[key]):
+            return f"{output} tiene {width} salidas y el checkpoint {expected[key]}"
+    if metadata.get("version") and metadata["version"] != expected["version"]:
+        return f"exportado del checkpoint {metadata['version']} y el actual es {expected['version']}"
+    return None
+
+
+def create_backend(kind: str, build_model: Callable[[], nn.Module],
+                   artifact_path: Optional[str] = None, onnx_threads: int = 0,
+                   precision: str = "fp32", expected: Optional[Dict[str, str]] = None):
+    """Crear el backend pedido; ``build_model`` construye el modelo eager solo si hace falta.
+
+    Con ``expected`` (``artifact_metadata`` del checkpoint cargado) se verifica
+    que el artefacto ONNX o TorchScript venga de ese checkpoint; si no, se usa
+    el backend eager.
+    """
+    if kind not in BACKENDS:
+        raise ValueError(f"Backend desconocido: {kind} (opciones: {', '.join(BACKENDS)})")
+    if precision not in PRECISIONS:
+        raise ValueError(f"Precisión desconocida: {precision} (opciones: {', '.join(PRECISIONS)})")
+    if precision != "fp32" and kind not in ("eager", "compile"):
+        raise ValueError(f"La precisión {precision} solo está disponible con los backends eager y compile")
+
+    started = time.perf_counter()
+    dtype = torch.bfloat16 if precision == "bf16" else torch.float32
+    if kind == "eager":
+        backend = EagerBackend(apply_precision(build_model(), precision), dtype=dtype)
+    elif kind == "compile":
+        backend = CompiledBackend(apply_precision(build_model(), precision), dtype=dtype)
+    else:
+        if not artifact_path or not os.path.exists(artifact_path):
+            raise FileNotFoundError(
+                f"No se encuentra el artefacto {kind} en {artifact_path}. "
+                f"Genéralo con: python export_model.py --format {kind}"
+            )
+        backend = TorchScriptBackend.load(artifact_path) if kind == "torchscript" \
+            else OnnxBackend(artifact_path, threads=onnx_threads)
+        if expected and not backend.metadata.get("version"):
+            logger.warning(f"⚠️ {artifact_path} no registra la versión del checkpoint (exportado antes de guardarla): "
+                           f"no se puede verificar que esté al día")
+        problem = artifact_mismatch(backend, expected) if expected else None
+        if problem:
+            logger.warning(f"⚠️ {artifact_path} no corresponde al checkpoint ({problem}); se usa el backend eager. "
+                           f"Regenéralo con: python export_model.py --format {kind}")
+            kind, backend = "eager", EagerBackend(build_model())
+
+    logger.info(f"⚙️ Backend de inferencia: {kind}/{precision} ({time.perf_counter() - started:.2f}s)")
+    return backend
+
+
+def parity_check(reference, candidate, batches: int = 3, batch_size: int = 4, seed: int = 0) -> Dict[str, float]:
+    """Comparar logits, top-1 y embedding de un backend contra la referencia eager"""
+    generator = torch.Generator().manual_seed(seed)
+    max_diff = {name: 0.0 for name in OUTPUT_NAMES}
+    agree = {name: 0 for name in OUTPUT_NAMES}
+    total = 0
+    for _ in range(batches):
+        pixel_values = torch.randn(batch_size, 3, 224, 224, generator=generator)
+        expected = reference(pixel_values)
+        actual = candidate(pixel_values)
+        for name in OUTPUT_NAMES:
+            if name not in actual:
+                continue
+            diff = (expected[name].float() - actual[name].float()).abs().max().item()
+            max_diff[name] = max(max_diff[name], diff)
+            agree[name] += int((expected[name].argmax(-1) == actual[name].argmax(-1)).sum())
+        total += batch_size
+
+    report = {
+        "category_max_abs_diff": max_diff["category_logits"],
+        "climate_max_abs_diff": max_diff["climate_logits"],
+        "category_top1_agreement": agree["category_logits"] / total,
+        "climate_top1_agreement": agree["climate_logits"] / total,
+    }
+    if "embedding" in actual:
+        report["embedding_max_abs_diff"] = max_diff["embedding"]
+    return report
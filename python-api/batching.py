@@ -0,0 +1,194 @@
+"""
+Micro-batching dinámico para el modelo de clasificación.
+
+Las peticiones concurrentes a /predict se encolan y se agrupan hasta
+``max_batch_size`` imágenes o ``max_wait_ms`` milisegundos, lo que ocurra
+primero. Cada grupo pasa por el backbone en un único forward y cada
+llamador recibe su propia porción de los logits.
+"""
+
+import asyncio
+import logging
+import time
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+
+import torch
+
+logger = logging.getLogger(__name__)
+
+ForwardFn = Callable[[torch.Tensor], Dict[str, torch.Tensor]]
+
+
+def percentile(values, q: float) -> float:
+    """Percentil simple (q entre 0 y 100) sin depender de numpy"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(q / 100 * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+class BatchStats:
+    """Métricas de tamaño de batch y tiempo de espera en cola"""
+
+    def __init__(self, window: int = 1000):
+        self.batch_sizes = Counter()
+        self.batches = 0
+        self.items = 0
+        self.queue_delay_count = 0
+        self.queue_delay_sum = 0.0
+        self.queue_delay_max = 0.0
+        self.forward_time_sum = 0.0
+        self.recent_delays = deque(maxlen=window)
+
+    def record(self, size: int, delays: List[float], forward_time: float):
+        self.batch_sizes[size] += 1
+        self.batches += 1
+        self.items += size
+        self.forward_time_sum += forward_time
+        for delay in delays:
+            self.queue_delay_count += 1
+            self.queue_delay_sum += delay
+            self.queue_delay_max = max(self.queue_delay_max, delay)
+            self.recent_delays.append(delay)
+
+    def snapshot(self) -> Dict:
+        delays = list(self.recent_delays)
+        return {
+            "batches": self.batches,
+            "items": self.items,
+            "avg_batch_size": round(self.items / self.batches, 3) if self.batches else 0.0,
+            "largest_batch": max(self.batch_sizes) if self.batch_sizes else 0,
+            "batch_size_counts": {str(size): count for size, count in sorted(self.batch_sizes.items())},
+            "queue_delay_ms": {
+                "avg": round(1000 * self.queue_delay_sum / self.queue_delay_count, 3) if self.queue_delay_count else 0.0,
+                "p50": round(1000 * percentile(delays, 50), 3),
+                "p99": round(1000 * percentile(delays, 99), 3),
+                "max": round(1000 * self.queue_delay_max, 3),
+            },
+            "avg_forward_ms": round(1000 * self.forward_time_sum / self.batches, 3) if self.batches else 0.0,
+        }
+
+
+class MicroBatcher:
+    """Agrupa tensores de entrada y ejecuta el modelo una vez por grupo"""
+
+    def __init__(self, forward_fn: ForwardFn, max_batch_size: int = 16, max_wait_ms: float = 10.0):
+        self.forward_fn = forward_fn
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self.stats = BatchStats()
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        # Entrada que no cupo en el batch anterior: abre el siguiente
+        self._pending: Optional[Tuple[torch.Tensor, asyncio.Future, float]] = None
+        # Un único hilo: los forwards se serializan pero no bloquean el event loop
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="micro-batch")
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    @property
+    def queue_depth(self) -> int:
+        """Peticiones encoladas que aún no entran a un batch"""
+        depth = self._queue.qsize() if self._queue is not None else 0
+        return depth + (self._pending is not None)
+
+    async def start(self):
+        if self.running:
+            return
+        self._queue = asyncio.Queue()
+        self._task = asyncio.create_task(self._run())
+        logger.info(f"📦 Micro-batching activo (máx {self.max_batch_size} imágenes / {self.max_wait * 1000:.1f} ms)")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        # Liberar a quien siga esperando en la cola
+        waiting = [self._pending] if self._pending is not None else []
+        self._pending = None
+        while self._queue is not None and not self._queue.empty():
+            waiting.append(self._queue.get_nowait())
+        for _, future, _ in waiting:
+            if not future.done():
+                future.set_exception(RuntimeError("Micro-batcher detenido"))
+        self._executor.shutdown(wait=False)
+
+    async def submit(self, pixel_values: torch.Tensor) -> Dict[str, torch.Tensor]:
+        """Encolar un tensor [B, C, H, W] y esperar sus logits [B, N]"""
+        if not self.running:
+            raise RuntimeError("Micro-batcher no iniciado")
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((pixel_values, future, time.perf_counter()))
+        return await future
+
+    async def _collect(self) -> List[Tuple[torch.Tensor, asyncio.Future, float]]:
+        """Juntar entradas hasta ``max_batch_size`` imágenes sin pasarse.
+
+        Una entrada de varias imágenes que no cabe queda pendiente y abre el
+        batch siguiente; si sola ya supera el máximo, va sola (no se parte).
+        """
+        if self._pending is not None:
+            first, self._pending = self._pending, None
+        else:
+            first = await self._queue.get()
+        batch = [first]
+        size = first[0].shape[0]
+        deadline = first[2] + self.max_wait
+        while size < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                # Tomar lo que ya esté encolado sin esperar más
+                if self._queue.empty():
+                    break
+                item = self._queue.get_nowait()
+            else:
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout=remaining)
+                except asyncio.TimeoutError:
+                    break
+            if size + item[0].shape[0] > self.max_batch_size:
+                self._pending = item
+                break
+            batch.append(item)
+            size += item[0].shape[0]
+        return batch
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect()
+            batch = [item for item in batch if not item[1].cancelled()]
+            if not batch:
+                continue
+
+            started = time.perf_counter()
+            delays = [started - enqueued for _, _, enqueued in batch]
+            inputs = torch.cat([pixel_values for pixel_values, _, _ in batch], dim=0)
+
+            try:
+                outputs = await loop.run_in_executor(self._executor, self.forward_fn, inputs)
+            except Exception as e:
+                logger.error(f"❌ Error en batch de {inputs.shape[0]} imágenes: {e}")
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            self.stats.record(inputs.shape[0], delays, time.perf_counter() - started)
+
+            # Devolver a cada llamador su porción de los logits
+            offset = 0
+            for pixel_values, future, _ in batch:
+                end = offset + pixel_values.shape[0]
+                if not future.done():
+                    future.set_result({name: tensor[offset:end] for name, tensor in outputs.items()})
+                offset = end
@@ -0,0 +1 @@
+"""Benchmarks de Smart Wardrobe AI (ejecutar desde python-api: python -m benchmarks.<script>)"""
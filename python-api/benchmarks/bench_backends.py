@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Latencia del forward por backend de inferencia y tamaño de batch.
+
+Requiere haber exportado los artefactos (python export_model.py --format onnx|torchscript):
+
+    python -m benchmarks.bench_backends --backends eager torchscript onnx --batch-sizes 1 8
+"""
+
+import argparse
+import json
+import time
+
+import torch
+
+import settings
+from backends import create_backend, default_artifact_path
+from benchmarks.common import latency_summary
+from main import build_model, load_checkpoint
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backends", nargs="+", default=["eager", "torchscript", "onnx"])
+    parser.add_argument("--batch-sizes", nargs="+", type=int, default=[1, 8])
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--output", help="guardar resultados en JSON")
+    args = parser.parse_args()
+
+    checkpoint = load_checkpoint()
+    results = []
+    for kind in args.backends:
+        backend = create_backend(
+            kind,
+            lambda: build_model(checkpoint),
+            artifact_path=default_artifact_path(settings.CHECKPOINT_PATH, kind)
+        )
+        for batch_size in args.batch_sizes:
+            pixel_values = torch.randn(batch_size, 3, 224, 224)
+            backend(pixel_values)  # calentamiento
+            samples = []
+            for _ in range(args.repeat):
+                started = time.perf_counter()
+                backend(pixel_values)
+                samples.append(time.perf_counter() - started)
+            summary = latency_summary(samples)
+            row = {"backend": kind, "batch_size": batch_size, **summary,
+                   "images_per_s": round(batch_size / (summary["p50_ms"] / 1000), 2)}
+            results.append(row)
+            print(f"{kind:>12} batch={batch_size:<3} p50={row['p50_ms']:8.1f}ms  "
+                  f"p99={row['p99_ms']:8.1f}ms  {row['images_per_s']:7.2f} img/s")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"💾 Resultados guardados en {args.output}")
+
+
+if __name__ == "__main__":
+    main()
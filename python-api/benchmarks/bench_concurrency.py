@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Latencia p50/p99 de /predict y /health según la concurrencia y el executor.
+
+Compara el comportamiento original (``inline``: inferencia en el event loop)
+con los pools ``thread`` y ``process``:
+
+    python -m benchmarks.bench_concurrency --executors inline thread process --concurrency 1 4 8
+"""
+
+import argparse
+import asyncio
+import importlib
+import json
+import os
+import time
+
+import httpx
+
+from benchmarks.common import encode_image, latency_summary, synthetic_image
+
+
+async def run_level(client: httpx.AsyncClient, payloads, concurrency: int, requests: int):
+    """Lanzar ``requests`` predicciones con ``concurrency`` en vuelo, midiendo /health en paralelo"""
+    predict_latencies, health_latencies = [], []
+    pending = list(range(requests))
+    done = asyncio.Event()
+
+    async def predict_worker():
+        while pending:
+            i = pending.pop()
+            data = payloads[i % len(payloads)]
+            started = time.perf_counter()
+            response = await client.post("/predict", files={"file": (f"{i}.jpg", data, "image/jpeg")})
+            response.raise_for_status()
+            predict_latencies.append(time.perf_counter() - started)
+
+    async def health_probe():
+        # Latencia medida desde el instante programado: si el loop está bloqueado
+        # la espera extra también cuenta (evita la omisión coordinada)
+        scheduled = time.perf_counter()
+        while True:
+            await client.get("/health")
+            health_latencies.append(time.perf_counter() - scheduled)
+            if done.is_set():
+                break
+            scheduled += 0.05
+            await asyncio.sleep(max(0.0, scheduled - time.perf_counter()))
+
+    probe = asyncio.create_task(health_probe())
+    started = time.perf_counter()
+    await asyncio.gather(*(predict_worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    done.set()
+    await probe
+
+    return {
+        "concurrency": concurrency,
+        "throughput_rps": round(requests / elapsed, 3),
+        "predict": latency_summary(predict_latencies),
+        "health": latency_summary(health_latencies),
+    }
+
+
+async def run_executor(kind: str, args, payloads):
+    os.environ["SW_EXECUTOR"] = kind
+    os.environ["SW_WORKERS"] = str(args.workers)
+    # Recargar la configuración y la app con el executor elegido
+    import settings
+    importlib.reload(settings)
+    import main as api
+    api = importlib.reload(api)
+
+    results = []
+    async with api.lifespan(api.app):
+        transport = httpx.ASGITransport(app=api.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            # Calentamiento
+            await run_level(client, payloads, 1, 2)
+            for concurrency in args.concurrency:
+                level = await run_level(client, payloads, concurrency, max(args.requests, concurrency))
+                level["executor"] = kind
+                results.append(level)
+                print(f"{kind:>8} c={concurrency:<3} "
+                      f"predict p50={level['predict']['p50_ms']:.0f}ms p99={level['predict']['p99_ms']:.0f}ms  "
+                      f"health p50={level['health']['p50_ms']:.1f}ms p99={level['health']['p99_ms']:.1f}ms (n={level['health']['n']})  "
+                      f"{level['throughput_rps']:.2f} req/s")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--executors", nargs="+", default=["inline", "thread", "process"])
+    parser.add_argument("--concurrency", nargs="+", type=int, default=[1, 4, 8, 16])
+    parser.add_argument("--requests", type=int, default=32, help="peticiones por nivel de concurrencia")
+    parser.add_argument("--workers", type=int, default=0, help="workers del pool (0 = automático)")
+    parser.add_argument("--size", type=int, nargs=2, default=[1024, 768], metavar=("W", "H"))
+    parser.add_argument("--output", help="guardar resultados en JSON")
+    args = parser.parse_args()
+
+    payloads = [encode_image(synthetic_image(*args.size, seed=i)) for i in range(8)]
+
+    results = []
+    for kind in args.executors:
+        results.extend(asyncio.run(run_executor(kind, args, payloads)))
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"💾 Resultados guardados en {args.output}")
+
+
+if __name__ == "__main__":
+    main()
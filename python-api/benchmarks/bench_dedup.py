@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Hash perceptual y búsqueda de casi duplicados (dedup.py).
+
+1. Distancia de Hamming entre cada foto sintética y sus variantes
+   (recompresión, mitad de tamaño, desenfoque, brillo, recorte y rotación
+   leves), y entre fotos de prendas distintas. Sirve para elegir
+   ``SW_DEDUP_MAX_DISTANCE``.
+2. Latencia de ``HashIndex.query`` con N hashes frente a comparar con todos,
+   verificando que ambos devuelvan las mismas filas.
+
+    python -m benchmarks.bench_dedup --photos 40 --items 10000 50000 --distance 6
+"""
+
+import argparse
+import io
+import json
+import time
+
+import cv2
+import numpy as np
+from PIL import Image, ImageFilter
+
+from dedup import HashIndex, hamming, phash, popcount
+
+
+def garment_photo(seed: int, width: int = 900, height: int = 1200) -> Image.Image:
+    """Prenda (polígono con sombreado y textura) sobre un fondo con degradado"""
+    rng = np.random.default_rng(seed)
+    background = rng.integers(190, 250) * np.linspace(0.85, 1.0, height)[:, None, None]
+    pixels = np.broadcast_to(background, (height, width, 3)).copy()
+    cx, cy = width // 2 + rng.integers(-80, 80), height // 2 + rng.integers(-80, 80)
+    w, h = rng.integers(250, 400), rng.integers(350, 500)
+    shapes = (
+        [(-w, -h), (w, -h), (w + 150, -h + 200), (w, -h + 250), (w, h), (-w, h), (-w, -h + 250), (-w - 150, -h + 200)],
+        [(-w, -h), (w, -h), (w + 40, h), (20, h), (0, -h + 150), (-20, h), (-w - 40, h)],
+        [(-w // 2, -h), (w // 2, -h), (w, h), (-w, h)],
+    )
+    polygon = np.array([(cx + x, cy + y) for x, y in shapes[rng.integers(len(shapes))]], dtype=np.int32)
+    mask = np.zeros((height, width), dtype=np.uint8)
+    cv2.fillPoly(mask, [polygon], 1)
+    columns = np.arange(width)[None, :, None]
+    shade = 0.75 + 0.25 * np.sin(columns / rng.integers(60, 200) + rng.random() * 6)
+    fabric = rng.integers(0, 256, size=3) * shade + rng.normal(0, 6, size=(height, width, 1))
+    pixels = np.where(mask[..., None] == 1, fabric, pixels)
+    return Image.fromarray(np.clip(pixels, 0, 255).astype(np.uint8))
+
+
+def jpeg(image: Image.Image, quality: int) -> Image.Image:
+    buffer = io.BytesIO()
+    image.save(buffer, "JPEG", quality=quality)
+    return Image.open(io.BytesIO(buffer.getvalue())).convert("RGB")
+
+
+VARIANTS = {
+    "jpeg q30": lambda im: jpeg(im, 30),
+    "mitad + jpeg": lambda im: jpeg(im.resize((im.width // 2, im.height // 2)), 90),
+    "desenfoque": lambda im: im.filter(ImageFilter.GaussianBlur(2)),
+    "brillo +25": lambda im: Image.fromarray(np.clip(np.asarray(im, dtype=np.int16) + 25, 0, 255).astype(np.uint8)),
+    "recorte 5%": lambda im: im.crop((im.width // 20, im.height // 20, im.width * 19 // 20, im.height * 19 // 20)),
+    "rotación 3°": lambda im: im.rotate(3, resample=Image.BILINEAR, fillcolor=(230, 230, 230)),
+}
+
+
+def distances(photos: int):
+    hashes, by_variant = [], {name: [] for name in VARIANTS}
+    for seed in range(photos):
+        photo = garment_photo(seed)
+        value = phash(photo)
+        hashes.append(value)
+        for name, transform in VARIANTS.items():
+            by_variant[name].append(hamming(value, phash(transform(photo))))
+    others = [hamming(a, b) for i, a in enumerate(hashes) for b in hashes[i + 1:]]
+    return by_variant, others
+
+
+def query_latency(items: int, distance: int, queries: int = 300, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    values = rng.integers(0, 2 ** 63, size=items, dtype=np.int64).view(np.uint64) * np.uint64(2)
+    index = HashIndex(distance)
+    for row, value in enumerate(values):
+        index.add(row, int(value))
+    # La mitad de las consultas tiene un casi duplicado en el índice
+    probes = [int(values[i]) ^ (1 << 5) ^ (1 << 40) for i in rng.integers(0, items, size=queries // 2)]
+    probes += [int(v) for v in rng.integers(0, 2 ** 63, size=queries - len(probes), dtype=np.int64)]
+    index.query(probes[0])  # ordenar las tablas fuera de la medición
+
+    started = time.perf_counter()
+    found = [index.query(probe) for probe in probes]
+    indexed = (time.perf_counter() - started) / queries
+
+    started = time.perf_counter()
+    brute = []
+    for probe in probes:
+        d = popcount(values ^ np.uint64(probe))
+        rows = np.flatnonzero(d <= distance)
+        brute.append(sorted((int(row), int(d[row])) for row in rows))
+    scan = (time.perf_counter() - started) / queries
+    same = all(sorted(a) == b for a, b in zip(found, brute))
+    return indexed, scan, same
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--photos", type=int, default=30)
+    parser.add_argument("--items", type=int, nargs="+", default=[1000, 10000, 50000])
+    parser.add_argument("--distance", type=int, default=6, help="SW_DEDUP_MAX_DISTANCE")
+    parser.add_argument("--output", help="guardar resultados en JSON")
+    args = parser.parse_args()
+
+    by_variant, others = distances(args.photos)
+    results = {"variants": {}, "distinct": {}, "index": []}
+    print(f"📷 Distancias de Hamming (de 64 bits) sobre {args.photos} fotos")
+    for name, values in by_variant.items():
+        within = sum(v <= args.distance for v in values)
+        results["variants"][name] = {"p50": float(np.median(values)), "max": int(max(values)), "within": within}
+        print(f"  {name:>13}: p50 {np.median(values):4.1f}  máx {max(values):2d}  "
+              f"detectadas con ≤{args.distance}: {within}/{len(values)}")
+    results["distinct"] = {"min": int(min(others)), "p1": float(np.percentile(others, 1)), "mean": float(np.mean(others))}
+    print(f"  {'distintas':>13}: mín {min(others)}  p1 {np.percentile(others, 1):.0f}  media {np.mean(others):.1f}")
+
+    for items in args.items:
+        indexed, scan, same = query_latency(items, args.distance)
+        results["index"].append({"items": items, "query_us": round(indexed * 1e6, 1),
+                                 "scan_us": round(scan * 1e6, 1), "same_rows": same})
+        print(f"  {items:>7} hashes: índice {indexed * 1e6:7.1f} µs   comparar con todos {scan * 1e6:7.1f} µs   "
+              f"{'mismas filas' if same else '⚠️ filas distintas'}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"💾 Resultados guardados en {args.output}")
+
+
+if __name__ == "__main__":
+    main()
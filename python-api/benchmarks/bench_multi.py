@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Varias prendas por foto (/predict/multi) frente a /predict.
+
+Genera fotos sintéticas de outfits (2 a 4 prendas sobre un fondo liso, como
+en bench_dedup) y mide:
+
+1. Cobertura de las propuestas de regions.py: fracción de prendas reales
+   con alguna caja a IoU >= 0.5.
+2. Latencia de ``detect_image_bytes`` (todas las regiones en un forward)
+   frente a ``predict_image_bytes`` de la misma foto y frente a un forward
+   por región, con el modelo cargado como en el servidor:
+
+    HF_HUB_OFFLINE=1 python -m benchmarks.bench_multi --photos 20 --repeat 3
+"""
+
+import argparse
+import io
+import json
+import time
+
+import cv2
+import numpy as np
+from PIL import Image
+
+import main as server
+import settings
+from regions import iou, propose_regions
+
+
+def outfit_photo(seed: int, width: int = 1200, height: int = 900):
+    """Foto con 2 a 4 prendas separadas y sus cajas reales normalizadas"""
+    rng = np.random.default_rng(seed)
+    pixels = np.full((height, width, 3), rng.integers(200, 250), dtype=np.uint8)
+    count = int(rng.integers(2, 5))
+    cell = width // count
+    boxes = []
+    for i in range(count):
+        w, h = int(rng.integers(cell // 2, cell - 40)), int(rng.integers(height // 3, height - 120))
+        x0, y0 = i * cell + int(rng.integers(10, cell - w - 10)), int(rng.integers(40, height - h - 40))
+        color = tuple(int(c) for c in rng.integers(0, 170, size=3))
+        if rng.random() < 0.5:
+            cv2.rectangle(pixels, (x0, y0), (x0 + w, y0 + h), color, -1)
+        else:
+            polygon = np.array([(x0 + w // 4, y0), (x0 + 3 * w // 4, y0), (x0 + w, y0 + h), (x0, y0 + h)], np.int32)
+            cv2.fillPoly(pixels, [polygon], color)
+        boxes.append((x0 / width, y0 / height, (x0 + w) / width, (y0 + h) / height))
+    return Image.fromarray(pixels), boxes
+
+
+def timed(fn, repeat: int) -> float:
+    fn()  # calentamiento
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return float(np.median(samples))
+
+
+def one_forward_per_region(image_data: bytes):
+    """Lo que costaría sin batch: un forward por recorte"""
+    prepared = server.prepare_regions(image_data)
+    for i in range(len(prepared.boxes)):
+        server.run_model(prepared.pixel_values[i:i + 1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--photos", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", help="guardar resultados en JSON")
+    args = parser.parse_args()
+
+    found = total = proposals = 0
+    photos = []
+    for seed in range(args.photos):
+        image, truth = outfit_photo(seed)
+        boxes = propose_regions(np.asarray(image), settings.MULTI_MAX_REGIONS)
+        found += sum(any(iou(box, real) >= 0.5 for box in boxes) for real in truth)
+        total += len(truth)
+        proposals += len(boxes)
+        buffer = io.BytesIO()
+        image.save(buffer, "JPEG", quality=90)
+        photos.append(buffer.getvalue())
+    print(f"📦 Propuestas: {proposals / args.photos:.1f} por foto, "
+          f"{found}/{total} prendas cubiertas con IoU >= 0.5 ({100 * found / total:.0f}%)")
+
+    server.load_model()
+    sample = photos[:min(5, len(photos))]
+    single = np.median([timed(lambda: server.predict_image_bytes(data), args.repeat) for data in sample])
+    batched = np.median([timed(lambda: server.detect_image_bytes(data), args.repeat) for data in sample])
+    sequential = np.median([timed(lambda: one_forward_per_region(data), args.repeat) for data in sample])
+    results = {
+        "proposals_per_photo": proposals / args.photos,
+        "recall": found / total,
+        "predict_ms": round(1000 * single, 1),
+        "multi_ms": round(1000 * batched, 1),
+        "per_region_ms": round(1000 * sequential, 1),
+    }
+    print(f"⏱️ /predict {results['predict_ms']} ms   /predict/multi (un forward) {results['multi_ms']} ms   "
+          f"un forward por región {results['per_region_ms']} ms")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"💾 Resultados guardados en {args.output}")
+
+
+if __name__ == "__main__":
+    main()
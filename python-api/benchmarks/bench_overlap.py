@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Latencia de una petición con y sin solapar colores y forward (SW_OVERLAP_COLORS).
+
+Mide por separado el forward del ViT y la extracción de colores (lo que sería
+el mínimo teórico: el máximo de los dos) y luego la predicción completa de una
+sola imagen, alternando sin solapar / solapado para que ambos vean la misma
+carga del host:
+
+- ``inline``: ``predict_image_bytes`` (lo que corre cada worker de proceso),
+  con los colores en el hilo ``colors``.
+- ``thread``: ``/predict`` de la API, con el forward en el micro-batcher y los
+  colores en el pool de inferencia.
+
+    python -m benchmarks.bench_overlap --repeat 30 --size 3024 4032
+
+El solapamiento necesita al menos dos núcleos libres: con uno solo los dos
+hilos se turnan y la latencia queda como la suma.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import time
+
+import httpx
+
+from benchmarks.common import encode_image, latency_summary, load_api_model, synthetic_image
+from threads import available_cores
+
+
+def stage_times(api, payloads, repeat: int):
+    """Forward y colores por separado, sobre las mismas imágenes"""
+    prepared = [api.prepare_image(data) for data in payloads]
+    forward, colors = [], []
+    for i in range(repeat):
+        item = prepared[i % len(prepared)]
+        started = time.perf_counter()
+        api.run_model(item.pixel_values)
+        forward.append(time.perf_counter() - started)
+        started = time.perf_counter()
+        api.extract_clothing_colors(item.color_image)
+        colors.append(time.perf_counter() - started)
+    return latency_summary(forward), latency_summary(colors)
+
+
+def measure_inline(api, payloads, repeat: int):
+    latencies = {False: [], True: []}
+    for i in range(repeat):
+        data = payloads[i % len(payloads)]
+        for overlap in (False, True):
+            started = time.perf_counter()
+            api.predict_image_bytes(data, overlap=overlap)
+            latencies[overlap].append(time.perf_counter() - started)
+    same = api.predict_image_bytes(payloads[0], overlap=False) == api.predict_image_bytes(payloads[0], overlap=True)
+    return latency_summary(latencies[False]), latency_summary(latencies[True]), same
+
+
+async def measure_thread(api, payloads, repeat: int):
+    import settings
+
+    latencies = {False: [], True: []}
+    responses = {}
+    async with api.lifespan(api.app):
+        transport = httpx.ASGITransport(app=api.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            async def predict(data: bytes, overlap: bool):
+                settings.OVERLAP_COLORS = overlap
+                started = time.perf_counter()
+                response = await client.post("/predict", files={"file": ("prenda.jpg", data, "image/jpeg")})
+                response.raise_for_status()
+                latencies[overlap].append(time.perf_counter() - started)
+                return response.json()
+
+            for overlap in (False, True):
+                responses[overlap] = await predict(payloads[0], overlap)  # calentamiento
+                latencies[overlap].clear()
+            for i in range(repeat):
+                for overlap in (False, True):
+                    await predict(payloads[i % len(payloads)], overlap)
+    return latency_summary(latencies[False]), latency_summary(latencies[True]), responses[False] == responses[True]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=20, help="predicciones por variante")
+    parser.add_argument("--size", type=int, nargs=2, default=[1024, 768], metavar=("W", "H"))
+    parser.add_argument("--paths", nargs="+", default=["inline", "thread"], choices=["inline", "thread"])
+    parser.add_argument("--output", help="guardar resultados en JSON")
+    args = parser.parse_args()
+
+    # Sin caché: cada petición repite la imagen y debe pasar por el modelo
+    import settings
+    settings.CACHE_ENABLED = False
+    settings.EXECUTOR = "thread"
+    import main as api
+
+    source = load_api_model(api)
+    logging.disable(logging.INFO)
+    payloads = [encode_image(synthetic_image(*args.size, seed=i)) for i in range(4)]
+    api.predict_image_bytes(payloads[0])  # calentamiento
+
+    forward, colors = stage_times(api, payloads, args.repeat)
+    print(f"🧮 {available_cores()} núcleos, modelo {source}, imágenes de {args.size[0]}x{args.size[1]}")
+    print(f"  forward p50 {forward['p50_ms']:7.1f} ms   colores p50 {colors['p50_ms']:7.1f} ms   "
+          f"suma {forward['p50_ms'] + colors['p50_ms']:7.1f} ms   máximo {max(forward['p50_ms'], colors['p50_ms']):7.1f} ms")
+
+    results = {"cores": available_cores(), "model": source, "size": args.size,
+               "forward": forward, "colors": colors, "paths": {}}
+    for path in args.paths:
+        if path == "inline":
+            sequential, overlapped, same = measure_inline(api, payloads, args.repeat)
+        else:
+            sequential, overlapped, same = asyncio.run(measure_thread(api, payloads, args.repeat))
+        saved = sequential["p50_ms"] - overlapped["p50_ms"]
+        results["paths"][path] = {"sequential": sequential, "overlapped": overlapped, "same_response": same}
+        print(f"  {path:>6}: secuencial p50 {sequential['p50_ms']:7.1f} ms  →  solapado p50 {overlapped['p50_ms']:7.1f} ms "
+              f"({saved:+.1f} ms ahorrados, p99 {sequential['p99_ms']:.1f} → {overlapped['p99_ms']:.1f} ms)  "
+              f"{'misma respuesta' if same else '⚠️ respuestas distintas'}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"💾 Resultados guardados en {args.output}")
+
+
+if __name__ == "__main__":
+    main()
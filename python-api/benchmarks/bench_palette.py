@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Motor de paleta en NumPy vs. KMeans de sklearn en la extracción de colores.
+
+Mide el tiempo de ``extract_clothing_colors`` con ambos cuantizadores para
+varios tamaños de imagen y verifica que los resultados coincidan
+(nombre, hex y frecuencia) dentro de una tolerancia:
+
+    python -m benchmarks.bench_palette --sizes 224 400 1024 3000
+"""
+
+import argparse
+import json
+import time
+
+import numpy as np
+from PIL import Image
+
+from benchmarks.common import synthetic_image
+from main import rgb_to_color_name, select_garment_pixels
+from palette import quantize_colors
+
+
+def sklearn_quantize(pixels: np.ndarray, n_colors: int):
+    """Implementación original: KMeans(n_init=10) sobre todos los píxeles"""
+    from sklearn.cluster import KMeans
+
+    kmeans = KMeans(n_clusters=n_colors, random_state=42, n_init=10)
+    kmeans.fit(pixels)
+    frequencies = np.bincount(kmeans.labels_, minlength=n_colors) / len(kmeans.labels_)
+    return kmeans.cluster_centers_, frequencies
+
+
+def palette(image: Image.Image, quantizer, num_colors: int = 3):
+    pixels = select_garment_pixels(image)
+    n_colors = max(1, min(num_colors, len(pixels) // 50))
+    centers, frequencies = quantizer(pixels, n_colors)
+    colors = [
+        {"nombre": rgb_to_color_name(c), "rgb": c.tolist(), "frecuencia": round(float(f), 3)}
+        for c, f in zip(centers.astype(int), frequencies)
+    ]
+    return sorted(colors, key=lambda x: x["frecuencia"], reverse=True)
+
+
+def compare(reference, candidate):
+    """Emparejar colores por cercanía RGB y medir diferencias"""
+    unmatched = list(candidate)
+    rgb_diffs, freq_diffs, same_names = [], [], 0
+    for color in reference:
+        best = min(unmatched, key=lambda c: np.abs(np.subtract(c["rgb"], color["rgb"])).sum())
+        unmatched.remove(best)
+        rgb_diffs.append(int(np.abs(np.subtract(best["rgb"], color["rgb"])).max()))
+        freq_diffs.append(abs(best["frecuencia"] - color["frecuencia"]))
+        same_names += best["nombre"] == color["nombre"]
+        if not unmatched:
+            break
+    return {
+        "names_equal": same_names == len(reference),
+        "max_rgb_diff": max(rgb_diffs),
+        "max_freq_diff": round(max(freq_diffs), 3),
+    }
+
+
+def multicolor_image(size: int, seed: int) -> Image.Image:
+    """Prenda con franjas de 2-3 colores y ruido, sobre fondo claro"""
+    rng = np.random.default_rng(seed)
+    image = np.array(synthetic_image(size, size, seed=seed))
+    stripes = rng.integers(0, 256, size=(3, 3))
+    band = max(1, size // 12)
+    rows = (np.arange(size) // band) % 3
+    garment = stripes[rows][:, None, :] + rng.integers(-15, 16, size=(size, size, 3))
+    y0, y1, x0, x1 = size // 5, size - size // 5, size // 4, size - size // 4
+    image[y0:y1, x0:x1] = np.clip(garment[y0:y1, x0:x1], 0, 255)
+    return Image.fromarray(image.astype(np.uint8))
+
+
+def timed(fn, repeat: int) -> float:
+    fn()  # calentamiento
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return float(np.median(samples))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", nargs="+", type=int, default=[224, 400, 1024, 3000])
+    parser.add_argument("--images", type=int, default=5, help="imágenes por tamaño")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", help="guardar resultados en JSON")
+    args = parser.parse_args()
+
+    results = []
+    for size in args.sizes:
+        images = [multicolor_image(size, seed) for seed in range(args.images)]
+        sk = [timed(lambda: palette(img, sklearn_quantize), args.repeat) for img in images]
+        np_ = [timed(lambda: palette(img, quantize_colors), args.repeat) for img in images]
+        agreement = [compare(palette(img, sklearn_quantize), palette(img, quantize_colors)) for img in images]
+
+        row = {
+            "size": size,
+            "sklearn_ms": round(1000 * float(np.median(sk)), 3),
+            "numpy_ms": round(1000 * float(np.median(np_)), 3),
+            "speedup": round(float(np.median(sk)) / float(np.median(np_)), 1),
+            "names_equal": sum(a["names_equal"] for a in agreement),
+            "max_rgb_diff": max(a["max_rgb_diff"] for a in agreement),
+            "max_freq_diff": max(a["max_freq_diff"] for a in agreement),
+        }
+        results.append(row)
+        print(f"{size:>5}px  sklearn={row['sklearn_ms']:8.2f}ms  numpy={row['numpy_ms']:7.2f}ms  "
+              f"x{row['speedup']:<6} nombres iguales {row['names_equal']}/{len(images)}  "
+              f"Δrgb≤{row['max_rgb_diff']}  Δfrec≤{row['max_freq_diff']}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"💾 Resultados guardados en {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Pipeline de preprocesamiento propio vs. ViTImageProcessor.
+
+Para cada formato y tamaño compara el tensor del modelo y el color dominante
+extraído contra el camino original (decodificación completa con PIL,
+``ViTImageProcessor`` y resize con cv2 para los colores), y mide el tiempo:
+
+    python -m benchmarks.bench_preprocess --sizes 640x480 1600x1200 4032x3024
+
+Sin draft JPEG el tensor debe coincidir hasta el redondeo en float32 (``--atol``);
+con draft se reporta la diferencia media y se exige ``--max-mean-diff``. Con
+draft los colores salen de una imagen promediada en el dominio DCT, así que el
+ruido del sensor ya no reparte una prenda lisa en varios clusters casi iguales:
+las frecuencias cambian, el color dominante no debería.
+Termina con código 1 si alguna comparación falla.
+"""
+
+import argparse
+import io
+import json
+import sys
+import time
+
+import cv2
+import numpy as np
+from PIL import Image
+
+from benchmarks.common import encode_image
+from main import extract_clothing_colors
+from preprocessing import ImagePreprocessor, color_size
+from weights import CONFIG_DIR, load_processor
+
+
+def textured_image(width: int, height: int, seed: int = 0) -> Image.Image:
+    """Foto sintética con bordes y texturas (el peor caso para reducir resolución)"""
+    rng = np.random.default_rng(seed)
+    y, x = np.mgrid[:height, :width]
+    pixels = np.stack([
+        127 + 100 * np.sin(x / (7 + seed)),
+        127 + 100 * np.cos(y / 11),
+        (x * 255 // max(1, width - 1) + y * 255 // max(1, height - 1)) // 2,
+    ], axis=-1)
+    pixels += rng.normal(0, 12, size=pixels.shape)
+    # Una "prenda" de color sólido en el centro
+    pixels[height // 4: 3 * height // 4, width // 3: 2 * width // 3] = rng.integers(0, 256, size=3)
+    return Image.fromarray(np.clip(pixels, 0, 255).astype(np.uint8), "RGB")
+
+
+def reference_processor():
+    """ViTImageProcessor con backend PIL, el de transformers 4.x con el que se entrenó el modelo.
+
+    Desde transformers 5 ``ViTImageProcessor`` redimensiona con torchvision y
+    puede diferir en un nivel de 8 bits; la variante PIL sigue disponible.
+    """
+    try:
+        from transformers.models.vit.image_processing_pil_vit import ViTImageProcessorPil
+    except ImportError:
+        return load_processor()
+    return ViTImageProcessorPil.from_pretrained(CONFIG_DIR, local_files_only=True)
+
+
+def reference(hf_processor, data: bytes):
+    """Camino original: decodificación completa + ViTImageProcessor + resize cv2 para colores"""
+    image = Image.open(io.BytesIO(data))
+    image.load()
+    image = image.convert("RGB")
+    tensor = hf_processor(images=image, return_tensors="pt")["pixel_values"]
+    pixels = np.array(image)
+    width, height = color_size(image.width, image.height)
+    if (width, height) != image.size:
+        pixels = cv2.resize(pixels, (width, height))
+    return tensor, pixels
+
+
+def timed(fn, repeat: int):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        samples.append(time.perf_counter() - started)
+    return result, float(np.median(samples)) * 1000
+
+
+def dominant_color(pixels) -> str:
+    return extract_clothing_colors(pixels)[0]["nombre"]
+
+
+def check_exif(processor: ImagePreprocessor) -> bool:
+    """Una foto con Orientation=6 (girada 90°) debe llegar derecha"""
+    image = textured_image(320, 240)
+    exif = Image.Exif()
+    exif[0x0112] = 6
+    buffer = io.BytesIO()
+    image.save(buffer, "JPEG", quality=95, exif=exif)
+    decoded = processor.decode(buffer.getvalue())
+    return decoded.size == (240, 320)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", nargs="+", default=["640x480", "1600x1200", "4032x3024"])
+    parser.add_argument("--formats", nargs="+", default=["JPEG", "PNG"])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--atol", type=float, default=1e-5, help="diferencia máxima sin draft")
+    parser.add_argument("--max-mean-diff", type=float, default=0.02, help="diferencia media máxima con draft")
+    parser.add_argument("--output", help="guardar resultados en JSON")
+    args = parser.parse_args()
+
+    hf_processor = reference_processor()
+    exact = ImagePreprocessor.from_config(CONFIG_DIR, jpeg_draft=False)
+    fast = ImagePreprocessor.from_config(CONFIG_DIR, jpeg_draft=True)
+
+    results, failures = [], []
+    for fmt in args.formats:
+        for size in args.sizes:
+            width, height = map(int, size.split("x"))
+            data = encode_image(textured_image(width, height), fmt)
+            (ref_tensor, ref_pixels), ref_ms = timed(lambda: reference(hf_processor, data), args.repeat)
+
+            for name, processor in (("exact", exact), ("draft", fast)):
+                if name == "draft" and fmt != "JPEG":
+                    continue
+                prepared, ms = timed(lambda: processor.prepare(data), args.repeat)
+                diff = (prepared.pixel_values - ref_tensor).abs()
+                row = {
+                    "format": fmt, "size": size, "pipeline": name,
+                    "reference_ms": round(ref_ms, 2), "ms": round(ms, 2),
+                    "speedup": round(ref_ms / ms, 2),
+                    "max_abs_diff": round(float(diff.max()), 6),
+                    "mean_abs_diff": round(float(diff.mean()), 6),
+                    "same_dominant_color": dominant_color(prepared.color_image) == dominant_color(ref_pixels),
+                }
+                ok = row["max_abs_diff"] <= args.atol if name == "exact" else row["mean_abs_diff"] <= args.max_mean_diff
+                if not ok:
+                    failures.append(f"{fmt} {size} {name}")
+                results.append(row)
+                print(f"{fmt:>4} {size:>10} {name:>5}: {row['reference_ms']:8.1f} ms → {row['ms']:7.1f} ms "
+                      f"({row['speedup']:5.1f}x)  dif. máx {row['max_abs_diff']:.2e}  media {row['mean_abs_diff']:.2e}  "
+                      f"color dominante {'=' if row['same_dominant_color'] else '≠'}")
+
+    if not check_exif(fast):
+        failures.append("orientación EXIF")
+    print(f"🧭 Orientación EXIF: {'ok' if 'orientación EXIF' not in failures else 'falló'}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"💾 Resultados guardados en {args.output}")
+
+    if failures:
+        print(f"❌ Fuera de tolerancia: {', '.join(failures)}")
+        sys.exit(1)
+    print("✅ Preprocesamiento validado contra ViTImageProcessor")
+
+
+if __name__ == "__main__":
+    main()
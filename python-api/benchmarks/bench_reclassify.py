@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Reclasificar desde los embeddings guardados (reclassify.py) frente a volver a
+pasar las fotos por el modelo.
+
+1. Concordancia: clasifica fotos sintéticas con el modelo (como /predict con
+   user=), guarda sus embeddings y las reclasifica con las mismas cabezas. La
+   clase y los climas tienen que coincidir con los de /predict.
+2. Velocidad: una colección sintética de N prendas (vectores float16 y
+   metadatos escritos directo en el formato de embeddings.py) reclasificada
+   de punta a punta, contra el forward por imagen medido en batches de 16.
+
+    HF_HUB_OFFLINE=1 python -m benchmarks.bench_reclassify --photos 32 --items 100000 1000000
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import time
+
+import numpy as np
+import torch
+
+import main as server
+from benchmarks.bench_dedup import garment_photo
+from embeddings import EMBEDDING_DIM, ITEMS_FILE, VECTORS_FILE, EmbeddingStore
+from fields import FIELDS, with_field
+from reclassify import Heads, reclassify
+
+
+def agreement(photos: int, directory: str):
+    """Clase y climas de /predict frente a los reclasificados desde el embedding guardado"""
+    store = EmbeddingStore(directory)
+    fields = with_field(FIELDS, "embedding")
+    for seed in range(photos):
+        image = garment_photo(seed, 450, 600)
+        result = server.predict_clothing(image, fields)
+        store.add("parity", np.asarray(result["embedding"]), server.embedding_meta(f"{seed}.jpg", result), f"p{seed}")
+    expected = {meta["id"]: meta for _, meta in store.index("parity").items()}
+
+    heads = Heads(server.load_checkpoint(), "reclasificado")
+    reclassify(store.index("parity"), heads, force=True)
+    same_class = same_climates = 0
+    max_diff = 0.0
+    for _, meta in store.index("parity").items():
+        before = expected[meta["id"]]
+        same_class += meta["clase"] == before["clase"]
+        same_climates += meta["climas"] == before["climas"]
+        max_diff = max(max_diff, abs(meta["confianza"] - before["confianza"]))
+    return same_class / photos, same_climates / photos, max_diff
+
+
+def synthetic_collection(directory: str, items: int, seed: int = 0):
+    """Usuario con ``items`` prendas: vectores unitarios float16 y norma cercana a la del pooler_output"""
+    rng = np.random.default_rng(seed)
+    user = os.path.join(directory, "sintetico")
+    os.makedirs(user, exist_ok=True)
+    with open(os.path.join(user, VECTORS_FILE), "wb") as vectors, \
+            open(os.path.join(user, ITEMS_FILE), "w", encoding="utf-8") as metas:
+        for start in range(0, items, 65536):
+            block = rng.standard_normal((min(65536, items - start), EMBEDDING_DIM), dtype=np.float32)
+            block /= np.linalg.norm(block, axis=1, keepdims=True)
+            vectors.write(block.astype("<f2").tobytes())
+            for row in range(start, start + len(block)):
+                metas.write(json.dumps({"fila": row, "id": f"i{row}", "archivo": f"{row}.jpg", "clase": "jeans",
+                                        "norma": round(float(rng.normal(12, 0.3)), 4)}) + "\n")
+    return EmbeddingStore(directory).index("sintetico")
+
+
+def forward_per_image(batch: int = 16, repeat: int = 3) -> float:
+    pixel_values = torch.randn(batch, 3, 224, 224)
+    server.run_model(pixel_values)
+    started = time.perf_counter()
+    for _ in range(repeat):
+        server.run_model(pixel_values)
+    return (time.perf_counter() - started) / (repeat * batch)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--photos", type=int, default=32)
+    parser.add_argument("--items", type=int, nargs="+", default=[100000])
+    parser.add_argument("--output", help="guardar resultados en JSON")
+    args = parser.parse_args()
+
+    server.load_model()
+    results = {"items": []}
+    with tempfile.TemporaryDirectory() as directory:
+        same_class, same_climates, max_diff = agreement(args.photos, directory)
+    results.update(same_class=same_class, same_climates=same_climates, max_confidence_diff=max_diff)
+    print(f"🔍 {args.photos} fotos: misma clase {100 * same_class:.0f}%, mismos climas {100 * same_climates:.0f}%, "
+          f"diferencia máxima de confianza {max_diff:.5f}")
+
+    per_image = forward_per_image()
+    heads = Heads(server.load_checkpoint(), "reclasificado")
+    for items in args.items:
+        with tempfile.TemporaryDirectory() as directory:
+            index = synthetic_collection(directory, items)
+            started = time.perf_counter()
+            stats = reclassify(index, heads)
+            elapsed = time.perf_counter() - started
+        row = {"items": items, "reclassify_s": round(elapsed, 2), "per_second": round(stats["guardadas"] / elapsed),
+               "forward_estimate_s": round(items * per_image, 1)}
+        results["items"].append(row)
+        print(f"  {items:>9,} prendas: reclasificar {elapsed:7.2f}s ({row['per_second']:,} por segundo)   "
+              f"volver a pasar las fotos por el ViT ≈ {row['forward_estimate_s']:,.0f}s (solo el forward)")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"💾 Resultados guardados en {args.output}")
+
+
+if __name__ == "__main__":
+    main()
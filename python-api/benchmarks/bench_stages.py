@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Microbenchmarks de cada etapa de la predicción, sin red.
+
+Con imágenes sintéticas de varios tamaños y modos (RGB, RGBA, P, L) mide
+``decode_image``, ``preprocess_image``, el forward del modelo,
+``extract_clothing_colors``, ``rgb_to_color_name`` y ``predict_clothing``
+completo. Si no existe el ``.pth`` se usa un ``CustomClothingModel`` con pesos
+aleatorios y las mismas formas (54 clases, 8 climas): los tiempos valen igual.
+
+    python -m benchmarks.bench_stages --output base.json
+    # ... cambios ...
+    python -m benchmarks.bench_stages --compare base.json --output nuevo.json
+
+``--compare`` termina con código 1 si alguna etapa empeora más que
+``--threshold`` (20% por defecto) y más de ``--min-delta-ms``, para no fallar
+por ruido en etapas de microsegundos. ``--current`` compara dos archivos ya
+guardados sin volver a medir.
+"""
+
+import argparse
+import json
+import logging
+import platform
+import sys
+import time
+
+import numpy as np
+import torch
+
+from benchmarks.common import encode_image, load_api_model, synthetic_image
+
+# Los JPEG no admiten alfa ni paleta: esos modos se miden en PNG
+FORMATS = {"RGB": "JPEG", "L": "JPEG", "RGBA": "PNG", "P": "PNG"}
+
+
+def measure(fn, repeat: int, warmup: int = 1):
+    """Mediana y p95 en milisegundos de ``repeat`` llamadas a ``fn``"""
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    ms = np.array(samples) * 1000
+    return {
+        "n": repeat,
+        "median_ms": round(float(np.median(ms)), 4),
+        "p95_ms": round(float(np.percentile(ms, 95)), 4),
+        "min_ms": round(float(ms.min()), 4),
+    }
+
+
+def run_suite(api, args):
+    """Medir todas las etapas; devuelve {"etapa/caso": resumen}"""
+    results = {}
+
+    def record(name: str, fn, repeat: int = args.repeat):
+        results[name] = measure(fn, repeat)
+        print(f"{name:>40}: {results[name]['median_ms']:10.3f} ms  (p95 {results[name]['p95_ms']:.3f})")
+
+    # El forward no depende de la imagen: un caso por tamaño de batch
+    for batch_size in args.batch_sizes:
+        pixel_values = torch.randn(batch_size, 3, 224, 224)
+        with torch.inference_mode():
+            record(f"forward/batch{batch_size}", lambda: api.run_model(pixel_values), args.model_repeat)
+
+    rng = np.random.default_rng(0)
+    rgbs = rng.integers(0, 256, size=(256, 3))
+    record("rgb_to_color_name/256", lambda: [api.rgb_to_color_name(rgb) for rgb in rgbs])
+
+    for size in args.sizes:
+        width, height = map(int, size.split("x"))
+        for mode in args.modes:
+            fmt = FORMATS[mode]
+            case = f"{mode}-{fmt}-{size}"
+            data = encode_image(synthetic_image(width, height, mode), fmt)
+            image = api.decode_image(data)
+
+            record(f"decode/{case}", lambda: api.decode_image(data))
+            record(f"preprocess_image/{case}", lambda: api.preprocess_image(image))
+            record(f"extract_clothing_colors/{case}", lambda: api.extract_clothing_colors(image))
+            with torch.inference_mode():
+                record(f"predict_clothing/{case}", lambda: api.predict_clothing(image), args.model_repeat)
+
+    return results
+
+
+def compare(baseline, current, threshold: float, min_delta_ms: float):
+    """Filas de comparación por etapa y lista de regresiones"""
+    rows, regressions = [], []
+    for name in sorted(set(baseline) & set(current)):
+        before, after = baseline[name]["median_ms"], current[name]["median_ms"]
+        ratio = after / before if before > 0 else float("inf")
+        regressed = ratio > 1 + threshold and after - before > min_delta_ms
+        rows.append((name, before, after, ratio, regressed))
+        if regressed:
+            regressions.append(name)
+    for name, before, after, ratio, regressed in rows:
+        mark = "❌" if regressed else ("🚀" if ratio < 1 - threshold else "  ")
+        print(f"{mark} {name:>40}: {before:10.3f} → {after:10.3f} ms  ({ratio:5.2f}x)")
+    missing = sorted(set(baseline) - set(current))
+    if missing:
+        print(f"⚠️ Etapas de la línea base sin medir: {', '.join(missing)}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", nargs="+", default=["224x224", "640x480", "1600x1200", "4032x3024"])
+    parser.add_argument("--modes", nargs="+", choices=sorted(FORMATS), default=["RGB", "RGBA", "P", "L"])
+    parser.add_argument("--batch-sizes", nargs="+", type=int, default=[1, 8])
+    parser.add_argument("--repeat", type=int, default=20, help="muestras por etapa sin modelo")
+    parser.add_argument("--model-repeat", type=int, default=5, help="muestras por etapa con forward")
+    parser.add_argument("--output", help="guardar resultados en JSON")
+    parser.add_argument("--compare", metavar="BASE", help="JSON de referencia; falla si alguna etapa empeora")
+    parser.add_argument("--current", help="con --compare: JSON ya medido en vez de correr la suite")
+    parser.add_argument("--threshold", type=float, default=0.2, help="empeoramiento relativo tolerado")
+    parser.add_argument("--min-delta-ms", type=float, default=0.05, help="empeoramiento absoluto mínimo para fallar")
+    args = parser.parse_args()
+
+    if args.current:
+        with open(args.current, "r", encoding="utf-8") as f:
+            report = json.load(f)
+    else:
+        import main as api
+
+        model_source = load_api_model(api)
+        # Los logs por predicción distorsionan las etapas más cortas
+        logging.disable(logging.INFO)
+        print(f"🤖 Modelo {model_source} ({api.model.name}), {torch.get_num_threads()} hilos de torch")
+        report = {
+            "meta": {
+                "model": model_source,
+                "backend": api.model.name,
+                "torch": torch.__version__,
+                "torch_threads": torch.get_num_threads(),
+                "python": platform.python_version(),
+                "machine": platform.machine(),
+                "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            },
+            "results": run_suite(api, args),
+        }
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"💾 Resultados guardados en {args.output}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        print(f"📊 Comparación contra {args.compare} (umbral {args.threshold:.0%}, mínimo {args.min_delta_ms} ms)")
+        regressions = compare(baseline["results"], report["results"], args.threshold, args.min_delta_ms)
+        if regressions:
+            print(f"❌ Regresiones: {', '.join(regressions)}")
+            sys.exit(1)
+        print("✅ Sin regresiones")
+
+
+if __name__ == "__main__":
+    main()
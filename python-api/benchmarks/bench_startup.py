@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Tiempo de arranque en frío: desde que se lanza el proceso hasta la primera predicción.
+
+Cada muestra es un proceso nuevo que importa la API, ejecuta ``load_model`` y
+hace un forward, con el checkpoint ``.pth`` o con el ``.safetensors``
+mapeado en memoria (``python export_model.py --format safetensors``):
+
+    python -m benchmarks.bench_startup --modes pth safetensors --runs 3
+
+Para medir sin caché de páginas del sistema operativo, vaciarla entre
+corridas (``sync; echo 3 > /proc/sys/vm/drop_caches`` como root).
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+MODES = {
+    "pth": {"SW_FAST_STARTUP": "0"},
+    "safetensors": {"SW_FAST_STARTUP": "1"},
+}
+
+
+def child():
+    """Arranque medido dentro del proceso hijo; imprime una línea JSON"""
+    import resource
+
+    started = time.perf_counter()
+    import torch
+    import main as api
+    imported = time.perf_counter()
+
+    api.load_model()
+    loaded = time.perf_counter()
+
+    api.run_model(torch.zeros(1, 3, 224, 224))
+    ready = time.perf_counter()
+
+    print(json.dumps({
+        "import_s": round(imported - started, 3),
+        "load_model_s": round(loaded - imported, 3),
+        "first_forward_s": round(ready - loaded, 3),
+        "max_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    }))
+
+
+def measure(mode: str):
+    env = {**os.environ, **MODES[mode], "HF_HUB_OFFLINE": "1"}
+    started = time.perf_counter()
+    output = subprocess.run(
+        [sys.executable, "-m", "benchmarks.bench_startup", "--child"],
+        env=env, capture_output=True, text=True, check=True
+    ).stdout
+    wall = time.perf_counter() - started
+    return {"wall_s": round(wall, 3), **json.loads(output.strip().splitlines()[-1])}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modes", nargs="+", choices=sorted(MODES), default=["pth", "safetensors"])
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--output", help="guardar resultados en JSON")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child()
+        return
+
+    results = []
+    for mode in args.modes:
+        runs = [measure(mode) for _ in range(args.runs)]
+        row = {"mode": mode, "runs": runs}
+        for key in runs[0]:
+            row[f"median_{key}"] = round(statistics.median(r[key] for r in runs), 3)
+        results.append(row)
+        print(f"{mode:>12}: total {row['median_wall_s']:6.2f}s  import {row['median_import_s']:5.2f}s  "
+              f"load_model {row['median_load_model_s']:5.2f}s  primer forward {row['median_first_forward_s']:5.2f}s  "
+              f"RSS máx {row['median_max_rss_mb']:7.1f} MB")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"💾 Resultados guardados en {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Búsqueda de outfits con poda vs. el producto cartesiano completo.
+
+Genera closets sintéticos (clases de ``climate.json``, colores aleatorios) con
+N prendas por categoría y compara ``search`` de outfits.py con la evaluación
+de todas las combinaciones superior x inferior x calzado en NumPy. Verifica
+que los puntajes del top-N coincidan e informa cuántas combinaciones evaluó
+la poda:
+
+    python -m benchmarks.bench_suggest --sizes 50 200 500 --n 5
+"""
+
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+
+from outfits import OUTFIT_CATEGORIES, OutfitEngine, color_compatibility
+
+CLIMATE_JSON = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "..", "climate.json")
+CLIMATES = ("calor", "entretiempo", "frio", "frio extremo", "interior", "lluvia", "soleado", "viento")
+
+
+def climate_engine(color_weight: float) -> OutfitEngine:
+    """Motor con la tabla de climate.json (la misma matriz ``climates`` que guarda el checkpoint)"""
+    with open(CLIMATE_JSON, "r", encoding="utf-8") as f:
+        climate_data = json.load(f)
+    classes = list(climate_data)
+    climate2idx = {name: i for i, name in enumerate(CLIMATES)}
+    matrix = np.zeros((len(classes), len(CLIMATES)), dtype=np.float32)
+    for i, name in enumerate(classes):
+        for climate in climate_data[name]["climas"]:
+            matrix[i, climate2idx[climate]] = 1.0
+    categories = {name: data["categoria"] for name, data in climate_data.items()}
+    return OutfitEngine(classes, climate2idx, matrix, categories, color_weight=color_weight)
+
+
+def wardrobe(engine: OutfitEngine, per_category: int, seed: int):
+    """Closet con ``per_category`` prendas de cada categoría"""
+    rng = np.random.default_rng(seed)
+    items = []
+    for category in OUTFIT_CATEGORIES:
+        classes = [name for name, c in engine.class_categories.items() if c == category]
+        for i in range(per_category):
+            rgb = rng.integers(0, 256, size=3).tolist()
+            items.append({"id": f"{category}-{i}", "clase": classes[rng.integers(len(classes))],
+                          "categoria": category, "colores": [{"rgb": rgb}]})
+    return items
+
+
+def exhaustive(engine: OutfitEngine, items, climates, n: int) -> np.ndarray:
+    """Puntajes del top-N evaluando el producto completo (tensor superior x inferior x calzado)"""
+    groups = engine.garments(items, engine.climate_weights(climates))
+    top, bottom, shoes = (groups[c] for c in OUTFIT_CATEGORIES)
+    unary, pairwise = (1 - engine.color_weight) / 3, engine.color_weight / 3
+    scores = (unary * (top.climate[:, None, None] + bottom.climate[None, :, None] + shoes.climate[None, None, :])
+              + pairwise * (color_compatibility(top.hsv, top.known, bottom.hsv, bottom.known)[:, :, None]
+                            + color_compatibility(top.hsv, top.known, shoes.hsv, shoes.known)[:, None, :]
+                            + color_compatibility(bottom.hsv, bottom.known, shoes.hsv, shoes.known)[None, :, :]))
+    flat = scores.ravel()
+    best = np.argpartition(-flat, n - 1)[:n]
+    return np.sort(flat[best])[::-1]
+
+
+def timed(fn, repeat: int):
+    result = fn()  # calentamiento
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return result, float(np.median(samples))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", nargs="+", type=int, default=[50, 200, 500], help="prendas por categoría")
+    parser.add_argument("--n", type=int, default=5, help="outfits por respuesta")
+    parser.add_argument("--climates", nargs="+", default=["frio", "lluvia"])
+    parser.add_argument("--color-weight", type=float, default=0.3)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", help="guardar resultados en JSON")
+    args = parser.parse_args()
+
+    engine = climate_engine(args.color_weight)
+    climates = {name: 1.0 for name in args.climates}
+    results = []
+    for size in args.sizes:
+        items = wardrobe(engine, size, seed=size)
+        pruned, pruned_s = timed(lambda: engine.suggest(items, climates, args.n), args.repeat)
+        reference, full_s = timed(lambda: exhaustive(engine, items, climates, args.n), args.repeat)
+        scores = np.array([outfit["puntaje"] for outfit in pruned["outfits"]])
+
+        row = {
+            "per_category": size,
+            "combinations": pruned["combinaciones"],
+            "evaluated": pruned["evaluadas"],
+            "pruned_ms": round(1000 * pruned_s, 3),
+            "exhaustive_ms": round(1000 * full_s, 3),
+            "same_scores": bool(np.allclose(scores, reference, atol=1e-4)),
+        }
+        results.append(row)
+        print(f"{size:>5} por categoría  {row['combinations']:>11,} combinaciones  "
+              f"evaluadas {row['evaluated']:>9,} ({100 * row['evaluated'] / row['combinations']:5.1f}%)  "
+              f"poda={row['pruned_ms']:8.2f}ms  completo={row['exhaustive_ms']:9.2f}ms  "
+              f"{'mismo top-N' if row['same_scores'] else '⚠️ top-N distinto'}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"💾 Resultados guardados en {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Utilidades compartidas por los benchmarks
+"""
+
+import io
+import os
+import statistics
+import tempfile
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+import torch
+from PIL import Image
+
+
+def synthetic_image(width: int, height: int, mode: str = "RGB", seed: int = 0) -> Image.Image:
+    """Imagen sintética con una 'prenda' de color en el centro sobre fondo claro"""
+    rng = np.random.default_rng(seed)
+    pixels = np.full((height, width, 3), 235, dtype=np.uint8)
+    garment = rng.integers(0, 256, size=3, dtype=np.uint8)
+    y0, y1 = height // 5, height - height // 5
+    x0, x1 = width // 4, width - width // 4
+    noise = rng.integers(-20, 21, size=(y1 - y0, x1 - x0, 3))
+    pixels[y0:y1, x0:x1] = np.clip(garment.astype(int) + noise, 0, 255).astype(np.uint8)
+    image = Image.fromarray(pixels, "RGB")
+    if mode == "P":
+        return image.convert("P", palette=Image.ADAPTIVE)
+    return image.convert(mode) if mode != "RGB" else image
+
+
+def encode_image(image: Image.Image, fmt: str = "JPEG") -> bytes:
+    """Codificar una imagen PIL a bytes"""
+    buffer = io.BytesIO()
+    if fmt == "JPEG" and image.mode not in ("RGB", "L"):
+        image = image.convert("RGB")
+    image.save(buffer, fmt, quality=90)
+    return buffer.getvalue()
+
+
+def latency_summary(samples: List[float]) -> Dict[str, float]:
+    """Resumen en milisegundos de una lista de latencias en segundos"""
+    if not samples:
+        return {"n": 0, "p50_ms": 0.0, "p95_ms": 0.0, "p99_ms": 0.0, "mean_ms": 0.0}
+    ms = np.array(samples) * 1000
+    return {
+        "n": len(samples),
+        "p50_ms": round(float(np.percentile(ms, 50)), 3),
+        "p95_ms": round(float(np.percentile(ms, 95)), 3),
+        "p99_ms": round(float(np.percentile(ms, 99)), 3),
+        "mean_ms": round(statistics.fmean(ms), 3),
+    }
+
+
+# Climas del checkpoint entrenado (mismo orden que climate2idx)
+CHECKPOINT_CLIMATES = ("calor", "entretiempo", "frio", "frio extremo", "interior", "lluvia", "soleado", "viento")
+
+
+def synthetic_checkpoint(num_classes: int = 54, seed: int = 0) -> Dict[str, Any]:
+    """Checkpoint con las formas del entrenado y pesos aleatorios (para medir sin el .pth)"""
+    from main import CustomClothingModel
+
+    torch.manual_seed(seed)
+    model = CustomClothingModel(num_categories=num_classes, num_climates=len(CHECKPOINT_CLIMATES))
+    classes = [f"prenda_{i:02d}" for i in range(num_classes)]
+    return {
+        "classes": classes,
+        "class2idx": {name: i for i, name in enumerate(classes)},
+        "climate2idx": {name: i for i, name in enumerate(CHECKPOINT_CLIMATES)},
+        "climates": (torch.rand(num_classes, len(CHECKPOINT_CLIMATES)) > 0.7).float(),
+        "model_state_dict": model.state_dict(),
+    }
+
+
+def benchmark_checkpoint() -> Tuple[str, str]:
+    """Ruta del checkpoint a medir y su origen; sin el .pth, escribe uno aleatorio con las mismas formas"""
+    import settings
+
+    if os.path.exists(settings.CHECKPOINT_PATH):
+        return settings.CHECKPOINT_PATH, "checkpoint"
+    path = os.path.join(tempfile.mkdtemp(prefix="sw-bench-"), "synthetic.pth")
+    torch.save(synthetic_checkpoint(), path)
+    return path, "sintético"
+
+
+def load_api_model(api) -> str:
+    """Cargar el modelo de la API; sin el .pth, uno aleatorio con las mismas formas.
+
+    Devuelve ``"checkpoint"`` o ``"sintético"`` para dejarlo registrado en los resultados.
+    """
+    import settings
+
+    path, source = benchmark_checkpoint()
+    if source != "checkpoint":
+        settings.CHECKPOINT_PATH = path
+        settings.FAST_STARTUP = False
+        settings.MODEL_VERSION = "synthetic"
+    api.load_model()
+    return source
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Concordancia de los modos de precisión reducida (int8, bf16) con fp32.
+
+Ejecuta el modelo fp32 y cada modo sobre una carpeta local de imágenes y
+reporta, por modo, qué fracción de imágenes conserva la misma clase top-1,
+el mismo clima top-1 y los mismos 3 climas de ``mejor_prediccion``, junto con
+el tamaño del modelo y la latencia del forward:
+
+    python -m benchmarks.eval_precision --images ~/fotos_prendas --modes int8 bf16
+
+Termina con código 1 si algún modo queda bajo ``--min-agreement``.
+"""
+
+import argparse
+import io
+import json
+import os
+import sys
+import time
+
+import torch
+
+import main as api
+from backends import create_backend
+from benchmarks.common import latency_summary
+from preprocessing import ImagePreprocessor
+from weights import CONFIG_DIR
+
+
+def list_images(folder: str):
+    paths = []
+    for root, _, files in os.walk(folder):
+        for name in sorted(files):
+            if os.path.splitext(name)[1].lower() in api.IMAGE_EXTENSIONS:
+                paths.append(os.path.join(root, name))
+    return sorted(paths)
+
+
+def model_size_mb(backend) -> float:
+    """Tamaño del state_dict serializado (incluye los pesos int8 empaquetados)"""
+    buffer = io.BytesIO()
+    torch.save(backend.model.state_dict(), buffer)
+    return round(buffer.tell() / 1e6, 1)
+
+
+def run(backend, batches):
+    """Logits de todas las imágenes y latencia de cada forward por imagen"""
+    category, climate, samples = [], [], []
+    for pixel_values in batches:
+        started = time.perf_counter()
+        outputs = backend(pixel_values)
+        samples.append((time.perf_counter() - started) / len(pixel_values))
+        category.append(outputs["category_logits"].float())
+        climate.append(outputs["climate_logits"].float())
+    return torch.cat(category), torch.cat(climate), samples
+
+
+def compare(reference, candidate):
+    ref_category, ref_climate = reference[:2]
+    category, climate = candidate[:2]
+    top3 = min(3, ref_climate.shape[-1])
+    same_top3 = (ref_climate.topk(top3, dim=-1).indices == climate.topk(top3, dim=-1).indices).all(dim=-1)
+    confidence_delta = (ref_category.softmax(-1).max(-1).values - category.softmax(-1).max(-1).values).abs()
+    return {
+        "category_top1_agreement": round(float((ref_category.argmax(-1) == category.argmax(-1)).float().mean()), 4),
+        "climate_top1_agreement": round(float((ref_climate.argmax(-1) == climate.argmax(-1)).float().mean()), 4),
+        "climates_top3_agreement": round(float(same_top3.float().mean()), 4),
+        "max_confidence_delta": round(float(confidence_delta.max()), 4),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--images", required=True, help="carpeta con imágenes de prendas")
+    parser.add_argument("--modes", nargs="+", default=["int8", "bf16"])
+    parser.add_argument("--backend", default="eager", choices=["eager", "compile"])
+    parser.add_argument("--batch-size", type=int, default=8)
+    parser.add_argument("--limit", type=int, default=0, help="máximo de imágenes (0 = todas)")
+    parser.add_argument("--min-agreement", type=float, default=0.99,
+                        help="concordancia top-1 mínima de categoría y clima")
+    parser.add_argument("--output", help="guardar resultados en JSON")
+    args = parser.parse_args()
+
+    paths = list_images(args.images)
+    if args.limit:
+        paths = paths[:args.limit]
+    if not paths:
+        sys.exit(f"❌ No hay imágenes en {args.images}")
+
+    api.processor = ImagePreprocessor.from_config(CONFIG_DIR)
+    pixel_values = torch.cat([api.prepare_image(open(p, "rb").read()).pixel_values for p in paths])
+    batches = torch.split(pixel_values, args.batch_size)
+    print(f"🖼️ {len(paths)} imágenes en batches de {args.batch_size}")
+
+    checkpoint = api.load_checkpoint()
+    results = []
+    reference = None
+    for precision in ["fp32"] + [m for m in args.modes if m != "fp32"]:
+        backend = create_backend(args.backend, lambda: api.build_model(checkpoint), precision=precision)
+        run(backend, batches[:1])  # calentamiento
+        outputs = run(backend, batches)
+        if reference is None:
+            reference = outputs
+        summary = latency_summary(outputs[2])
+        row = {
+            "precision": precision,
+            "model_mb": model_size_mb(backend),
+            "ms_per_image": summary["mean_ms"],
+            **compare(reference, outputs),
+        }
+        results.append(row)
+        print(f"{precision:>5}: {row['model_mb']:7.1f} MB  {row['ms_per_image']:8.1f} ms/img  "
+              f"categoría {row['category_top1_agreement']:.2%}  clima {row['climate_top1_agreement']:.2%}  "
+              f"top-3 climas {row['climates_top3_agreement']:.2%}")
+        del backend
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"💾 Resultados guardados en {args.output}")
+
+    failed = [r["precision"] for r in results
+              if min(r["category_top1_agreement"], r["climate_top1_agreement"]) < args.min_agreement]
+    if failed:
+        print(f"❌ Bajo la concordancia mínima ({args.min_agreement:.2%}): {', '.join(failed)}")
+        sys.exit(1)
+    print("✅ Todos los modos superan la concordancia mínima")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,369 @@
+#!/usr/bin/env python3
+"""
+Prueba de carga en lazo cerrado contra la API levantada con uvicorn.
+
+Lanza ``uvicorn main:app`` con N workers, reenvía una carpeta de imágenes a
+``POST /predict`` con concurrencia creciente (cada cliente manda la siguiente
+petición apenas recibe la respuesta) y por nivel reporta throughput, latencia
+p50/p95/p99, tasa de errores y la memoria residente de cada proceso:
+
+    python -m benchmarks.load_test --workers 1 2 4 --concurrency 1 2 4 8 16 --images ~/fotos_prendas
+
+Sin ``--images`` se usan fotos sintéticas. La caché de predicciones se
+desactiva salvo ``--cache`` (si no, desde la segunda vuelta todo sería un
+acierto). ``--env SW_EXECUTOR=process`` pasa configuración al servidor y
+``--url`` apunta a un servidor ya levantado (sin medir memoria).
+
+La memoria se lee de ``/proc`` (Linux): RSS y PSS por proceso del árbol de
+uvicorn. PSS reparte las páginas compartidas entre los procesos que las usan,
+así que la suma de PSS es lo que realmente ocupa el pod.
+"""
+
+import argparse
+import asyncio
+import json
+import mimetypes
+import os
+import socket
+import subprocess
+import sys
+import time
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+
+from benchmarks.common import encode_image, latency_summary, synthetic_image
+
+API_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.webp', '.bmp', '.gif', '.tif', '.tiff')
+
+
+def load_payloads(folder: Optional[str], limit: int, size) -> List[Tuple[str, bytes, str]]:
+    """(nombre, bytes, content type) de las imágenes de la carpeta (recursivo) o fotos sintéticas"""
+    if not folder:
+        return [(f"sintetica_{i}.jpg", encode_image(synthetic_image(*size, seed=i)), "image/jpeg") for i in range(limit)]
+    paths = []
+    for root, _, names in os.walk(os.path.expanduser(folder)):
+        paths.extend(os.path.join(root, n) for n in sorted(names) if n.lower().endswith(IMAGE_EXTENSIONS))
+    if not paths:
+        raise SystemExit(f"❌ No hay imágenes en {folder}")
+    payloads = []
+    for path in paths[:limit]:
+        with open(path, "rb") as f:
+            content_type = mimetypes.guess_type(path)[0] or "image/jpeg"
+            payloads.append((os.path.basename(path), f.read(), content_type))
+    return payloads
+
+
+# ---------------------------------------------------------------- memoria
+
+def _children() -> Dict[int, List[int]]:
+    children: Dict[int, List[int]] = {}
+    for name in os.listdir("/proc"):
+        if not name.isdigit():
+            continue
+        try:
+            with open(f"/proc/{name}/stat", "rb") as f:
+                # El nombre del comando va entre paréntesis y puede tener espacios
+                ppid = int(f.read().rsplit(b")", 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        children.setdefault(ppid, []).append(int(name))
+    return children
+
+
+def _read_kb(path: str, field: str) -> Optional[int]:
+    try:
+        with open(path, "r") as f:
+            for line in f:
+                if line.startswith(field + ":"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def _mb(kb: Optional[int]) -> Optional[float]:
+    return round(kb / 1024, 1) if kb is not None else None
+
+
+def process_memory(root_pid: int) -> List[Dict]:
+    """RSS, PSS y USS (MB) del proceso raíz y todos sus descendientes.
+
+    USS son las páginas privadas del proceso: lo que se liberaría al matarlo.
+    """
+    children = _children()
+    pids, pending = [], [(root_pid, 0)]
+    while pending:
+        pid, depth = pending.pop()
+        pids.append((pid, depth))
+        pending.extend((child, depth + 1) for child in children.get(pid, []))
+
+    processes = []
+    for pid, depth in pids:
+        rss = _read_kb(f"/proc/{pid}/status", "VmRSS")
+        if rss is None:
+            continue  # terminó entre la búsqueda y la lectura
+        rollup = f"/proc/{pid}/smaps_rollup"
+        pss = _read_kb(rollup, "Pss")
+        private = [_read_kb(rollup, "Private_Clean"), _read_kb(rollup, "Private_Dirty")]
+        try:
+            with open(f"/proc/{pid}/cmdline", "rb") as f:
+                cmdline = f.read().replace(b"\0", b" ").decode(errors="replace").strip()
+        except OSError:
+            cmdline = ""
+        if depth == 0:
+            role = "principal"
+        elif "resource_tracker" in cmdline:
+            role = "auxiliar"
+        else:
+            # Hijos directos: workers de uvicorn o de prefork.py; más abajo, pools del executor
+            role = "worker" if depth == 1 else "hijo"
+        processes.append({
+            "pid": pid,
+            "role": role,
+            "rss_mb": _mb(rss),
+            "pss_mb": _mb(pss),
+            "uss_mb": _mb(sum(private)) if None not in private else None,
+        })
+    return processes
+
+
+def memory_summary(processes: List[Dict]) -> Dict:
+    """Totales y memoria propia media por worker (sin workers: el proceso principal atiende)"""
+    workers = [p for p in processes if p["role"] == "worker"] or [p for p in processes if p["role"] == "principal"]
+    return {
+        "processes": processes,
+        "total_rss_mb": round(sum(p["rss_mb"] for p in processes), 1),
+        "total_pss_mb": round(sum(p["pss_mb"] or 0 for p in processes), 1),
+        "worker_uss_mb": round(sum(p["uss_mb"] or 0 for p in workers) / len(workers), 1) if workers else None,
+    }
+
+
+class MemorySampler:
+    """Muestrea la memoria del árbol de procesos durante un nivel y guarda el pico por PID"""
+
+    def __init__(self, root_pid: Optional[int], interval: float = 0.5):
+        self.root_pid = root_pid
+        self.interval = interval
+        self.peak: Dict[int, Dict] = {}
+        self._task = None
+
+    async def _run(self):
+        while True:
+            for proc in await asyncio.to_thread(process_memory, self.root_pid):
+                best = self.peak.get(proc["pid"])
+                if best is None or proc["rss_mb"] > best["rss_mb"]:
+                    self.peak[proc["pid"]] = proc
+            await asyncio.sleep(self.interval)
+
+    def __enter__(self):
+        if self.root_pid is not None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+        return self
+
+    def __exit__(self, *exc):
+        if self._task is not None:
+            self._task.cancel()
+        return False
+
+    def summary(self) -> Dict:
+        return memory_summary(sorted(self.peak.values(), key=lambda p: p["pid"]))
+
+
+# ---------------------------------------------------------------- servidor
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+LAUNCHERS = {
+    # Cada worker carga su propia copia del modelo
+    "uvicorn": [sys.executable, "-m", "uvicorn", "main:app"],
+    # El padre carga el modelo y los workers lo comparten (prefork.py)
+    "prefork": [sys.executable, "prefork.py"],
+}
+
+
+def start_server(launcher: str, workers: int, port: int, env: Dict[str, str]) -> subprocess.Popen:
+    command = LAUNCHERS[launcher] + [
+        "--host", "127.0.0.1", "--port", str(port),
+        "--workers", str(workers), "--log-level", "warning",
+    ]
+    return subprocess.Popen(command, cwd=API_DIR, env={**os.environ, **env})
+
+
+def wait_ready(url: str, server: subprocess.Popen, timeout: float) -> float:
+    """Esperar a que /health responda con el modelo cargado; devuelve los segundos de arranque"""
+    started = time.perf_counter()
+    while time.perf_counter() - started < timeout:
+        if server.poll() is not None:
+            raise SystemExit(f"❌ uvicorn terminó con código {server.returncode}")
+        try:
+            if httpx.get(f"{url}/health", timeout=2).json().get("model_loaded"):
+                return time.perf_counter() - started
+        except (httpx.HTTPError, ValueError):
+            pass
+        time.sleep(0.5)
+    raise SystemExit(f"❌ La API no respondió en {timeout:.0f}s")
+
+
+def wait_memory_stable(pid: int, timeout: float = 120.0) -> List[Dict]:
+    """Esperar a que todos los workers terminen de cargar (RSS total estable por 2 s)"""
+    deadline = time.perf_counter() + timeout
+    previous = process_memory(pid)
+    while time.perf_counter() < deadline:
+        time.sleep(2)
+        current = process_memory(pid)
+        before, after = sum(p["rss_mb"] for p in previous), sum(p["rss_mb"] for p in current)
+        if len(current) == len(previous) and abs(after - before) <= 0.01 * before:
+            return current
+        previous = current
+    return previous
+
+
+def stop_server(server: subprocess.Popen):
+    server.terminate()
+    try:
+        server.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        server.kill()
+        server.wait()
+
+
+# ---------------------------------------------------------------- carga
+
+async def run_level(client: httpx.AsyncClient, payloads: List[Tuple[str, bytes, str]], concurrency: int,
+                    duration: float, min_requests: int, memory_pid: Optional[int]) -> Dict:
+    """Lazo cerrado: ``concurrency`` clientes hasta cumplir la duración y un mínimo de peticiones"""
+    latencies, errors = [], []
+    sent = 0
+    deadline = time.perf_counter() + duration
+
+    async def client_loop():
+        nonlocal sent
+        while time.perf_counter() < deadline or sent < min_requests:
+            i = sent
+            sent += 1
+            started = time.perf_counter()
+            try:
+                response = await client.post("/predict", files={"file": payloads[i % len(payloads)]})
+                if response.status_code == 200:
+                    latencies.append(time.perf_counter() - started)
+                else:
+                    errors.append(str(response.status_code))
+            except httpx.HTTPError as e:
+                errors.append(type(e).__name__)
+
+    with MemorySampler(memory_pid) as sampler:
+        started = time.perf_counter()
+        await asyncio.gather(*(client_loop() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    total = len(latencies) + len(errors)
+    result = {
+        "concurrency": concurrency,
+        "requests": total,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(len(latencies) / elapsed, 3),
+        "error_rate": round(len(errors) / total, 4) if total else 0.0,
+        "errors": {code: errors.count(code) for code in sorted(set(errors))},
+        "latency": latency_summary(latencies),
+    }
+    if memory_pid is not None:
+        result["memory"] = sampler.summary()
+    return result
+
+
+async def run_workers(url: str, payloads: List[Tuple[str, bytes, str]], args, memory_pid: Optional[int]) -> List[Dict]:
+    levels = []
+    async with httpx.AsyncClient(base_url=url, timeout=args.timeout,
+                                 limits=httpx.Limits(max_connections=max(args.concurrency))) as client:
+        # Calentamiento: una petición por worker como mínimo
+        await run_level(client, payloads, max(1, args.warmup), 0, max(1, args.warmup), None)
+        for concurrency in args.concurrency:
+            level = await run_level(client, payloads, concurrency, args.duration, concurrency, memory_pid)
+            levels.append(level)
+            memory = level.get("memory")
+            memory_text = (f"  RSS {memory['total_rss_mb']:.0f} MB / PSS {memory['total_pss_mb']:.0f} MB, "
+                           f"USS/worker {memory['worker_uss_mb']:.0f} MB") if memory else ""
+            print(f"  c={concurrency:<3} {level['throughput_rps']:7.2f} req/s  "
+                  f"p50 {level['latency']['p50_ms']:7.0f} ms  p95 {level['latency']['p95_ms']:7.0f} ms  "
+                  f"p99 {level['latency']['p99_ms']:7.0f} ms  errores {level['error_rate']:.1%}{memory_text}")
+    return levels
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", nargs="+", type=int, default=[1], help="cantidades de workers a probar")
+    parser.add_argument("--launchers", nargs="+", choices=sorted(LAUNCHERS), default=["uvicorn"],
+                        help="uvicorn --workers (modelo por worker) o prefork.py (modelo compartido)")
+    parser.add_argument("--concurrency", nargs="+", type=int, default=[1, 2, 4, 8, 16])
+    parser.add_argument("--duration", type=float, default=20.0, help="segundos por nivel de concurrencia")
+    parser.add_argument("--warmup", type=int, default=4, help="peticiones de calentamiento")
+    parser.add_argument("--images", help="carpeta de imágenes a reenviar (por defecto, sintéticas)")
+    parser.add_argument("--limit", type=int, default=64, help="máximo de imágenes distintas")
+    parser.add_argument("--size", type=int, nargs=2, default=[1024, 768], metavar=("W", "H"))
+    parser.add_argument("--cache", action="store_true", help="dejar activa la caché de predicciones")
+    parser.add_argument("--env", action="append", default=[], metavar="CLAVE=VALOR",
+                        help="variables de entorno para el servidor (repetible)")
+    parser.add_argument("--url", help="usar un servidor ya levantado en vez de lanzar uvicorn")
+    parser.add_argument("--startup-timeout", type=float, default=300.0)
+    parser.add_argument("--timeout", type=float, default=120.0, help="timeout por petición")
+    parser.add_argument("--output", help="guardar resultados en JSON")
+    args = parser.parse_args()
+
+    payloads = load_payloads(args.images, args.limit, args.size)
+    env = {"SW_CACHE_ENABLED": "1" if args.cache else "0"}
+    env.update(item.split("=", 1) for item in args.env)
+    print(f"📦 {len(payloads)} imágenes, {sum(len(data) for _, data, _ in payloads) / 1e6:.1f} MB; servidor con {env}")
+
+    runs = []
+    configs = [(None, None)] if args.url else [(l, w) for l in args.launchers for w in args.workers]
+    for launcher, workers in configs:
+        server, memory_pid, startup_s, idle = None, None, None, None
+        url = args.url
+        if url is None:
+            port = free_port()
+            url = f"http://127.0.0.1:{port}"
+            server = start_server(launcher, workers, port, env)
+            memory_pid = server.pid
+        try:
+            if server is not None:
+                startup_s = wait_ready(url, server, args.startup_timeout)
+                idle = memory_summary(wait_memory_stable(memory_pid))
+                print(f"🚀 {launcher} con {workers} worker(s) listo en {startup_s:.1f}s; en reposo "
+                      f"RSS {idle['total_rss_mb']:.0f} MB / PSS {idle['total_pss_mb']:.0f} MB, "
+                      f"USS/worker {idle['worker_uss_mb']:.0f} MB")
+            levels = asyncio.run(run_workers(url, payloads, args, memory_pid))
+        finally:
+            if server is not None:
+                stop_server(server)
+
+        best = max(levels, key=lambda level: level["throughput_rps"])
+        print(f"🏁 Saturación: {best['throughput_rps']:.2f} req/s con concurrencia {best['concurrency']}")
+        runs.append({
+            "launcher": launcher,
+            "workers": workers,
+            "startup_s": round(startup_s, 2) if startup_s is not None else None,
+            "idle_memory": idle,
+            "saturation": {"concurrency": best["concurrency"], "throughput_rps": best["throughput_rps"]},
+            "levels": levels,
+        })
+
+    if len({run["launcher"] for run in runs}) > 1:
+        print("📊 Memoria propia por worker en reposo (USS) y total del pod (PSS):")
+        for run in runs:
+            print(f"  {run['launcher']:>8} x{run['workers']}: USS/worker {run['idle_memory']['worker_uss_mb']:7.0f} MB  "
+                  f"PSS total {run['idle_memory']['total_pss_mb']:7.0f} MB")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"env": env, "images": len(payloads), "runs": runs}, f, indent=2)
+        print(f"💾 Resultados guardados en {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Barrido de presupuestos de hilos: ¿cuántas inferencias simultáneas y con
+cuántos hilos cada una?
+
+Para cada combinación ``slots x hilos`` lanza ``slots`` procesos con el
+presupuesto aplicado (``SW_INFERENCE_SLOTS`` / ``SW_THREADS_PER_SLOT``), los
+arranca a la vez y durante ``--duration`` segundos cada uno predice imágenes
+completas (decodificación, modelo y colores) sin pausa. Reporta el throughput
+total y la latencia, y recomienda la combinación con más imágenes por segundo:
+
+    python -m benchmarks.tune_threads --duration 20 --images ~/fotos_prendas
+
+También mide las combinaciones sobresuscritas (cada slot con todos los
+núcleos, lo que pasaba antes del presupuesto) como referencia; ``--no-baseline``
+las omite. ``--cores`` simula un pod con menos núcleos que el host.
+"""
+
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import time
+from typing import Dict, List, Tuple
+
+from benchmarks.common import benchmark_checkpoint, latency_summary
+from benchmarks.load_test import load_payloads
+from threads import available_cores
+
+
+def candidate_budgets(cores: int, baseline: bool) -> List[Tuple[int, int]]:
+    """Combinaciones (slots, hilos): potencias de 2 y divisores que usan todos los núcleos"""
+    slots_options = sorted({s for s in range(1, cores + 1) if cores % s == 0 or s & (s - 1) == 0})
+    budgets = [(slots, max(1, cores // slots)) for slots in slots_options]
+    if baseline:
+        budgets += [(slots, cores) for slots in slots_options if slots > 1 and cores // slots != cores]
+    return budgets
+
+
+def slot_worker(env: Dict[str, str], payloads, duration: float, barrier, results):
+    """Un slot: cargar el modelo con el presupuesto, esperar a los demás y predecir sin pausa"""
+    os.environ.update(env)
+    import main as api
+
+    api.load_model()
+    logging.disable(logging.INFO)
+    api.predict_image_bytes(payloads[0][1])  # calentamiento
+    barrier.wait()
+
+    latencies = []
+    deadline = time.perf_counter() + duration
+    i = 0
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        api.predict_image_bytes(payloads[i % len(payloads)][1])
+        latencies.append(time.perf_counter() - started)
+        i += 1
+    results.put(latencies)
+
+
+def measure(slots: int, threads: int, cores: int, checkpoint: str, payloads, duration: float) -> Dict:
+    ctx = multiprocessing.get_context("spawn")
+    barrier = ctx.Barrier(slots)
+    results = ctx.Queue()
+    env = {
+        "SW_CHECKPOINT_PATH": checkpoint,
+        "SW_EXECUTOR": "inline",
+        "SW_CPU_CORES": str(cores),
+        "SW_INFERENCE_SLOTS": str(slots),
+        "SW_THREADS_PER_SLOT": str(threads),
+        "HF_HUB_OFFLINE": "1",
+    }
+    processes = [ctx.Process(target=slot_worker, args=(env, payloads, duration, barrier, results))
+                 for _ in range(slots)]
+    for process in processes:
+        process.start()
+    latencies = []
+    for _ in processes:
+        latencies.extend(results.get())
+    for process in processes:
+        process.join()
+        if process.exitcode != 0:
+            raise SystemExit(f"❌ Un slot terminó con código {process.exitcode}")
+
+    return {
+        "slots": slots,
+        "threads": threads,
+        "oversubscribed": slots * threads > cores,
+        "throughput_ips": round(len(latencies) / duration, 3),
+        "latency": latency_summary(latencies),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cores", type=int, default=0, help="núcleos a repartir (0 = detectar)")
+    parser.add_argument("--duration", type=float, default=15.0, help="segundos por combinación")
+    parser.add_argument("--images", help="carpeta de imágenes (por defecto, sintéticas)")
+    parser.add_argument("--limit", type=int, default=16)
+    parser.add_argument("--size", type=int, nargs=2, default=[1024, 768], metavar=("W", "H"))
+    parser.add_argument("--no-baseline", action="store_true", help="no medir combinaciones sobresuscritas")
+    parser.add_argument("--output", help="guardar resultados en JSON")
+    args = parser.parse_args()
+
+    cores = args.cores or available_cores()
+    checkpoint, source = benchmark_checkpoint()
+    payloads = load_payloads(args.images, args.limit, args.size)
+    budgets = candidate_budgets(cores, not args.no_baseline)
+    print(f"🧮 {cores} núcleos, modelo {source}, {len(budgets)} combinaciones de {args.duration:.0f}s")
+
+    results = []
+    for slots, threads in budgets:
+        row = measure(slots, threads, cores, checkpoint, payloads, args.duration)
+        results.append(row)
+        print(f"  {slots:>3} slots x {threads:>3} hilos{' (sobresuscrito)' if row['oversubscribed'] else '':<16} "
+              f"{row['throughput_ips']:7.2f} img/s  p50 {row['latency']['p50_ms']:7.0f} ms  "
+              f"p99 {row['latency']['p99_ms']:7.0f} ms")
+
+    budgeted = [row for row in results if not row["oversubscribed"]]
+    best = max(budgeted, key=lambda row: row["throughput_ips"])
+    fastest = min(budgeted, key=lambda row: row["latency"]["p50_ms"])
+    print(f"✅ Mayor throughput: {best['slots']} slots x {best['threads']} hilos ({best['throughput_ips']:.2f} img/s)")
+    print(f"   SW_INFERENCE_SLOTS={best['slots']} SW_THREADS_PER_SLOT={best['threads']}  "
+          f"→ python prefork.py --workers {best['slots']}  o  SW_EXECUTOR=process SW_WORKERS={best['slots']}")
+    if fastest is not best:
+        print(f"⚡ Menor latencia p50: {fastest['slots']} slots x {fastest['threads']} hilos "
+              f"({fastest['latency']['p50_ms']:.0f} ms)")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"cores": cores, "model": source, "results": results,
+                       "recommended": {"slots": best["slots"], "threads": best["threads"]}}, f, indent=2)
+        print(f"💾 Resultados guardados en {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+"""
+Caché de predicciones direccionada por contenido.
+
+La clave es un hash de los bytes de la imagen más la versión del modelo, así
+que una misma foto subida varias veces (reintentos, ediciones, re-sync) solo
+paga una vez el forward del ViT y el cálculo de colores.
+
+- Nivel en memoria: LRU acotado con TTL.
+- Nivel en disco (opcional): un JSON por clave, sobrevive reinicios.
+- Single-flight: subidas idénticas simultáneas comparten un único cálculo.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def content_key(image_data: bytes, model_version: str) -> str:
+    """Clave de caché: hash de los bytes de la imagen y la versión del modelo"""
+    digest = hashlib.blake2b(digest_size=20)
+    digest.update(model_version.encode("utf-8"))
+    digest.update(b"\0")
+    digest.update(image_data)
+    return digest.hexdigest()
+
+
+class PredictionCache:
+    """LRU en memoria con TTL, nivel opcional en disco y deduplicación en vuelo"""
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: float = 3600.0,
+                 disk_dir: Optional[str] = None, disk_ttl_seconds: float = 7 * 24 * 3600.0,
+                 disk_max_entries: int = 100_000):
+        self.max_entries = max(1, max_entries)
+        self.ttl = ttl_seconds
+        self.disk_dir = disk_dir or None
+        self.disk_ttl = disk_ttl_seconds
+        self.disk_max_entries = disk_max_entries
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._disk_writes = 0
+        self.counters = {
+            "hits": 0,
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "coalesced": 0,
+            "evictions": 0,
+            "expirations": 0,
+            "errors": 0,
+        }
+        if self.disk_dir:
+            os.makedirs(self.disk_dir, exist_ok=True)
+
+    # Nivel en memoria -------------------------------------------------------
+
+    def _memory_get(self, key: str) -> Optional[str]:
+        entry = self._memory.get(key)
+        if entry is None:
+            return None
+        expires_at, payload = entry
+        if expires_at < time.monotonic():
+            del self._memory[key]
+            self.counters["expirations"] += 1
+            return None
+        self._memory.move_to_end(key)
+        return payload
+
+    def _memory_put(self, key: str, payload: str):
+        self._memory[key] = (time.monotonic() + self.ttl, payload)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self.counters["evictions"] += 1
+
+    # Nivel en disco ---------------------------------------------------------
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, key[:2], f"{key}.json")
+
+    def _disk_get(self, key: str) -> Optional[str]:
+        path = self._disk_path(key)
+        try:
+            if time.time() - os.path.getmtime(path) > self.disk_ttl:
+                os.remove(path)
+                self.counters["expirations"] += 1
+                return None
+            with open(path, "r", encoding="utf-8") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+        except OSError as e:
+            logger.warning(f"⚠️ Error leyendo caché en disco: {e}")
+            return None
+
+    def _disk_put(self, key: str, payload: str):
+        path = self._disk_path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(payload)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"⚠️ Error escribiendo caché en disco: {e}")
+            return
+
+        self._disk_writes += 1
+        if self._disk_writes % 100 == 0:
+            self._prune_disk()
+
+    def _prune_disk(self):
+        """Borrar las entradas más antiguas si el disco supera el máximo"""
+        entries = []
+        for root, _, files in os.walk(self.disk_dir):
+            for name in files:
+                if name.endswith(".json"):
+                    path = os.path.join(root, name)
+                    try:
+                        entries.append((os.path.getmtime(path), path))
+                    except OSError:
+                        pass
+        excess = len(entries) - self.disk_max_entries
+        if excess <= 0:
+            return
+        entries.sort()
+        for _, path in entries[:excess]:
+            try:
+                os.remove(path)
+                self.counters["evictions"] += 1
+            except OSError:
+                pass
+
+    # API pública ------------------------------------------------------------
+
+    def __len__(self) -> int:
+        return len(self._memory)
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Buscar en memoria y luego en disco; None si no está"""
+        payload = self._memory_get(key)
+        if payload is not None:
+            self.counters["hits"] += 1
+            self.counters["memory_hits"] += 1
+            return json.loads(payload)
+
+        if self.disk_dir:
+            payload = await asyncio.to_thread(self._disk_get, key)
+            if payload is not None:
+                self.counters["hits"] += 1
+                self.counters["disk_hits"] += 1
+                self._memory_put(key, payload)
+                return json.loads(payload)
+        return None
+
+    async def put(self, key: str, value: Dict[str, Any]):
+        await self._put_payload(key, json.dumps(value, ensure_ascii=False))
+
+    async def _put_payload(self, key: str, payload: str):
+        self._memory_put(key, payload)
+        if self.disk_dir:
+            await asyncio.to_thread(self._disk_put, key, payload)
+
+    async def _fill(self, key: str, compute: Callable[[], Awaitable[Dict[str, Any]]]) -> str:
+        try:
+            payload = json.dumps(await compute(), ensure_ascii=False)
+            await self._put_payload(key, payload)
+            return payload
+        except Exception:
+            self.counters["errors"] += 1
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+    async def get_or_compute(self, key: str, compute: Callable[[], Awaitable[Dict[str, Any]]]) -> Dict[str, Any]:
+        """Devolver el valor cacheado o calcularlo una sola vez aunque haya llamadas simultáneas"""
+        cached = await self.get(key)
+        if cached is not None:
+            return cached
+
+        task = self._inflight.get(key)
+        if task is None:
+            self.counters["misses"] += 1
+            task = asyncio.ensure_future(self._fill(key, compute))
+            # Recuperar la excepción aunque todos los llamadores se hayan cancelado
+            task.add_done_callback(lambda t: t.cancelled() or t.exception())
+            self._inflight[key] = task
+        else:
+            self.counters["coalesced"] += 1
+
+        # shield: si un llamador se cancela, el cálculo compartido sigue para los demás
+        return json.loads(await asyncio.shield(task))
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.counters["hits"] + self.counters["misses"] + self.counters["coalesced"]
+        return {
+            **self.counters,
+            "hit_rate": round((self.counters["hits"] + self.counters["coalesced"]) / lookups, 4) if lookups else 0.0,
+            "entries": len(self._memory),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl,
+            "inflight": len(self._inflight),
+            "disk_enabled": bool(self.disk_dir),
+        }
@@ -0,0 +1,213 @@
+"""
+Nombres de colores en español a velocidad de NumPy.
+
+Al importar el módulo se construye un índice de 32K celdas (RGB cuantizado a
+5 bits por canal, un ``uint8`` por celda) que guarda el nombre de cada celda
+cuando todos sus 512 colores comparten nombre. Las celdas que cruzan un
+umbral (por ejemplo el eje de grises o el límite rojo/naranja) quedan marcadas
+como mixtas y sus colores se resuelven con una réplica vectorizada y exacta
+de ``colorsys.rgb_to_hsv``.
+
+El resultado coincide exactamente con ``reference_color_name`` (la
+implementación original con ``colorsys`` y if/elif) para todo color RGB de
+8 bits.
+"""
+
+import colorsys
+from typing import Dict, List, Sequence
+
+import numpy as np
+
+COLOR_NAMES = (
+    "negro", "blanco", "gris oscuro", "gris", "gris claro",
+    "rojo", "naranja", "amarillo", "verde", "azul", "morado", "rosa",
+)
+NEGRO, BLANCO, GRIS_OSCURO, GRIS, GRIS_CLARO, ROJO = range(6)
+
+# Límites de tono (grados) y el nombre que corresponde a h < límite
+HUE_EDGES = np.array([15.0, 45.0, 75.0, 150.0, 210.0, 270.0, 330.0, 345.0])
+HUE_NAMES = np.array([ROJO, 6, 7, 8, 9, 10, 11, ROJO, ROJO], dtype=np.uint8)
+
+CELL_BITS = 5
+MIXED = 255
+
+
+def reference_color_name(rgb) -> str:
+    """Convertir RGB a nombre de color en español (implementación original, una llamada por color)"""
+    r, g, b = rgb
+
+    # Convertir a HSV para mejor análisis
+    h, s, v = colorsys.rgb_to_hsv(r/255.0, g/255.0, b/255.0)
+    h = h * 360  # Convertir a grados
+    s = s * 100  # Convertir a porcentaje
+    v = v * 100  # Convertir a porcentaje
+
+    # Definir rangos de colores
+    if v < 20:
+        return "negro"
+    elif v > 80 and s < 20:
+        return "blanco"
+    elif s < 20:
+        if v < 40:
+            return "gris oscuro"
+        elif v < 70:
+            return "gris"
+        else:
+            return "gris claro"
+
+    # Colores con saturación
+    if h < 15 or h >= 345:
+        return "rojo"
+    elif h < 45:
+        return "naranja"
+    elif h < 75:
+        return "amarillo"
+    elif h < 150:
+        return "verde"
+    elif h < 210:
+        return "azul"
+    elif h < 270:
+        return "morado"
+    elif h < 330:
+        return "rosa"
+    else:
+        return "rojo"
+
+
+def _hsv_degrees(rgb: np.ndarray):
+    """Réplica vectorizada de colorsys.rgb_to_hsv con las mismas operaciones en float64"""
+    rgb = rgb.astype(np.float64) / 255.0
+    r, g, b = rgb[..., 0], rgb[..., 1], rgb[..., 2]
+    maxc = rgb.max(axis=-1)
+    minc = rgb.min(axis=-1)
+    rangec = maxc - minc
+    gray = rangec == 0
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        s = np.where(gray, 0.0, rangec / maxc)
+        rc = (maxc - r) / rangec
+        gc = (maxc - g) / rangec
+        bc = (maxc - b) / rangec
+        h = np.where(r == maxc, bc - gc, np.where(g == maxc, 2.0 + rc - bc, 4.0 + gc - rc))
+    h = np.where(gray, 0.0, np.remainder(h / 6.0, 1.0))
+
+    return h * 360, s * 100, maxc * 100
+
+
+def _names_from_hsv(h: np.ndarray, s: np.ndarray, v: np.ndarray) -> np.ndarray:
+    names = HUE_NAMES[np.searchsorted(HUE_EDGES, h, side="right")]
+    gray_level = np.where(v < 40, GRIS_OSCURO, np.where(v < 70, GRIS, GRIS_CLARO))
+    names = np.where(s < 20, gray_level, names)
+    names = np.where((v > 80) & (s < 20), BLANCO, names)
+    names = np.where(v < 20, NEGRO, names)
+    return names.astype(np.uint8)
+
+
+def exact_name_indices(rgb: np.ndarray) -> np.ndarray:
+    """Índices en COLOR_NAMES calculados color por color (sin tabla)"""
+    rgb = np.asarray(rgb).reshape(-1, 3)
+    return _names_from_hsv(*_hsv_degrees(rgb))
+
+
+def _build_cell_table() -> np.ndarray:
+    """Nombre de cada celda de 8x8x8 colores, o MIXED si no es uniforme.
+
+    Una celda solo se marca uniforme si se puede garantizar para todo su
+    interior: V = max(r, g, b) es monótono, {S < 20} es convexo, y con un orden
+    estricto de canales S y H son funciones lineal-fraccionales, así que sus
+    extremos están en las 8 esquinas. Se exige además un margen respecto de
+    cada umbral para que el redondeo en float no cambie la decisión.
+    """
+    eps = 1e-6
+    width = 1 << (8 - CELL_BITS)
+    steps = np.arange(1 << CELL_BITS) * width
+    lo = np.stack(np.meshgrid(steps, steps, steps, indexing="ij"), axis=-1).reshape(-1, 3)
+    hi = lo + (width - 1)
+
+    offsets = np.array([[i >> 2 & 1, i >> 1 & 1, i & 1] for i in range(8)]) * (width - 1)
+    corners = lo[:, None, :] + offsets[None, :, :]  # (celdas, 8, 3)
+    h, s, v = _hsv_degrees(corners)
+    names = _names_from_hsv(h, s, v)
+    table = np.where((names == names[:, :1]).all(axis=1), names[:, 0], MIXED).astype(np.uint8)
+
+    # V: mínimo en la esquina baja, máximo en la alta
+    v_min = lo.max(axis=1) / 255.0 * 100
+    v_max = hi.max(axis=1) / 255.0 * 100
+
+    def v_clear(threshold):
+        return (v_max < threshold - eps) | (v_min > threshold + eps)
+
+    all_negro = v_max < 20 - eps
+    gray_everywhere = (s < 20 - eps).all(axis=1)  # convexo: basta con las esquinas
+
+    # Orden estricto de canales dentro de la celda (sin cruzar r=g, g=b ni r=b)
+    strict = ((lo[:, [0, 1, 2]] > hi[:, [1, 2, 0]]) | (hi[:, [0, 1, 2]] < lo[:, [1, 2, 0]])).all(axis=1)
+    saturated_everywhere = strict & (s > 20 + eps).all(axis=1)
+    hue_lo, hue_hi = h.min(axis=1), h.max(axis=1)
+    hue_clear = ~((HUE_EDGES[None, :] >= hue_lo[:, None] - eps) &
+                  (HUE_EDGES[None, :] <= hue_hi[:, None] + eps)).any(axis=1)
+
+    certified = (
+        all_negro
+        | (v_clear(20) & gray_everywhere & v_clear(40) & v_clear(70) & v_clear(80))
+        | (v_clear(20) & saturated_everywhere & hue_clear)
+    )
+    table[~certified] = MIXED
+    return table
+
+
+_CELL_TABLE = _build_cell_table()
+_SHIFT = 8 - CELL_BITS
+
+
+def name_indices(rgb) -> np.ndarray:
+    """Índices en COLOR_NAMES para un arreglo de colores RGB (..., 3) en 0-255"""
+    rgb = np.clip(np.asarray(rgb), 0, 255).astype(np.uint8).reshape(-1, 3)
+    cells = ((rgb[:, 0].astype(np.intp) >> _SHIFT) << (2 * CELL_BITS)) \
+        | ((rgb[:, 1].astype(np.intp) >> _SHIFT) << CELL_BITS) \
+        | (rgb[:, 2].astype(np.intp) >> _SHIFT)
+    indices = _CELL_TABLE[cells]
+    mixed = indices == MIXED
+    if mixed.any():
+        indices[mixed] = exact_name_indices(rgb[mixed])
+    return indices
+
+
+def color_names(rgb) -> List[str]:
+    """Nombres en español para un arreglo de colores RGB"""
+    return [COLOR_NAMES[i] for i in name_indices(rgb)]
+
+
+def color_name(rgb: Sequence[int]) -> str:
+    """Nombre en español de un solo color RGB"""
+    return COLOR_NAMES[name_indices(rgb)[0]]
+
+
+def name_histogram(rgb, weights=None) -> Dict[str, float]:
+    """Fracción de cada nombre de color en un conjunto de colores (p. ej. los píxeles o un guardarropa)"""
+    counts = np.bincount(name_indices(rgb), weights=weights, minlength=len(COLOR_NAMES))
+    total = counts.sum()
+    if total == 0:
+        return {}
+    return {COLOR_NAMES[i]: round(float(c / total), 4) for i, c in enumerate(counts) if c > 0}
+
+
+def verify() -> int:
+    """Comparar la tabla con la implementación original para los 16.7M colores RGB"""
+    codes = np.arange(1 << 24, dtype=np.uint32)
+    rgb = np.stack([(codes >> 16) & 255, (codes >> 8) & 255, codes & 255], axis=-1).astype(np.uint8)
+    fast = name_indices(rgb)
+    index_of = {name: i for i, name in enumerate(COLOR_NAMES)}
+    mismatches = 0
+    for code in range(1 << 24):
+        color = (code >> 16, (code >> 8) & 255, code & 255)
+        if index_of[reference_color_name(color)] != fast[code]:
+            mismatches += 1
+    return mismatches
+
+
+if __name__ == "__main__":
+    print(f"🎨 Celdas mixtas: {int((_CELL_TABLE == MIXED).sum())} de {len(_CELL_TABLE)}")
+    print("🔍 Verificando los 16.7M colores contra la implementación original (tarda ~1 min)...")
+    errors = verify()
+    print("✅ Coinciden todos los colores" if errors == 0 else f"❌ {errors} colores distintos")
@@ -0,0 +1,146 @@
+"""
+Hash perceptual de las fotos y búsqueda de casi duplicados.
+
+``phash`` resume una imagen en 64 bits: se reduce a 32x32 en escala de
+grises, se toma la DCT y cada bit dice si uno de los 8x8 coeficientes de baja
+frecuencia supera la mediana. Las recompresiones, los cambios de tamaño y
+los recortes o ángulos leves cambian pocos bits. Dos fotos de la misma prenda
+quedan a poca distancia de Hamming; dos prendas distintas, cerca de 32.
+
+``HashIndex`` busca los hashes a distancia <= ``max_distance`` sin recorrer
+todos (multi-index hashing): el hash se parte en ``max_distance + 1`` trozos y,
+por el principio del palomar, cualquier hash a esa distancia coincide
+exactamente en al menos un trozo. Cada trozo tiene su tabla valor -> filas,
+así que una consulta mira solo las filas de ``max_distance + 1`` cubetas y
+calcula la distancia exacta de esas con un popcount vectorizado.
+"""
+
+from typing import List, Tuple
+
+import cv2
+import numpy as np
+from PIL import Image
+
+# off: no buscar; flag: marcar los duplicados en la respuesta; skip: no clasificarlos
+DEDUP_MODES = ("off", "flag", "skip")
+
+HASH_BITS = 64
+HASH_SIZE = 8      # coeficientes DCT por lado que entran al hash (8x8 = 64 bits)
+SAMPLE_SIZE = 32   # lado de la imagen en grises antes de la DCT
+
+
+def phash(image: Image.Image) -> int:
+    """Hash perceptual de 64 bits de una imagen PIL"""
+    # BOX promedia todos los píxeles de cada celda: estable ante recompresión y ruido
+    gray = image.convert("L") if image.width * image.height <= 4 * SAMPLE_SIZE ** 2 else \
+        image.resize((SAMPLE_SIZE * 4, SAMPLE_SIZE * 4), Image.BOX).convert("L")
+    gray = gray.resize((SAMPLE_SIZE, SAMPLE_SIZE), Image.BOX)
+    coefficients = cv2.dct(np.asarray(gray, dtype=np.float32))[:HASH_SIZE, :HASH_SIZE].reshape(-1)
+    # La mediana sin el término DC (el brillo medio) para que no desplace el umbral
+    bits = coefficients > np.median(coefficients[1:])
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+def hash_hex(value: int) -> str:
+    return f"{value:016x}"
+
+
+def parse_hash(value: str) -> int:
+    """Hash de 16 dígitos hexadecimales (como lo devuelve /predict)"""
+    if not isinstance(value, str) or len(value) != HASH_BITS // 4:
+        raise ValueError(f"Hash inválido: {value!r}")
+    return int(value, 16)
+
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+if hasattr(np, "bitwise_count"):
+    def popcount(values: np.ndarray) -> np.ndarray:
+        """Bits en 1 de cada uint64"""
+        return np.bitwise_count(values).astype(np.int64)
+else:  # NumPy < 2.0
+    _BYTE_BITS = np.array([bin(i).count("1") for i in range(256)], dtype=np.int64)
+
+    def popcount(values: np.ndarray) -> np.ndarray:
+        """Bits en 1 de cada uint64"""
+        return _BYTE_BITS[np.ascontiguousarray(values, dtype=np.uint64).view(np.uint8)].reshape(-1, 8).sum(axis=1)
+
+
+class HashIndex:
+    """Hashes de 64 bits por fila, con búsqueda por distancia de Hamming (multi-index hashing).
+
+    Cada trozo guarda sus valores ordenados junto con la fila de cada uno: la
+    cubeta de un valor es un rango contiguo que se encuentra con
+    ``searchsorted``. Las filas agregadas después de ordenar se comparan
+    todas hasta que la cola crece un ``REBUILD_GROWTH`` y se vuelve a ordenar.
+    """
+
+    REBUILD_GROWTH = 0.2
+    MIN_TAIL = 1024
+
+    def __init__(self, max_distance: int = 8):
+        if not 0 <= max_distance < HASH_BITS:
+            raise ValueError(f"max_distance debe estar entre 0 y {HASH_BITS - 1}")
+        self.max_distance = max_distance
+        chunks = max_distance + 1
+        # Trozos de tamaño lo más parejo posible: (desplazamiento, máscara)
+        widths = [HASH_BITS // chunks + (i < HASH_BITS % chunks) for i in range(chunks)]
+        offsets = np.cumsum([0] + widths[:-1])
+        self.chunks = [(np.uint64(offset), np.uint64((1 << width) - 1)) for offset, width in zip(offsets, widths)]
+        self.values = np.zeros(0, dtype=np.uint64)
+        self.alive = np.zeros(0, dtype=bool)
+        self.size = 0      # filas usadas (las filas se agregan en orden y no se reutilizan)
+        self.indexed = 0   # filas incluidas en las tablas ordenadas
+        self.tables: List[Tuple[np.ndarray, np.ndarray]] = []  # por trozo: (valores ordenados, filas)
+
+    def __len__(self) -> int:
+        return int(self.alive[:self.size].sum())
+
+    def add(self, row: int, value: int):
+        if row >= len(self.values):
+            capacity = max(1024, 2 * len(self.values), row + 1)
+            self.values = np.resize(self.values, capacity)
+            self.alive = np.concatenate([self.alive, np.zeros(capacity - len(self.alive), dtype=bool)])
+        if row < self.indexed:
+            self.indexed = 0  # una fila ya ordenada cambió de valor: reordenar en la próxima consulta
+        self.values[row] = value
+        self.alive[row] = True
+        self.size = max(self.size, row + 1)
+
+    def remove(self, row: int):
+        if row < self.size:
+            self.alive[row] = False
+
+    def _rebuild(self):
+        values = self.values[:self.size]
+        self.tables = []
+        for offset, mask in self.chunks:
+            keys = (values >> offset) & mask
+            order = np.argsort(keys, kind="stable")
+            self.tables.append((keys[order], order))
+        self.indexed = self.size
+
+    def query(self, value: int, max_distance: int = None) -> List[Tuple[int, int]]:
+        """Filas a distancia <= ``max_distance`` (por defecto la del índice), de la más cercana a la más lejana"""
+        max_distance = self.max_distance if max_distance is None else max_distance
+        if max_distance > self.max_distance:
+            raise ValueError(f"El índice admite distancias hasta {self.max_distance}")
+        if self.size - self.indexed > max(self.MIN_TAIL, self.REBUILD_GROWTH * self.indexed):
+            self._rebuild()
+
+        value = np.uint64(value)
+        parts = [np.arange(self.indexed, self.size)]
+        for (keys, rows), (offset, mask) in zip(self.tables, self.chunks):
+            key = (value >> offset) & mask
+            parts.append(rows[keys.searchsorted(key):keys.searchsorted(key, side="right")])
+        # Una fila puede aparecer en varias cubetas: se deduplica solo lo que queda cerca
+        candidates = np.concatenate(parts)
+        candidates = candidates[self.alive[candidates]]
+        distances = popcount(self.values[candidates] ^ value)
+        close = distances <= max_distance
+        candidates, first = np.unique(candidates[close], return_index=True)
+        distances = distances[close][first]
+        order = np.lexsort((candidates, distances))
+        return [(int(candidates[i]), int(distances[i])) for i in order]
@@ -0,0 +1,388 @@
+"""
+Almacén de embeddings de prendas y búsqueda por similitud.
+
+El forward del ViT ya calcula un vector de 768 dimensiones por imagen (el
+``pooler_output`` del backbone); en vez de descartarlo se guarda normalizado
+para responder "prendas parecidas a esta" sin volver a pasar el closet por el
+modelo.
+
+Cada usuario tiene su carpeta con dos archivos:
+
+- ``vectors.f16``: matriz float16 [N, 768] cruda, que se lee con ``np.memmap``
+  (1,5 KB por prenda; las páginas las comparte el sistema operativo).
+- ``items.jsonl``: una línea por fila con el id de la prenda y sus datos
+  (``archivo``, ``clase``, ``categoria``...), y líneas de baja. Volver a
+  guardar un id reemplaza su fila anterior; una línea con la misma fila solo
+  reemplaza los datos (``update``, lo que usa reclassify.py).
+
+Las escrituras se serializan con ``flock`` (varios workers de prefork.py
+pueden escribir en el mismo usuario) y cada proceso lee lo que agregaron los
+demás antes de buscar.
+
+La búsqueda exacta es un producto matriz-vector por bloques y un top-k con
+``argpartition``. Con muchas prendas (``ann_min_items``) se construye un índice
+IVF: k-means esférico en NumPy, y cada consulta recorre solo las ``probes``
+listas de centroides más cercanos más las filas agregadas después de construirlo.
+
+Si la prenda se guardó con su hash perceptual (``phash`` en los datos), el
+índice lo mantiene también en un ``dedup.HashIndex`` para encontrar fotos
+casi duplicadas del mismo usuario por distancia de Hamming.
+"""
+
+import fcntl
+import json
+import logging
+import os
+import re
+import threading
+import time
+import uuid
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from dedup import HashIndex, parse_hash
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING_DIM = 768
+VECTORS_FILE = "vectors.f16"
+ITEMS_FILE = "items.jsonl"
+LOCK_FILE = ".lock"
+# Filas convertidas a float32 a la vez en la búsqueda exacta (~25 MB)
+BLOCK_ROWS = 8192
+# El índice aproximado se reconstruye cuando la colección crece este factor
+ANN_REBUILD_GROWTH = 1.2
+
+_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]{1,128}$")
+
+
+def valid_id(value: str) -> bool:
+    """Ids de usuario y de prenda: letras, números, ``_`` y ``-`` (se usan como nombre de carpeta)"""
+    return bool(value) and bool(_ID_PATTERN.match(value))
+
+
+def normalize(vector: np.ndarray) -> np.ndarray:
+    """Vector float32 de norma 1 (la similitud coseno queda como producto punto)"""
+    vector = np.asarray(vector, dtype=np.float32).reshape(-1)
+    norm = float(np.linalg.norm(vector))
+    return vector / norm if norm > 0 else vector
+
+
+class IVFIndex:
+    """Índice aproximado: centroides de k-means esférico y la lista de filas de cada uno"""
+
+    def __init__(self, centroids: np.ndarray, lists: List[np.ndarray], rows: int):
+        self.centroids = centroids
+        self.lists = lists
+        self.rows = rows  # filas de la matriz al construirlo; las posteriores se buscan completas
+
+    @classmethod
+    def build(cls, matrix: np.ndarray, alive: np.ndarray, n_lists: int = 0,
+              iterations: int = 8, seed: int = 0) -> "IVFIndex":
+        rows = np.flatnonzero(alive)
+        n_lists = min(n_lists or int(np.clip(np.sqrt(len(rows)), 16, 4096)), len(rows))
+        rng = np.random.default_rng(seed)
+        # Entrenar sobre una muestra: ~64 vectores por centroide alcanzan
+        sample = rng.choice(rows, size=min(len(rows), n_lists * 64), replace=False)
+        points = np.asarray(matrix[np.sort(sample)], dtype=np.float32)
+        centroids = points[rng.choice(len(points), size=n_lists, replace=False)].copy()
+        for _ in range(iterations):
+            assignment = np.argmax(points @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignment, points)
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            empty = norms[:, 0] == 0
+            # Los centroides sin puntos se reubican en un punto al azar
+            sums[empty] = points[rng.choice(len(points), size=int(empty.sum()))]
+            norms[empty] = 1.0
+            centroids = sums / norms
+
+        assignment = np.empty(len(rows), dtype=np.int32)
+        for start in range(0, len(rows), BLOCK_ROWS):
+            block = np.asarray(matrix[rows[start:start + BLOCK_ROWS]], dtype=np.float32)
+            assignment[start:start + BLOCK_ROWS] = np.argmax(block @ centroids.T, axis=1)
+        order = np.argsort(assignment, kind="stable")
+        bounds = np.searchsorted(assignment[order], np.arange(n_lists + 1))
+        lists = [rows[order[bounds[i]:bounds[i + 1]]] for i in range(n_lists)]
+        return cls(centroids.astype(np.float32), lists, len(matrix))
+
+    def candidates(self, query: np.ndarray, probes: int, total_rows: int) -> np.ndarray:
+        nearest = np.argsort(-(self.centroids @ query))[:probes]
+        parts = [self.lists[i] for i in nearest]
+        if total_rows > self.rows:
+            parts.append(np.arange(self.rows, total_rows))
+        return np.concatenate(parts) if parts else np.empty(0, dtype=np.int64)
+
+
+class UserIndex:
+    """Embeddings de un usuario: matriz mapeada en memoria y metadatos por fila"""
+
+    def __init__(self, directory: str, dim: int = EMBEDDING_DIM, hash_distance: int = 6):
+        self.directory = directory
+        self.dim = dim
+        self.row_bytes = dim * 2
+        self.vectors_path = os.path.join(directory, VECTORS_FILE)
+        self.items_path = os.path.join(directory, ITEMS_FILE)
+        self.lock_path = os.path.join(directory, LOCK_FILE)
+        self.rows: List[Optional[Dict[str, Any]]] = []  # metadatos por fila (None = reemplazada o borrada)
+        self.by_id: Dict[str, int] = {}
+        self.alive = np.zeros(0, dtype=bool)
+        self.ann: Optional[IVFIndex] = None
+        self.hashes = HashIndex(hash_distance)
+        self._items_offset = 0
+        self._matrix: Optional[np.ndarray] = None
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    # ------------------------------------------------------------ archivos
+
+    def _file_lock(self):
+        handle = open(self.lock_path, "a")
+        fcntl.flock(handle, fcntl.LOCK_EX)
+        return handle
+
+    def _apply(self, entry: Dict[str, Any]):
+        if "eliminar" in entry:
+            row = self.by_id.pop(entry["eliminar"], None)
+            if row is not None:
+                self.rows[row] = None
+                self.hashes.remove(row)
+            return
+        row = entry["fila"]
+        while len(self.rows) <= row:
+            self.rows.append(None)
+        previous = self.by_id.get(entry["id"])
+        if previous is not None:
+            self.rows[previous] = None
+            self.hashes.remove(previous)
+        self.by_id[entry["id"]] = row
+        self.rows[row] = meta = dict(entry)
+        del meta["fila"]
+        if entry.get("phash"):
+            self.hashes.add(row, parse_hash(entry["phash"]))
+
+    def refresh(self):
+        """Leer las líneas agregadas (por este u otro proceso) desde la última lectura"""
+        try:
+            size = os.path.getsize(self.items_path)
+        except FileNotFoundError:
+            return
+        if size == self._items_offset:
+            return
+        with open(self.items_path, "rb") as f:
+            f.seek(self._items_offset)
+            data = f.read()
+        # Solo líneas completas: otro proceso puede estar escribiendo la última
+        complete = data[:data.rfind(b"\n") + 1]
+        for line in complete.splitlines():
+            if line.strip():
+                self._apply(json.loads(line))
+        self._items_offset += len(complete)
+        self._rows_changed()
+
+    def _rows_changed(self):
+        alive = np.zeros(len(self.rows), dtype=bool)
+        alive[list(self.by_id.values())] = True
+        self.alive = alive
+        self._matrix = None
+
+    def matrix(self) -> np.ndarray:
+        """Matriz [filas, dim] float16 mapeada en memoria (se vuelve a mapear si creció)"""
+        if self._matrix is None or len(self._matrix) != len(self.rows):
+            if not self.rows:
+                self._matrix = np.zeros((0, self.dim), dtype=np.float16)
+            else:
+                self._matrix = np.memmap(self.vectors_path, dtype=np.float16, mode="r",
+                                         shape=(len(self.rows), self.dim))
+        return self._matrix
+
+    def _append(self, entries: List[Dict[str, Any]], vectors: List[Optional[np.ndarray]]):
+        """Escribir vectores y líneas con el lock de archivo tomado (fila i del .f16 = fila i de los metadatos)"""
+        with self._file_lock():
+            self.refresh()
+            with open(self.items_path, "ab") as items:
+                # Un proceso que murió a mitad de escritura puede dejar una línea
+                # incompleta o vectores sin metadatos: se descartan
+                items.truncate(self._items_offset)
+            rows = len(self.rows)
+            with open(self.vectors_path, "ab") as f:
+                f.truncate(rows * self.row_bytes)
+                for offset, vector in enumerate(vectors):
+                    if vector is not None:
+                        f.write(vector.astype("<f2").tobytes())
+                        entries[offset] = {"fila": rows, **entries[offset]}
+                        rows += 1
+                f.flush()
+                os.fsync(f.fileno())
+            self._write_entries(entries)
+
+    def _write_entries(self, entries: List[Dict[str, Any]]):
+        """Agregar líneas a los metadatos con el lock de archivo tomado.
+
+        Después de ``refresh`` y con el lock, el archivo termina justo en
+        ``_items_offset``: las líneas nuevas se aplican sin volver a leerlas.
+        """
+        data = b"".join(json.dumps(entry, ensure_ascii=False).encode("utf-8") + b"\n" for entry in entries)
+        with open(self.items_path, "ab") as f:
+            f.write(data)
+        for entry in entries:
+            self._apply(entry)
+        self._items_offset += len(data)
+        self._rows_changed()
+
+    # ------------------------------------------------------------ API
+
+    def add(self, item_id: str, vector: np.ndarray, meta: Dict[str, Any]):
+        with self._lock:
+            self._append([{"id": item_id, **meta}], [normalize(vector)])
+
+    def remove(self, item_id: str) -> bool:
+        with self._lock:
+            self.refresh()
+            if item_id not in self.by_id:
+                return False
+            self._append([{"eliminar": item_id}], [None])
+            return True
+
+    def update(self, changes: List[Tuple[str, int, Dict[str, Any]]]) -> int:
+        """Cambiar datos de prendas sin tocar sus vectores: (id, fila, datos nuevos).
+
+        Solo se aplican los cambios cuya prenda sigue en esa fila (no se
+        reemplazó ni se borró mientras tanto). Devuelve cuántos se aplicaron.
+        """
+        with self._lock, self._file_lock():
+            self.refresh()
+            with open(self.items_path, "ab") as items:
+                items.truncate(self._items_offset)
+            entries = [{"fila": row, **self.rows[row], **meta} for item_id, row, meta in changes
+                       if self.by_id.get(item_id) == row]
+            if entries:
+                self._write_entries(entries)
+            return len(entries)
+
+    def vector(self, item_id: str) -> Optional[np.ndarray]:
+        with self._lock:
+            self.refresh()
+            row = self.by_id.get(item_id)
+            return None if row is None else np.asarray(self.matrix()[row], dtype=np.float32)
+
+    def items(self) -> List[Tuple[int, Dict[str, Any]]]:
+        """(fila, datos) de las prendas vigentes, en orden de fila"""
+        with self._lock:
+            self.refresh()
+            return sorted((row, self.rows[row]) for row in self.by_id.values())
+
+    def __len__(self) -> int:
+        return len(self.by_id)
+
+    def duplicates(self, value: int, exclude: Optional[str] = None) -> List[Tuple[Dict[str, Any], int]]:
+        """Prendas con hash perceptual a distancia <= ``hashes.max_distance``, de la más cercana a la más lejana"""
+        with self._lock:
+            self.refresh()
+            return [(self.rows[row], distance) for row, distance in self.hashes.query(value)
+                    if self.rows[row]["id"] != exclude]
+
+    def _exact(self, matrix: np.ndarray, query: np.ndarray) -> np.ndarray:
+        scores = np.empty(len(matrix), dtype=np.float32)
+        for start in range(0, len(matrix), BLOCK_ROWS):
+            scores[start:start + BLOCK_ROWS] = np.asarray(matrix[start:start + BLOCK_ROWS], dtype=np.float32) @ query
+        return scores
+
+    def search(self, query: np.ndarray, k: int, exclude: Optional[str] = None,
+               ann_min_items: int = 0, probes: int = 8) -> Tuple[List[Tuple[Dict[str, Any], float]], str]:
+        """Las ``k`` prendas más parecidas a ``query`` y el tipo de índice usado"""
+        query = normalize(query)
+        with self._lock:
+            self.refresh()
+            matrix = self.matrix()
+            alive = self.alive.copy()
+            if exclude is not None and exclude in self.by_id:
+                alive[self.by_id[exclude]] = False
+
+            approximate = bool(ann_min_items) and len(self.by_id) >= ann_min_items
+            if approximate:
+                if self.ann is None or len(matrix) > self.ann.rows * ANN_REBUILD_GROWTH:
+                    started = time.perf_counter()
+                    self.ann = IVFIndex.build(matrix, self.alive)
+                    logger.info(f"🧭 Índice aproximado de {self.directory}: {len(self.ann.lists)} listas, "
+                                f"{len(self.by_id)} prendas ({time.perf_counter() - started:.1f}s)")
+                rows = self.ann.candidates(query, probes, len(matrix))
+                rows = np.sort(rows[alive[rows]])
+                scores = np.asarray(matrix[rows], dtype=np.float32) @ query
+            else:
+                scores = self._exact(matrix, query)
+                scores[~alive] = -np.inf
+                rows = np.arange(len(matrix))
+
+            k = min(k, int(np.isfinite(scores).sum()))
+            if k <= 0:
+                return [], "aproximado" if approximate else "exacto"
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+            results = [(self.rows[rows[i]], float(scores[i])) for i in top]
+        return results, "aproximado" if approximate else "exacto"
+
+
+class EmbeddingStore:
+    """Índices por usuario bajo ``directory``"""
+
+    def __init__(self, directory: str, dim: int = EMBEDDING_DIM, ann_min_items: int = 20000, ann_probes: int = 8,
+                 hash_distance: int = 6):
+        self.directory = directory
+        self.dim = dim
+        self.hash_distance = hash_distance
+        self.ann_min_items = ann_min_items
+        self.ann_probes = ann_probes
+        self._indexes: Dict[str, UserIndex] = {}
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def index(self, user: str) -> UserIndex:
+        if not valid_id(user):
+            raise ValueError(f"Usuario inválido: {user!r}")
+        with self._lock:
+            index = self._indexes.get(user)
+            if index is None:
+                index = self._indexes[user] = UserIndex(os.path.join(self.directory, user), self.dim, self.hash_distance)
+            return index
+
+    def add(self, user: str, vector: np.ndarray, meta: Dict[str, Any], item_id: Optional[str] = None) -> str:
+        """Guardar (o reemplazar) el embedding de una prenda y devolver su id"""
+        item_id = item_id or uuid.uuid4().hex
+        if not valid_id(item_id):
+            raise ValueError(f"Id de prenda inválido: {item_id!r}")
+        self.index(user).add(item_id, vector, {**meta, "creado": round(time.time(), 3)})
+        return item_id
+
+    def remove(self, user: str, item_id: str) -> bool:
+        return self.index(user).remove(item_id)
+
+    def users(self) -> List[str]:
+        """Usuarios con embeddings guardados (carpetas con metadatos)"""
+        return sorted(name for name in os.listdir(self.directory)
+                      if valid_id(name) and os.path.exists(os.path.join(self.directory, name, ITEMS_FILE)))
+
+    def vector(self, user: str, item_id: str) -> Optional[np.ndarray]:
+        return self.index(user).vector(item_id)
+
+    def duplicates(self, user: str, phash: str, exclude: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Prendas del usuario casi iguales a una foto con este hash perceptual (hexadecimal)"""
+        return [{**meta, "distancia": distance}
+                for meta, distance in self.index(user).duplicates(parse_hash(phash), exclude)]
+
+    def similar(self, user: str, k: int = 10, item_id: Optional[str] = None,
+                vector: Optional[np.ndarray] = None) -> Dict[str, Any]:
+        """Top-k de un usuario, parecidas a una prenda guardada o a un vector nuevo"""
+        index = self.index(user)
+        if vector is None:
+            vector = index.vector(item_id)
+            if vector is None:
+                raise KeyError(item_id)
+        results, kind = index.search(vector, k, exclude=item_id,
+                                     ann_min_items=self.ann_min_items, probes=self.ann_probes)
+        return {
+            "resultados": [{**meta, "similitud": round(score, 5)} for meta, score in results],
+            "total": len(index),
+            "indice": kind,
+        }
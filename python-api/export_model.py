@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Exportar el modelo a TorchScript u ONNX y verificar paridad con PyTorch eager,
+o convertir el checkpoint a .safetensors para el arranque rápido
+"""
+
+import argparse
+import sys
+import time
+
+import torch
+
+import settings
+from backends import EXPORTERS, EagerBackend, artifact_metadata, create_backend, default_artifact_path, parity_check
+from main import build_model, checkpoint_file_version, load_checkpoint
+from weights import export_safetensors, load_safetensors
+
+
+def export_weights(checkpoint, checkpoint_path: str, output: str, skip_check: bool):
+    """Convertir el checkpoint .pth a .safetensors y verificar que los pesos sean idénticos"""
+    print(f"📦 Exportando a safetensors: {output}")
+    started = time.perf_counter()
+    export_safetensors(checkpoint, output, version=checkpoint_file_version(checkpoint, checkpoint_path))
+    print(f"✅ Exportado en {time.perf_counter() - started:.1f}s")
+
+    if skip_check:
+        return
+
+    print("🔍 Verificando que los pesos coincidan con el checkpoint...")
+    exported = load_safetensors(output)
+    expected = checkpoint['model_state_dict']
+    actual = exported['model_state_dict']
+    ok = (expected.keys() == actual.keys()
+          and all(torch.equal(expected[name], actual[name]) for name in expected)
+          and exported['classes'] == checkpoint['classes']
+          and exported['climate2idx'] == checkpoint['climate2idx']
+          and torch.equal(exported['climates'], torch.as_tensor(checkpoint['climates'])))
+    if not ok:
+        print("❌ El artefacto no coincide con el checkpoint")
+        sys.exit(1)
+    print("✅ Pesos verificados")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Exportar vit_clothes_prediction.pth para inferencia optimizada")
+    parser.add_argument("--format", choices=sorted(EXPORTERS) + ["safetensors"], default="onnx")
+    parser.add_argument("--checkpoint", default=settings.CHECKPOINT_PATH)
+    parser.add_argument("--output", help="ruta del artefacto (por defecto junto al checkpoint)")
+    parser.add_argument("--skip-check", action="store_true", help="no comparar con el modelo eager")
+    parser.add_argument("--atol", type=float, default=1e-3, help="diferencia máxima aceptada en los logits")
+    args = parser.parse_args()
+
+    output = args.output or default_artifact_path(args.checkpoint, args.format)
+
+    print(f"🤖 Cargando checkpoint {args.checkpoint}...")
+    checkpoint = load_checkpoint(args.checkpoint)
+    if args.format == "safetensors":
+        export_weights(checkpoint, args.checkpoint, output, args.skip_check)
+        return
+    model = build_model(checkpoint)
+
+    # El servidor compara estos metadatos con el checkpoint que carga
+    metadata = artifact_metadata(checkpoint_file_version(checkpoint, args.checkpoint),
+                                 len(checkpoint['classes']), len(checkpoint['climate2idx']))
+    print(f"📦 Exportando a {args.format}: {output} (checkpoint {metadata['version']})")
+    started = time.perf_counter()
+    EXPORTERS[args.format](model, output, metadata=metadata)
+    print(f"✅ Exportado en {time.perf_counter() - started:.1f}s")
+
+    if args.skip_check:
+        return
+
+    print("🔍 Verificando paridad contra PyTorch eager...")
+    candidate = create_backend(args.format, lambda: model, artifact_path=output)
+    report = parity_check(EagerBackend(model), candidate)
+    for key, value in report.items():
+        print(f"   {key}: {value:.6g}")
+
+    ok = (report["category_max_abs_diff"] <= args.atol
+          and report["climate_max_abs_diff"] <= args.atol
+          and report.get("embedding_max_abs_diff", 0.0) <= args.atol
+          and report["category_top1_agreement"] == 1.0
+          and report["climate_top1_agreement"] == 1.0)
+    if not ok:
+        print(f"❌ El artefacto no coincide con el modelo eager (atol={args.atol})")
+        sys.exit(1)
+    print("✅ Paridad verificada")
+
+
+if __name__ == "__main__":
+    main()
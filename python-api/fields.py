@@ -0,0 +1,139 @@
+"""
+Selección de campos de la respuesta de ``/predict``.
+
+Cada campo corresponde a trabajo que se puede evitar:
+
+- ``category``: ``mejor_prediccion`` (forward del ViT y softmax de categorías).
+- ``alternatives``: ``predicciones`` y ``alternativas`` (top-3 de categorías).
+- ``climate``: ``predicciones_clima``, ``mejor_clima`` y los ``climas`` de
+  cada predicción.
+- ``colors``: ``colores``, ``color_principal`` y los ``colores`` de cada
+  predicción (buffer de 400 px y cuantización de colores).
+- ``embedding``: vector de 768 dimensiones normalizado del backbone, y la
+  norma que tenía antes de normalizarlo (``norma_embedding``: con ella las
+  cabezas se pueden volver a aplicar al vector guardado, ver reclassify.py).
+- ``phash``: hash perceptual de 64 bits en hexadecimal (``dedup.py``), para
+  detectar fotos casi duplicadas.
+
+``embedding`` y ``phash`` no son parte de la respuesta completa: solo se
+devuelven si se piden.
+
+Sin ``category``, ``alternatives``, ``climate`` ni ``embedding`` no se prepara el tensor ni
+se ejecuta el modelo; sin ``colors`` no se prepara el buffer ni se extraen
+colores. ``mode=fast`` devuelve solo ``mejor_prediccion``.
+"""
+
+from typing import Any, Dict, Iterable, Optional, Set, Tuple
+
+FIELDS = ("category", "alternatives", "climate", "colors")
+MODES = {
+    "full": FIELDS,
+    "fast": ("category",),
+}
+# Campos que hay que pedir explícitamente
+EXTRA_FIELDS = ("embedding", "phash")
+ALL_FIELDS = FIELDS + EXTRA_FIELDS
+MODEL_FIELDS = ("category", "alternatives", "climate", "embedding")
+
+# Claves de la respuesta que aporta cada campo
+RESPONSE_KEYS = {
+    "category": ("mejor_prediccion",),
+    "alternatives": ("predicciones", "alternativas"),
+    "climate": ("predicciones_clima", "mejor_clima"),
+    "colors": ("colores", "color_principal"),
+    "embedding": ("embedding", "norma_embedding"),
+    "phash": ("phash",),
+}
+# Orden de las claves en la respuesta completa
+RESPONSE_ORDER = ("predicciones", "mejor_prediccion", "alternativas", "predicciones_clima",
+                  "mejor_clima", "colores", "color_principal", "embedding", "norma_embedding", "phash")
+
+
+def parse_fields(fields: Optional[str] = None, mode: Optional[str] = None) -> Tuple[str, ...]:
+    """Campos pedidos (``fields=category,colors`` y/o ``mode``), en el orden de ALL_FIELDS.
+
+    Sin ninguno de los dos se devuelve la respuesta completa; con ambos, los
+    campos se suman a los del modo. ValueError si algo no existe.
+    """
+    if mode is not None and mode not in MODES:
+        raise ValueError(f"mode debe ser {' o '.join(MODES)}")
+    selected = set(MODES[mode] if mode is not None else ())
+    for name in (fields or "").split(","):
+        name = name.strip()
+        if not name:
+            continue
+        if name not in ALL_FIELDS:
+            raise ValueError(f"Campo desconocido: {name} (opciones: {', '.join(ALL_FIELDS)})")
+        selected.add(name)
+    if not selected:
+        return FIELDS
+    return tuple(name for name in ALL_FIELDS if name in selected)
+
+
+def with_field(fields: Iterable[str], name: str) -> Tuple[str, ...]:
+    """Agregar un campo a la selección manteniendo el orden de ALL_FIELDS"""
+    selected = set(fields) | {name}
+    return tuple(field for field in ALL_FIELDS if field in selected)
+
+
+def needs_model(fields: Iterable[str]) -> bool:
+    return any(name in MODEL_FIELDS for name in fields)
+
+
+def needs_colors(fields: Iterable[str]) -> bool:
+    return "colors" in fields
+
+
+def needs_phash(fields: Iterable[str]) -> bool:
+    return "phash" in fields
+
+
+def skipped_stages(fields: Iterable[str]) -> Tuple[str, ...]:
+    """Etapas de ``sw_stage_seconds`` que no se ejecutan con estos campos"""
+    fields = tuple(fields)
+    skipped = ()
+    if not needs_model(fields):
+        skipped += ("forward", "postprocess")
+    if not needs_colors(fields):
+        skipped += ("colors",)
+    return skipped
+
+
+def fields_tag(fields: Iterable[str]) -> str:
+    """Nombre corto de la selección (para la clave de caché y los logs)"""
+    return "-".join(fields)
+
+
+def response_keys(fields: Iterable[str]) -> Set[str]:
+    """Claves de la respuesta que corresponden a estos campos"""
+    return {key for name in fields for key in RESPONSE_KEYS[name]}
+
+
+def select_fields(result: Dict[str, Any], fields: Iterable[str]) -> Dict[str, Any]:
+    """Recortar una respuesta completa (por ejemplo, de la caché) a los campos pedidos de FIELDS"""
+    fields = tuple(fields)
+    if fields == FIELDS:
+        return result
+
+    def prediction(item: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        if item is None:
+            return None
+        item = dict(item)
+        if "climate" not in fields:
+            item.pop("climas", None)
+        if "colors" not in fields:
+            item.pop("colores", None)
+        return item
+
+    wanted = response_keys(fields)
+    selected = {}
+    for key in RESPONSE_ORDER:
+        if key not in wanted:
+            continue
+        value = result.get(key)
+        if key == "mejor_prediccion":
+            value = prediction(value)
+        elif key in ("predicciones", "alternativas"):
+            value = [prediction(item) for item in value or []]
+        selected[key] = value
+    return selected
@@ -1,21 +1,45 @@
-from fastapi import FastAPI, File, UploadFile, HTTPException
-from fastapi.responses import HTMLResponse
+from fastapi import FastAPI, File, UploadFile, HTTPException, Request, Body
+from fastapi.responses import HTMLResponse, StreamingResponse, PlainTextResponse, FileResponse
 from fastapi.middleware.cors import CORSMiddleware
-from contextlib import asynccontextmanager
+from contextlib import asynccontextmanager, nullcontext
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 import torch
 import torch.nn as nn
 import torch.nn.functional as F
-from transformers import ViTModel, ViTImageProcessor
+from transformers import ViTModel
 from PIL import Image
 import json
 import io
 import logging
-from typing import Dict, Any
+import asyncio
+import zipfile
+import os
+import hashlib
+import time
+from typing import Dict, Any, List, Optional, Tuple, AsyncIterator, Union
 import numpy as np
-from sklearn.cluster import KMeans
 import cv2
-from collections import Counter
-import colorsys
+
+import settings
+from batching import MicroBatcher
+from workers import InferenceExecutor, default_workers
+from threads import ThreadBudget, apply_budget, plan_budget
+from admission import AdmissionController, AdmissionRejected, LANES
+from cache import PredictionCache, content_key
+from fields import (EXTRA_FIELDS, FIELDS, fields_tag, needs_colors, needs_model, needs_phash, parse_fields,
+                    response_keys, select_fields, skipped_stages, with_field)
+from embeddings import EmbeddingStore, normalize, valid_id
+from dedup import DEDUP_MODES, hash_hex
+from outfits import OutfitEngine, weather_climates
+from regions import merge_detections, propose_regions
+from palette import quantize_colors
+from color_names import color_name, color_names
+from backends import artifact_metadata, create_backend, default_artifact_path
+from weights import CONFIG_DIR, vit_config, load_safetensors, safetensors_version
+from preprocessing import COLOR_MAX_SIDE, ImagePreprocessor, ImageRejected, PreparedImage, PreparedRegions
+from uploads import MULTIPART_OVERHEAD, BodyLimitMiddleware, UploadTooLarge, read_upload, read_zip_member
+from metrics import REGISTRY, timer
 
 # Configurar logging
 logging.basicConfig(level=logging.INFO)
@@ -28,8 +52,9 @@ class CustomClothingModel(nn.Module):
     def __init__(self, num_categories=50, num_climates=8):
         super().__init__()
 
-        # Backbone ViT
-        self.backbone = ViTModel.from_pretrained('google/vit-base-patch16-224')
+        # Backbone ViT: solo la arquitectura (config incluida en model_config/);
+        # los pesos entrenados vienen del checkpoint
+        self.backbone = ViTModel(vit_config(), add_pooling_layer=True)
 
         # Cabezas de clasificación
         self.category_head = nn.Linear(768, num_categories)
@@ -46,17 +71,73 @@ class CustomClothingModel(nn.Module):
 
         return {
             'category_logits': category_logits,
-            'climate_logits': climate_logits
+            'climate_logits': climate_logits,
+            'embedding': pooled_output  # se guarda para /similar (embeddings.py)
         }
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
+    global batcher, executor, cache, profiles, admission, embeddings, backend_name
     logger.info("🚀 Iniciando Smart Wardrobe AI...")
-    load_model()
+    if model is None:
+        # En modo process cada worker carga su modelo: el padre no guarda otra copia
+        load_model(with_backend=settings.EXECUTOR != "process")
+    else:
+        # Servidor pre-fork (prefork.py): el padre ya cargó el modelo y este
+        # worker comparte sus pesos por copy-on-write
+        logger.info("♻️ Modelo heredado del proceso padre")
+    if settings.PROFILING_ENABLED:
+        from profiling import ProfileStore
+        profiles = ProfileStore(settings.PROFILE_DIR, settings.PROFILE_MAX_FILES)
+        logger.info(f"🔬 Perfiles por petición habilitados en {profiles.directory}")
+    if settings.EMBEDDINGS_DIR:
+        embeddings = EmbeddingStore(
+            settings.EMBEDDINGS_DIR,
+            ann_min_items=settings.SIMILAR_ANN_MIN_ITEMS,
+            ann_probes=settings.SIMILAR_ANN_PROBES,
+            hash_distance=settings.DEDUP_MAX_DISTANCE
+        )
+        logger.info(f"🧷 Embeddings por usuario en {settings.EMBEDDINGS_DIR}")
+    if settings.CACHE_ENABLED:
+        cache = PredictionCache(
+            max_entries=settings.CACHE_MAX_ENTRIES,
+            ttl_seconds=settings.CACHE_TTL_SECONDS,
+            disk_dir=settings.CACHE_DIR,
+            disk_ttl_seconds=settings.CACHE_DISK_TTL_SECONDS
+        )
+    executor = InferenceExecutor(settings.EXECUTOR, settings.WORKERS, initializer=init_worker)
+    backends = executor.warmup(worker_ready)
+    if model is None and backends:
+        backend_name = backends[0]
+        MODEL_INFO.set(1, backend=backend_name, precision=settings.PRECISION, version=model_version)
+    if settings.ADMISSION_ENABLED:
+        admission = AdmissionController(
+            capacity=settings.ADMISSION_CAPACITY or admission_capacity(executor),
+            queue_depth=settings.ADMISSION_QUEUE_DEPTH,
+            bulk_queue_depth=settings.ADMISSION_BULK_QUEUE_DEPTH,
+            reserved=settings.ADMISSION_RESERVED
+        )
+        logger.info(f"🚦 Admisión: {admission.capacity} imágenes en curso, "
+                    f"{admission.reserved} reservadas para interactive, colas de "
+                    f"{settings.ADMISSION_QUEUE_DEPTH}/{settings.ADMISSION_BULK_QUEUE_DEPTH}")
+    if executor.kind == "thread":
+        # En modo process cada worker tiene su propio modelo y no hay batching compartido
+        batcher = MicroBatcher(
+            run_model,
+            max_batch_size=settings.BATCH_MAX_SIZE,
+            max_wait_ms=settings.BATCH_MAX_WAIT_MS
+        )
+        await batcher.start()
     yield
     # Shutdown
     logger.info("👋 Cerrando Smart Wardrobe AI...")
+    if batcher is not None:
+        await batcher.stop()
+        batcher = None
+    executor.shutdown()
+    executor = None
+    admission = None
 
 app = FastAPI(
     title="Smart Wardrobe AI",
@@ -64,6 +145,22 @@ app = FastAPI(
     lifespan=lifespan
 )
 
+# Límite de bytes mientras llega el cuerpo (dentro de CORS para que el 413 llegue al navegador)
+MAX_UPLOAD_BYTES = int(settings.MAX_UPLOAD_MB * 1024 * 1024)
+MAX_BATCH_UPLOAD_BYTES = int(settings.MAX_BATCH_UPLOAD_MB * 1024 * 1024)
+MAX_SUGGEST_BYTES = settings.SUGGEST_MAX_ITEMS * 4096  # JSON de las prendas: de sobra para colores y climas
+app.add_middleware(
+    BodyLimitMiddleware,
+    limits={
+        "/predict": MAX_UPLOAD_BYTES + MULTIPART_OVERHEAD,
+        "/predict/batch": MAX_BATCH_UPLOAD_BYTES + MULTIPART_OVERHEAD,
+        "/predict/multi": MAX_UPLOAD_BYTES + MULTIPART_OVERHEAD,
+        "/similar": MAX_UPLOAD_BYTES + MULTIPART_OVERHEAD,
+        "/suggest": MAX_SUGGEST_BYTES,
+    },
+    on_reject=lambda path: UPLOADS_REJECTED.inc(reason="bytes")
+)
+
 # Configurar CORS para permitir conexiones desde el frontend
 app.add_middleware(
     CORSMiddleware,
@@ -73,14 +170,92 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.middleware("http")
+async def track_requests(request: Request, call_next):
+    """Contar peticiones y medir su latencia por ruta (rutas desconocidas como 'otra')"""
+    path = request.url.path if request.url.path in ROUTE_PATHS else "otra"
+    HTTP_IN_FLIGHT.inc(path=path)
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        HTTP_IN_FLIGHT.dec(path=path)
+        HTTP_SECONDS.observe(time.perf_counter() - started, path=path)
+        HTTP_REQUESTS.inc(path=path, method=request.method, status=str(status))
+
 # Variables globales para el modelo
 model = None
+backend_name = None  # el del modelo local o, en modo process, el de los workers
 processor = None
 climate_data = None
 class_names = None
 classes = None
 climate2idx = None
 climates_matrix = None
+outfit_engine = None
+batcher = None
+executor = None
+model_version = None
+budget = None
+cache = None
+admission = None
+profiles = None
+embeddings = None
+colors_pool = None
+colors_pool_pid = None
+
+# Métricas expuestas en /metrics (ver metrics.py)
+HTTP_REQUESTS = REGISTRY.counter("sw_http_requests_total", "Peticiones HTTP por ruta, método y código", ["path", "method", "status"])
+HTTP_SECONDS = REGISTRY.histogram("sw_http_request_seconds", "Latencia HTTP hasta enviar los headers", ["path"])
+HTTP_IN_FLIGHT = REGISTRY.gauge("sw_http_requests_in_flight", "Peticiones HTTP en curso", ["path"])
+PREDICTIONS = REGISTRY.counter("sw_predictions_total", "Imágenes clasificadas por resultado", ["result"])
+INFERENCE_IN_FLIGHT = REGISTRY.gauge("sw_inference_in_flight", "Imágenes en decodificación, modelo o post-procesamiento")
+IMAGE_BYTES = REGISTRY.histogram(
+    "sw_image_bytes", "Tamaño de las imágenes subidas en bytes",
+    buckets=(16e3, 64e3, 256e3, 512e3, 1e6, 2e6, 4e6, 8e6, 16e6, 32e6)
+)
+IMAGE_MEGAPIXELS = REGISTRY.histogram(
+    "sw_image_megapixels", "Resolución original de las imágenes decodificadas",
+    buckets=(0.1, 0.3, 0.5, 1, 2, 4, 8, 12, 16, 24, 48)
+)
+FORWARD_BATCH_SIZE = REGISTRY.histogram(
+    "sw_forward_batch_size", "Imágenes por forward del modelo", buckets=(1, 2, 4, 8, 16, 32, 64)
+)
+STAGES_SKIPPED = REGISTRY.counter("sw_stages_skipped_total", "Etapas omitidas porque la petición no pidió esos campos", ["stage"])
+UPLOADS_REJECTED = REGISTRY.counter("sw_uploads_rejected_total", "Subidas rechazadas por tamaño, píxeles o formato", ["reason"])
+EMBEDDING_EVENTS = REGISTRY.counter("sw_embeddings_total", "Embeddings guardados y borrados", ["event"])
+DETECTIONS = REGISTRY.histogram(
+    "sw_multi_garments", "Prendas detectadas por foto en /predict/multi", buckets=(0, 1, 2, 3, 4, 6, 8, 12)
+)
+DUPLICATES = REGISTRY.counter("sw_duplicates_total", "Fotos casi duplicadas marcadas (flagged) u omitidas (skipped)", ["result"])
+SIMILAR_SEARCHES = REGISTRY.counter("sw_similar_searches_total", "Búsquedas de prendas parecidas por tipo de índice", ["index"])
+MODEL_LOAD_SECONDS = REGISTRY.gauge("sw_model_load_seconds", "Duración de la última carga del modelo")
+MODEL_INFO = REGISTRY.gauge("sw_model_info", "Modelo cargado", ["backend", "precision", "version"])
+CACHE_EVENTS = REGISTRY.counter("sw_cache_events_total", "Eventos de la caché de predicciones", ["event"])
+CACHE_EVENTS.set_function(lambda: {(event,): value for event, value in cache.counters.items()} if cache is not None else {})
+CACHE_ENTRIES = REGISTRY.gauge("sw_cache_entries", "Entradas en el nivel en memoria de la caché")
+CACHE_ENTRIES.set_function(lambda: {(): len(cache)} if cache is not None else {})
+BATCH_QUEUE_DEPTH = REGISTRY.gauge("sw_batch_queue_depth", "Peticiones esperando en el micro-batcher")
+BATCH_QUEUE_DEPTH.set_function(lambda: {(): batcher.queue_depth} if batcher is not None else {})
+ADMISSION_QUEUE_DEPTH = REGISTRY.gauge("sw_admission_queue_depth", "Imágenes esperando admisión por carril", ["lane"])
+ADMISSION_QUEUE_DEPTH.set_function(lambda: {(lane,): admission.queue_depth(lane) for lane in LANES} if admission is not None else {})
+ADMISSION_IN_SERVICE = REGISTRY.gauge("sw_admission_in_service", "Imágenes admitidas en curso por carril", ["lane"])
+ADMISSION_IN_SERVICE.set_function(lambda: {(lane,): admission.in_service(lane) for lane in LANES} if admission is not None else {})
+ADMISSION_EVENTS = REGISTRY.counter("sw_admission_total", "Imágenes admitidas y rechazadas (503) por carril", ["lane", "result"])
+ADMISSION_EVENTS.set_function(lambda: {
+    (lane, result): getattr(admission.stats[lane], result) for lane in LANES for result in ("admitted", "rejected")
+} if admission is not None else {})
+
+def admission_capacity(executor: InferenceExecutor) -> int:
+    """Imágenes en curso a la vez: lo necesario para llenar un batch, o un lugar por worker de proceso"""
+    if executor.kind == "thread":
+        return max(settings.BATCH_MAX_SIZE, executor.workers)
+    if executor.kind == "process":
+        return executor.workers
+    return 1
 
 def load_climate_data():
     """Cargar datos de clima desde climate.json"""
@@ -91,15 +266,119 @@ def load_climate_data():
         logger.error("No se encontró climate.json")
         return {}
 
-def load_model():
-    """Cargar el modelo custom desde el archivo .pth"""
-    global model, processor, climate_data, class_names, classes, climate2idx, climates_matrix
+# Hash del contenido del checkpoint, junto al archivo (ver checkpoint_version)
+VERSION_SUFFIX = ".version"
+
+def checkpoint_version(path: str) -> str:
+    """Versión del modelo derivada del contenido del checkpoint (blake2b de sus bytes).
 
+    Una copia idéntica en otra réplica, o descargada de nuevo, da la misma
+    versión. El hash se guarda junto al archivo (``<checkpoint>.version``) con
+    su tamaño y fecha, así que el checkpoint solo se vuelve a leer si cambia.
+    """
+    stat = os.stat(path)
+    memo_path = path + VERSION_SUFFIX
+    try:
+        with open(memo_path, 'r', encoding='utf-8') as f:
+            memo = json.load(f)
+        if memo["size"] == stat.st_size and memo["mtime_ns"] == stat.st_mtime_ns:
+            return memo["version"]
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
+
+    digest = hashlib.blake2b(digest_size=8)
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    version = digest.hexdigest()
     try:
+        tmp_path = f"{memo_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "version": version}, f)
+        os.replace(tmp_path, memo_path)
+    except OSError as e:
+        logger.info(f"ℹ️ No se pudo guardar {memo_path} ({e}): el hash del checkpoint se recalcula en cada arranque")
+    return version
+
+def checkpoint_file_version(checkpoint: Dict[str, Any], path: str = None) -> str:
+    """Versión del checkpoint de origen: la registrada en el .safetensors o la del archivo .pth"""
+    return checkpoint.get('version') or checkpoint_version(path or settings.CHECKPOINT_PATH)
+
+def checkpoint_model_version(checkpoint: Dict[str, Any], path: str = None) -> str:
+    """Versión con que se cachean y guardan las predicciones de un checkpoint (SW_MODEL_VERSION manda)"""
+    return settings.MODEL_VERSION or checkpoint_file_version(checkpoint, path)
+
+def weights_path() -> str:
+    """Artefacto .safetensors a usar en el arranque rápido, o None si no aplica"""
+    if not settings.FAST_STARTUP:
+        return None
+    path = settings.WEIGHTS_PATH or default_artifact_path(settings.CHECKPOINT_PATH, "safetensors")
+    if not os.path.exists(path):
+        logger.info(f"ℹ️ No existe {path}; se carga el checkpoint .pth (python export_model.py --format safetensors)")
+        return None
+    # Un .safetensors de un checkpoint anterior serviría los pesos viejos. Se compara el hash del
+    # contenido del .pth (no su fecha): una copia idéntica del checkpoint sigue usando el arranque rápido
+    if os.path.exists(settings.CHECKPOINT_PATH):
+        exported, current = safetensors_version(path), checkpoint_version(settings.CHECKPOINT_PATH)
+        if exported != current:
+            logger.warning(f"⚠️ {path} se exportó de otro checkpoint ({exported or 'sin versión'} y el actual es "
+                           f"{current}); se carga el .pth. Regenéralo con: python export_model.py --format safetensors")
+            return None
+    return path
+
+def load_checkpoint(path: str = None) -> Dict[str, Any]:
+    """Cargar el checkpoint (pesos, clases y climas) desde .safetensors mapeado en memoria o desde .pth"""
+    path = path or weights_path() or settings.CHECKPOINT_PATH
+    if path.endswith(".safetensors"):
+        return load_safetensors(path)
+    return torch.load(path, map_location='cpu')
+
+def build_model(checkpoint: Dict[str, Any]) -> CustomClothingModel:
+    """Construir el modelo eager con los pesos entrenados del checkpoint"""
+    # En el dispositivo meta no se reserva ni inicializa memoria para pesos que
+    # se van a reemplazar de todas formas
+    with torch.device('meta'):
+        eager_model = CustomClothingModel(
+            num_categories=len(checkpoint['classes']),
+            num_climates=len(checkpoint['climate2idx'])
+        )
+
+    # Cargar pesos entrenados (assign: adoptar los tensores del checkpoint sin copiarlos)
+    eager_model.load_state_dict(checkpoint['model_state_dict'], assign=True)
+    return eager_model.eval()
+
+def process_slots() -> int:
+    """Inferencias simultáneas en este proceso: una por worker de proceso, o una sola (el micro-batcher)"""
+    return (settings.WORKERS or default_workers()) if settings.EXECUTOR == "process" else 1
+
+def thread_budget() -> ThreadBudget:
+    """Reparto de núcleos configurado (SW_INFERENCE_SLOTS / SW_THREADS_PER_SLOT) o derivado del executor"""
+    return plan_budget(settings.CPU_CORES, settings.INFERENCE_SLOTS or process_slots(), settings.THREADS_PER_SLOT)
+
+def load_model(with_backend: bool = True):
+    """Cargar el modelo custom desde el archivo .pth
+
+    Con ``with_backend=False`` solo se leen clases, climas, versión y
+    preprocesador: en modo process el modelo vive en cada worker y el proceso
+    principal no necesita una copia propia de los pesos.
+    """
+    global model, processor, climate_data, class_names, classes, climate2idx, climates_matrix, model_version, budget
+    global outfit_engine, backend_name
+
+    try:
+        started = time.perf_counter()
         logger.info("🤖 Cargando modelo custom...")
 
+        # Limitar los hilos de torch/OpenCV/BLAS antes del primer forward
+        budget = thread_budget()
+        apply_budget(budget)
+
         # Cargar checkpoint
-        checkpoint = torch.load('../vit_clothes_prediction.pth', map_location='cpu')
+        checkpoint = load_checkpoint()
+        model_version = checkpoint_model_version(checkpoint)
+        if settings.PRECISION != "fp32":
+            # Otra precisión puede cambiar las predicciones: no compartir caché con fp32
+            model_version = f"{model_version}-{settings.PRECISION}"
 
         # Extraer información del checkpoint
         classes = checkpoint['classes']
@@ -110,25 +389,40 @@ def load_model():
         logger.info(f"📊 Categorías: {len(classes)}")
         logger.info(f"🌤️ Climas: {len(climate2idx)}")
 
-        # Crear modelo custom
-        model = CustomClothingModel(
-            num_categories=len(classes),
-            num_climates=len(climate2idx)
-        )
-
-        # Cargar pesos entrenados
-        model.load_state_dict(checkpoint['model_state_dict'])
-        model.eval()
-
-        logger.info("✅ Modelo custom cargado exitosamente!")
+        if with_backend:
+            # Crear el backend de inferencia (eager, torchscript, compile u onnx)
+            model = create_backend(
+                settings.BACKEND,
+                lambda: build_model(checkpoint),
+                artifact_path=settings.BACKEND_ARTIFACT or default_artifact_path(settings.CHECKPOINT_PATH, settings.BACKEND),
+                onnx_threads=settings.ONNX_THREADS or budget.threads,
+                precision=settings.PRECISION,
+                expected=artifact_metadata(checkpoint_file_version(checkpoint), len(classes), len(climate2idx))
+            )
+            backend_name = model.name
+            logger.info("✅ Modelo custom cargado exitosamente!")
+        else:
+            logger.info("ℹ️ El modelo se carga en los workers de proceso; aquí solo clases, climas y preprocesador")
 
-        # Cargar procesador de imágenes
-        processor = ViTImageProcessor.from_pretrained('google/vit-base-patch16-224')
+        # Preprocesador de imágenes (configuración local, sin Hugging Face Hub)
+        processor = ImagePreprocessor.from_config(
+            CONFIG_DIR, jpeg_draft=settings.JPEG_DRAFT, max_pixels=int(settings.MAX_IMAGE_MEGAPIXELS * 1e6)
+        )
 
         # Cargar datos de clima para compatibilidad
         climate_data = load_climate_data()
         class_names = list(climate_data.keys())
 
+        # Motor de /suggest con la matriz clase x clima del checkpoint
+        outfit_engine = OutfitEngine(
+            classes, climate2idx, climates_matrix,
+            {name: climate_data.get(name, {}).get("categoria") or map_to_category(name) for name in classes},
+            color_weight=settings.SUGGEST_COLOR_WEIGHT
+        )
+
+        MODEL_LOAD_SECONDS.set(time.perf_counter() - started)
+        if backend_name is not None:
+            MODEL_INFO.set(1, backend=backend_name, precision=settings.PRECISION, version=model_version)
         logger.info("✅ Modelo y procesador cargados exitosamente")
 
     except Exception as e:
@@ -138,13 +432,8 @@ def load_model():
 def preprocess_image(image: Image.Image) -> torch.Tensor:
     """Preprocesar imagen para el modelo"""
     try:
-        # Convertir a RGB si es necesario
-        if image.mode != 'RGB':
-            image = image.convert('RGB')
-
-        # Usar el procesador de ViT
-        inputs = processor(images=image, return_tensors="pt")
-        return inputs['pixel_values']
+        # Resize bilineal + normalización de ViT (ver preprocessing.py)
+        return processor.model_tensor(image)
 
     except Exception as e:
         logger.error(f"Error preprocesando imagen: {e}")
@@ -231,118 +520,76 @@ def normalize_climate_name(climate_name: str) -> str:
     return frontend_mapping.get(normalized, 'entretiempo')  # Default a entretiempo
 
 def rgb_to_color_name(rgb):
-    """Convertir RGB a nombre de color en español"""
-    r, g, b = rgb
-
-    # Convertir a HSV para mejor análisis
-    h, s, v = colorsys.rgb_to_hsv(r/255.0, g/255.0, b/255.0)
-    h = h * 360  # Convertir a grados
-    s = s * 100  # Convertir a porcentaje
-    v = v * 100  # Convertir a porcentaje
-
-    # Definir rangos de colores
-    if v < 20:
-        return "negro"
-    elif v > 80 and s < 20:
-        return "blanco"
-    elif s < 20:
-        if v < 40:
-            return "gris oscuro"
-        elif v < 70:
-            return "gris"
-        else:
-            return "gris claro"
-
-    # Colores con saturación
-    if h < 15 or h >= 345:
-        return "rojo"
-    elif h < 45:
-        return "naranja"
-    elif h < 75:
-        return "amarillo"
-    elif h < 150:
-        return "verde"
-    elif h < 210:
-        return "azul"
-    elif h < 270:
-        return "morado"
-    elif h < 330:
-        return "rosa"
-    else:
-        return "rojo"
+    """Convertir RGB a nombre de color en español (tabla precalculada, ver color_names.py)"""
+    return color_name(rgb)
 
-def extract_clothing_colors(image: Image.Image, num_colors=3):
-    """Extraer colores dominantes de una prenda evitando el fondo"""
-    try:
-        # Convertir PIL a numpy array
-        img_array = np.array(image)
+def select_garment_pixels(image: Union[Image.Image, np.ndarray]) -> np.ndarray:
+    """Píxeles RGB (N, 3) de la zona central de la prenda, sin fondo ni sombras/reflejos"""
+    # Convertir PIL a numpy array (el buffer de colores ya viene como arreglo)
+    img_array = np.asarray(image)
 
-        # Si es RGBA, convertir a RGB
-        if img_array.shape[2] == 4:
-            img_array = img_array[:, :, :3]
+    # Si es RGBA, convertir a RGB
+    if img_array.shape[2] == 4:
+        img_array = img_array[:, :, :3]
 
-        # Redimensionar para procesamiento más rápido
-        height, width = img_array.shape[:2]
-        if height > 400 or width > 400:
-            scale = min(400/height, 400/width)
-            new_height, new_width = int(height * scale), int(width * scale)
-            img_array = cv2.resize(img_array, (new_width, new_height))
+    # Redimensionar para procesamiento más rápido
+    height, width = img_array.shape[:2]
+    if height > 400 or width > 400:
+        scale = min(400/height, 400/width)
+        new_height, new_width = int(height * scale), int(width * scale)
+        img_array = cv2.resize(img_array, (new_width, new_height))
 
-        # Crear máscara para excluir bordes (probablemente fondo)
-        h, w = img_array.shape[:2]
-        mask = np.zeros((h, w), dtype=np.uint8)
+    # Máscara elíptica en el centro (donde probablemente está la prenda) para excluir bordes
+    h, w = img_array.shape[:2]
+    center_x, center_y = w // 2, h // 2
+    radius_x, radius_y = int(w * 0.35), int(h * 0.35)  # 70% del ancho/alto
 
-        # Crear máscara circular/elíptica en el centro (donde probablemente está la prenda)
-        center_x, center_y = w // 2, h // 2
-        radius_x, radius_y = int(w * 0.35), int(h * 0.35)  # 70% del ancho/alto
+    y, x = np.ogrid[:h, :w]
+    mask_condition = ((x - center_x) / radius_x) ** 2 + ((y - center_y) / radius_y) ** 2 <= 1
 
-        y, x = np.ogrid[:h, :w]
-        mask_condition = ((x - center_x) / radius_x) ** 2 + ((y - center_y) / radius_y) ** 2 <= 1
-        mask[mask_condition] = 255
+    # Obtener solo los píxeles de la región de interés
+    pixels = img_array[mask_condition]
 
-        # Aplicar máscara
-        masked_img = cv2.bitwise_and(img_array, img_array, mask=mask)
+    if len(pixels) == 0:
+        # Fallback: usar toda la imagen sin bordes
+        border = min(h, w) // 10
+        pixels = img_array[border:h-border, border:w-border].reshape(-1, 3)
 
-        # Obtener solo los píxeles de la región de interés
-        pixels = masked_img[mask > 0]
+    # Filtrar píxeles muy oscuros o muy claros (probablemente sombras/reflejos)
+    brightness = pixels.sum(axis=1, dtype=np.uint16)
+    valid_pixels = pixels[(brightness > 90) & (brightness < 675)]
 
-        if len(pixels) == 0:
-            # Fallback: usar toda la imagen sin bordes
-            border = min(h, w) // 10
-            pixels = img_array[border:h-border, border:w-border].reshape(-1, 3)
+    if len(valid_pixels) < 100:
+        valid_pixels = pixels  # Usar todos si hay muy pocos válidos
 
-        # Filtrar píxeles muy oscuros o muy claros (probablemente sombras/reflejos)
-        brightness = np.mean(pixels, axis=1)
-        valid_pixels = pixels[(brightness > 30) & (brightness < 225)]
+    return valid_pixels
 
-        if len(valid_pixels) < 100:
-            valid_pixels = pixels  # Usar todos si hay muy pocos válidos
+@timer("colors")
+def extract_clothing_colors(image: Union[Image.Image, np.ndarray], num_colors=3):
+    """Extraer colores dominantes de una prenda evitando el fondo"""
+    try:
+        valid_pixels = select_garment_pixels(image)
 
-        # Aplicar K-means clustering
+        # Cuantización de colores (histograma + Lloyd ponderado, ver palette.py)
         n_colors = min(num_colors, len(valid_pixels) // 50)  # Asegurar suficientes píxeles por cluster
         if n_colors < 1:
             n_colors = 1
 
-        kmeans = KMeans(n_clusters=n_colors, random_state=42, n_init=10)
-        kmeans.fit(valid_pixels)
+        centers, frequencies = quantize_colors(valid_pixels, n_colors)
 
         # Obtener colores dominantes
-        colors = kmeans.cluster_centers_.astype(int)
+        colors = centers.astype(int)
 
-        # Calcular frecuencia de cada color
-        labels = kmeans.labels_
-        label_counts = Counter(labels)
+        # Nombrar todos los centros en una sola búsqueda vectorizada
+        names = color_names(colors)
 
-        # Ordenar colores por frecuencia
         color_info = []
-        for i, color in enumerate(colors):
-            frequency = label_counts[i] / len(labels)
-            color_name = rgb_to_color_name(color)
+        for color, name, frequency in zip(colors, names, frequencies):
             color_info.append({
-                "nombre": color_name,
+                "nombre": name,
                 "rgb": color.tolist(),
                 "hex": "#{:02x}{:02x}{:02x}".format(color[0], color[1], color[2]),
-                "frecuencia": round(frequency, 3)
+                "frecuencia": round(float(frequency), 3)
             })
 
         # Ordenar por frecuencia descendente
@@ -360,95 +607,520 @@ def extract_clothing_colors(image: Image.Image, num_colors=3):
             "frecuencia": 1.0
         }]
 
-def predict_clothing(image: Image.Image) -> Dict[str, Any]:
+def color_worker() -> ThreadPoolExecutor:
+    """Hilo de este proceso para extraer colores durante el forward (inline y workers de proceso).
+
+    Se crea de nuevo si el proceso cambió: los hilos no sobreviven a un fork (prefork.py).
+    """
+    global colors_pool, colors_pool_pid
+    if colors_pool is None or colors_pool_pid != os.getpid():
+        colors_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="colors")
+        colors_pool_pid = os.getpid()
+    return colors_pool
+
+def overlap_colors(prepared: PreparedImage, overlap: Optional[bool] = None) -> bool:
+    """Solo vale la pena solapar si la petición necesita el modelo y los colores"""
+    enabled = settings.OVERLAP_COLORS if overlap is None else overlap
+    return enabled and prepared.pixel_values is not None and prepared.color_image is not None
+
+async def submit_forward(pixel_values: torch.Tensor) -> Dict[str, torch.Tensor]:
+    """Forward a través del micro-batcher (cola + forward cuentan como etapa batch)"""
+    with timer("batch"):
+        return await batcher.submit(pixel_values)
+
+def run_model(pixel_values: torch.Tensor) -> Dict[str, torch.Tensor]:
+    """Ejecutar el backend de inferencia sobre un batch [B, 3, 224, 224]"""
+    FORWARD_BATCH_SIZE.observe(len(pixel_values))
+    with timer("forward"):
+        return model(pixel_values)
+
+def predict_clothing(image: Image.Image, fields: Tuple[str, ...] = FIELDS) -> Dict[str, Any]:
     """Predecir tipo de prenda y clima usando el modelo custom"""
+    return predict_prepared(
+        processor.prepare_image(image, needs_model(fields), needs_colors(fields), needs_phash(fields)), fields
+    )
+
+def predict_prepared(prepared: PreparedImage, fields: Tuple[str, ...] = FIELDS,
+                     overlap: Optional[bool] = None) -> Dict[str, Any]:
+    """Predecir a partir del tensor del modelo y el buffer de colores ya preparados.
+
+    Con SW_OVERLAP_COLORS los colores se extraen en otro hilo mientras corre el forward.
+    """
     try:
-        # Preprocesar imagen
-        input_tensor = preprocess_image(image)
+        pending_colors = None
+        if overlap_colors(prepared, overlap):
+            pending_colors = color_worker().submit(extract_clothing_colors, prepared.color_image, 3)
+
+        # Hacer predicción (sin tensor, por ejemplo solo colores, no se ejecuta el modelo)
+        outputs = run_model(prepared.pixel_values) if prepared.pixel_values is not None else {}
+        colors = pending_colors.result() if pending_colors is not None else None
+        return build_prediction(
+            outputs.get('category_logits'), outputs.get('climate_logits'), prepared.color_image, fields, colors,
+            outputs.get('embedding'), prepared.phash
+        )
 
-        # Hacer predicción
-        with torch.no_grad():
-            outputs = model(input_tensor)
-            category_logits = outputs['category_logits']
-            climate_logits = outputs['climate_logits']
-
-            # Probabilidades para categorías
-            category_probs = F.softmax(category_logits, dim=-1)
-            climate_probs = F.softmax(climate_logits, dim=-1)
-
-            # Top 3 predicciones de categoría (para logs, pero solo devolveremos la mejor)
-            top_cat_probs, top_cat_indices = torch.topk(category_probs, k=min(3, len(classes)))
-
-            # Top 3 predicciones de clima
-            top_clim_probs, top_clim_indices = torch.topk(climate_probs, k=min(3, len(climate2idx)))
-
-            # Crear lista de climas
-            climate_names = list(climate2idx.keys())
-
-            # Devolver la mejor predicción y alternativas
-            all_predictions = []
-            for i in range(len(top_cat_indices[0])):
-                idx = top_cat_indices[0][i].item()
-                prob = top_cat_probs[0][i].item()
-
-                if idx < len(classes):
-                    class_name = classes[idx]
-                    categoria = map_to_category(class_name)
-
-                    prediction = {
-                        "clase": class_name,
-                        "confianza": float(prob),
-                        "nombre": get_spanish_name(class_name),
-                        "categoria": categoria,
-                        "climas": []  # Se llenará después con los climas predichos
-                    }
-                    all_predictions.append(prediction)
-
-            best_prediction = all_predictions[0] if all_predictions else None
-
-            # Resultados de climas (normalizados)
-            climate_results = []
-            for i in range(len(top_clim_indices[0])):
-                idx = top_clim_indices[0][i].item()
-                prob = top_clim_probs[0][i].item()
-
-                if idx < len(climate_names):
-                    climate_name = climate_names[idx]
-                    normalized_climate = normalize_climate_name(climate_name)
-                    climate_results.append({
-                        "clima": normalized_climate,
-                        "confianza": float(prob)
-                    })
-
-            # Actualizar climas en todas las predicciones (normalizados)
-            if all_predictions and climate_results:
-                top_climas = [normalize_climate_name(c["clima"]) for c in climate_results[:3]]
-                for prediction in all_predictions:
-                    prediction["climas"] = top_climas
+    except Exception as e:
+        logger.error(f"Error en predicción: {e}")
+        raise
 
-            # Extraer colores de la prenda
-            logger.info("🎨 Extrayendo colores de la prenda...")
-            colors = extract_clothing_colors(image, num_colors=3)
-
-            # Agregar colores a todas las predicciones
-            for prediction in all_predictions:
-                prediction["colores"] = colors
-
-            return {
-                "predicciones": all_predictions,
-                "mejor_prediccion": best_prediction,
-                "alternativas": all_predictions[1:] if len(all_predictions) > 1 else [],
-                "predicciones_clima": climate_results,
-                "mejor_clima": climate_results[0] if climate_results else None,
-                "colores": colors,
-                "color_principal": colors[0] if colors else None
-            }
+async def predict_clothing_batched(prepared: PreparedImage, fields: Tuple[str, ...] = FIELDS) -> Dict[str, Any]:
+    """Igual que predict_prepared, pero el forward pasa por el micro-batcher"""
+    try:
+        outputs, colors = {}, None
+        if overlap_colors(prepared):
+            # Los colores corren en el pool de inferencia mientras el micro-batcher hace el forward
+            outputs, colors = await asyncio.gather(
+                submit_forward(prepared.pixel_values),
+                executor.run(extract_clothing_colors, prepared.color_image)
+            )
+        elif prepared.pixel_values is not None:
+            outputs = await submit_forward(prepared.pixel_values)
+        return await executor.run(
+            build_prediction, outputs.get('category_logits'), outputs.get('climate_logits'),
+            prepared.color_image, fields, colors, outputs.get('embedding'), prepared.phash
+        )
 
     except Exception as e:
         logger.error(f"Error en predicción: {e}")
         raise
 
+@timer("decode")
+def decode_image(image_data: bytes, max_side: int = COLOR_MAX_SIDE) -> Image.Image:
+    """Decodificar los bytes subidos a una imagen PIL RGB (draft JPEG + orientación EXIF)"""
+    return processor.decode(image_data, max_side)
+
+def prepare_image(image_data: bytes, fields: Tuple[str, ...] = FIELDS) -> PreparedImage:
+    """Decodificar una sola vez y preparar el tensor del modelo y/o el buffer de colores"""
+    image = decode_image(image_data)
+    with timer("preprocess"):
+        prepared = processor.prepare_image(image, needs_model(fields), needs_colors(fields), needs_phash(fields))
+    width, height = prepared.original_size
+    IMAGE_MEGAPIXELS.observe(width * height / 1e6)
+    return prepared
+
+def predict_image_bytes(image_data: bytes, fields: Tuple[str, ...] = FIELDS,
+                        overlap: Optional[bool] = None) -> Dict[str, Any]:
+    """Decodificar y predecir en un solo paso (lo que ejecuta cada worker de proceso)"""
+    return predict_prepared(prepare_image(image_data, fields), fields, overlap)
+
+def prepare_regions(image_data: bytes) -> PreparedRegions:
+    """Decodificar una vez, proponer regiones y apilar un recorte por región (/predict/multi)"""
+    image = decode_image(image_data, settings.MULTI_DECODE_SIDE)
+    with timer("regions"):
+        boxes = propose_regions(processor.color_buffer(image), settings.MULTI_MAX_REGIONS)
+    with timer("preprocess"):
+        prepared = processor.prepare_regions(image, boxes)
+    width, height = prepared.original_size
+    IMAGE_MEGAPIXELS.observe(width * height / 1e6)
+    return prepared
+
+def detect_image_bytes(image_data: bytes) -> Dict[str, Any]:
+    """Regiones, forward y fusión en un solo paso (inline y workers de proceso)"""
+    prepared = prepare_regions(image_data)
+    outputs = run_model(prepared.pixel_values)
+    return build_detections(outputs['category_logits'], outputs['climate_logits'], prepared)
+
+def fields_cache_key(key: str, fields: Tuple[str, ...]) -> str:
+    """Las respuestas parciales se cachean aparte de la completa"""
+    return key if fields == FIELDS else f"{key}-{fields_tag(fields)}"
+
+async def cached_partial(key: str, fields: Tuple[str, ...]) -> Optional[Dict[str, Any]]:
+    """Una respuesta completa ya cacheada sirve para cualquier selección de campos (salvo el embedding)"""
+    if fields == FIELDS or not set(fields) <= set(FIELDS):
+        return None
+    cached = await cache.get(key)
+    return select_fields(cached, fields) if cached is not None else None
+
+async def predict_image_data(image_data: bytes, lane: str = "interactive",
+                             fields: Tuple[str, ...] = FIELDS) -> Dict[str, Any]:
+    """Predecir pasando por la caché: subidas idénticas comparten un único cálculo"""
+    if cache is None:
+        return await admitted_prediction(image_data, lane, fields)
+    key = await asyncio.to_thread(content_key, image_data, model_version)
+    cached = await cached_partial(key, fields)
+    if cached is not None:
+        return cached
+    return await cache.get_or_compute(
+        fields_cache_key(key, fields), lambda: admitted_prediction(image_data, lane, fields)
+    )
+
+async def admitted_prediction(image_data: bytes, lane: str, fields: Tuple[str, ...] = FIELDS) -> Dict[str, Any]:
+    """Calcular la predicción con un lugar del carril (los aciertos de caché no esperan)"""
+    if admission is None:
+        return await compute_prediction(image_data, fields)
+    async with admission.slot(lane):
+        return await compute_prediction(image_data, fields)
+
+def count_skipped(fields: Tuple[str, ...], images: int = 1):
+    for stage in skipped_stages(fields):
+        STAGES_SKIPPED.inc(images, stage=stage)
+
+async def compute_prediction(image_data: bytes, fields: Tuple[str, ...] = FIELDS) -> Dict[str, Any]:
+    """Predecir sin bloquear el event loop según el executor configurado"""
+    INFERENCE_IN_FLIGHT.inc()
+    count_skipped(fields)
+    try:
+        if executor.kind == "inline":
+            return predict_image_bytes(image_data, fields)
+        if executor.kind == "process":
+            return await executor.run(predict_image_bytes, image_data, fields)
+        prepared = await executor.run(prepare_image, image_data, fields)
+        return await predict_clothing_batched(prepared, fields)
+    finally:
+        INFERENCE_IN_FLIGHT.dec()
+
+async def detect_image_data(image_data: bytes, lane: str = "interactive") -> Dict[str, Any]:
+    """Varias prendas por foto, con caché y un lugar del carril por cada región posible"""
+    async def admitted() -> Dict[str, Any]:
+        if admission is None:
+            return await compute_detections(image_data)
+        # Con pocos lugares (un worker de proceso por foto) la foto ocupa el carril entero
+        async with admission.slot(lane, min(settings.MULTI_MAX_REGIONS, admission.lane_limit(lane))):
+            return await compute_detections(image_data)
+
+    if cache is None:
+        return await admitted()
+    key = await asyncio.to_thread(content_key, image_data, model_version)
+    return await cache.get_or_compute(f"{key}-multi", admitted)
+
+async def compute_detections(image_data: bytes) -> Dict[str, Any]:
+    """Todas las regiones de la foto en un solo forward (por el micro-batcher en modo thread)"""
+    INFERENCE_IN_FLIGHT.inc()
+    try:
+        if executor.kind == "inline":
+            return detect_image_bytes(image_data)
+        if executor.kind == "process":
+            return await executor.run(detect_image_bytes, image_data)
+        prepared = await executor.run(prepare_regions, image_data)
+        outputs = await submit_forward(prepared.pixel_values)
+        return await executor.run(
+            build_detections, outputs['category_logits'], outputs['climate_logits'], prepared
+        )
+    finally:
+        INFERENCE_IN_FLIGHT.dec()
+
+async def profile_prediction(image_data: bytes, filename: str, fields: Tuple[str, ...] = FIELDS) -> Dict[str, Any]:
+    """Predecir en un solo hilo bajo cProfile + profiler de torch y guardar la traza (sin caché)"""
+    from profiling import image_meta, profile_call
+
+    meta = {"archivo": filename, "bytes": len(image_data), "campos": list(fields), **image_meta(image_data)}
+    count_skipped(fields)
+    # Sin solapar los colores: todas las etapas quedan en el hilo perfilado
+    call = partial(profile_call, predict_image_bytes, image_data, fields, False, meta=meta)
+    if executor.kind == "process":
+        # El modelo solo está cargado en los workers
+        result, meta, files = await executor.run(call)
+    else:
+        result, meta, files = await asyncio.to_thread(call)
+    await asyncio.to_thread(profiles.save, meta["id"], files)
+    return {
+        **result,
+        "perfil": {"id": meta["id"], "url": f"/profiles/{meta['id']}", "duracion_ms": meta["duracion_ms"]}
+    }
+
+def init_worker():
+    """Inicializador de los workers de proceso: cargar el modelo una sola vez"""
+    load_model()
+
+def worker_ready() -> Optional[str]:
+    """Backend con que quedó cargado el modelo del worker"""
+    return model.name if model is not None else None
 
+# Extensiones aceptadas dentro de un zip en /predict/batch
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.webp', '.bmp', '.gif', '.tif', '.tiff')
+
+def expand_uploads(uploads: List[Tuple[str, str, bytes]]) -> List[Tuple[str, bytes]]:
+    """Convertir (nombre, content_type, bytes) en una lista de imágenes, abriendo los zip.
+
+    Cada imagen del zip tiene el límite de una subida y el total descomprimido el de un lote.
+    """
+    images = []
+    total = 0
+    for filename, content_type, data in uploads:
+        is_zip = (content_type in ('application/zip', 'application/x-zip-compressed')
+                  or (filename or '').lower().endswith('.zip'))
+        if not is_zip:
+            images.append((filename, data))
+            continue
+
+        with zipfile.ZipFile(io.BytesIO(data)) as archive:
+            for info in archive.infolist():
+                name = info.filename
+                if info.is_dir() or name.startswith('__MACOSX/') or not name.lower().endswith(IMAGE_EXTENSIONS):
+                    continue
+                data = read_zip_member(archive, info, MAX_UPLOAD_BYTES)
+                total += len(data)
+                if total > MAX_BATCH_UPLOAD_BYTES:
+                    raise UploadTooLarge(MAX_BATCH_UPLOAD_BYTES)
+                images.append((name, data))
+    return images
+
+async def predict_many(images: List[Tuple[str, bytes]],
+                       fields: Tuple[str, ...] = FIELDS) -> AsyncIterator[Dict[str, Any]]:
+    """Predecir varias imágenes y entregar cada resultado apenas está listo.
+
+    En modo thread las imágenes se agrupan en tensores de SW_BATCH_MAX_SIZE y
+    cada grupo se envía al micro-batcher como un único forward (sin forward si
+    ``fields`` no necesita el modelo).
+    """
+    results: asyncio.Queue = asyncio.Queue()
+
+    def line(index: int, filename: str, result: Dict[str, Any] = None, error: str = None) -> Dict[str, Any]:
+        if error is not None:
+            PREDICTIONS.inc(result="error")
+            return {"indice": index, "archivo": filename, "error": error}
+        PREDICTIONS.inc(result="ok")
+        return {"indice": index, "archivo": filename, **result}
+
+    async def predict_one(index: int, filename: str, image_data: bytes, key: str = None):
+        try:
+            async with bulk_slot(1):
+                if key is not None:
+                    result = await cache.get_or_compute(key, lambda: compute_prediction(image_data, fields))
+                else:
+                    result = await compute_prediction(image_data, fields)
+            await results.put(line(index, filename, result))
+        except Exception as e:
+            await results.put(line(index, filename, error=str(e)))
+
+    def bulk_slot(weight: int):
+        # La petición ya fue admitida (ver predict_batch): sus imágenes esperan sin límite de cola
+        return admission.slot("bulk", weight, bounded=False) if admission is not None else nullcontext()
+
+    async def predict_chunk(chunk: List[Tuple[int, str, bytes, str]]):
+        async with bulk_slot(len(chunk)):
+            INFERENCE_IN_FLIGHT.inc(len(chunk))
+            count_skipped(fields, len(chunk))
+            try:
+                await predict_prepared_chunk(chunk)
+            finally:
+                INFERENCE_IN_FLIGHT.dec(len(chunk))
+
+    async def predict_prepared_chunk(chunk: List[Tuple[int, str, bytes, str]]):
+        prepared = await asyncio.gather(
+            *(executor.run(prepare_image, data, fields) for _, _, data, _ in chunk),
+            return_exceptions=True
+        )
+        ok = []
+        for (index, filename, _, key), item in zip(chunk, prepared):
+            if isinstance(item, Exception):
+                await results.put(line(index, filename, error=str(item)))
+            else:
+                ok.append((index, filename, key, item))
+        if not ok:
+            return
+
+        outputs = None
+        colors = [None] * len(ok)
+        if needs_model(fields):
+            forward = submit_forward(torch.cat([item.pixel_values for *_, item in ok], dim=0))
+            try:
+                if settings.OVERLAP_COLORS and needs_colors(fields):
+                    # Colores de todo el grupo en el pool mientras corre el forward
+                    outputs, *colors = await asyncio.gather(
+                        forward, *(executor.run(extract_clothing_colors, item.color_image) for *_, item in ok)
+                    )
+                else:
+                    outputs = await forward
+            except Exception as e:
+                for index, filename, *_ in ok:
+                    await results.put(line(index, filename, error=str(e)))
+                return
+
+        async def finish(i: int, index: int, filename: str, key: str, prepared: PreparedImage):
+            try:
+                result = await executor.run(
+                    build_prediction,
+                    outputs['category_logits'][i:i + 1] if outputs is not None else None,
+                    outputs['climate_logits'][i:i + 1] if outputs is not None else None,
+                    prepared.color_image,
+                    fields,
+                    colors[i],
+                    outputs['embedding'][i:i + 1] if outputs is not None and 'embedding' in outputs else None,
+                    prepared.phash
+                )
+                if cache is not None:
+                    await cache.put(key, result)
+                await results.put(line(index, filename, result))
+            except Exception as e:
+                await results.put(line(index, filename, error=str(e)))
+
+        await asyncio.gather(*(finish(i, *item[:4]) for i, item in enumerate(ok)))
+
+    # Las imágenes ya cacheadas se entregan de inmediato
+    indexed = []
+    for index, (filename, data) in enumerate(images):
+        IMAGE_BYTES.observe(len(data))
+        key = None
+        if cache is not None:
+            key = await asyncio.to_thread(content_key, data, model_version)
+            cached = await cached_partial(key, fields)
+            key = fields_cache_key(key, fields)
+            if cached is None:
+                cached = await cache.get(key)
+            if cached is not None:
+                await results.put(line(index, filename, cached))
+                continue
+        indexed.append((index, filename, data, key))
+
+    if executor.kind == "thread":
+        # Cada grupo ocupa tantos lugares como imágenes: no más de los que tiene el carril bulk
+        size = max(1, min(batcher.max_batch_size, admission.lane_limit("bulk")) if admission is not None
+                   else batcher.max_batch_size)
+        tasks = [asyncio.create_task(predict_chunk(indexed[i:i + size])) for i in range(0, len(indexed), size)]
+    else:
+        tasks = [asyncio.create_task(predict_one(*item)) for item in indexed]
+
+    try:
+        for _ in range(len(images)):
+            yield await results.get()
+    finally:
+        for task in tasks:
+            task.cancel()
+
+def build_prediction(category_logits: Optional[torch.Tensor], climate_logits: Optional[torch.Tensor],
+                     color_image: Optional[Union[Image.Image, np.ndarray]],
+                     fields: Tuple[str, ...] = FIELDS,
+                     colors: Optional[List[Dict[str, Any]]] = None,
+                     embedding: Optional[torch.Tensor] = None,
+                     phash: Optional[int] = None) -> Dict[str, Any]:
+    """Construir la respuesta a partir de los logits [1, N] y el buffer de colores de una imagen.
+
+    Solo se calcula lo que piden ``fields`` (ver fields.py); los logits o el
+    buffer que no hacen falta pueden ser None. ``colors`` trae los colores si ya
+    se extrajeron en paralelo con el forward; ``embedding`` es el pooler_output
+    [1, 768] y ``phash`` el hash perceptual calculado al preparar la imagen.
+    """
+    all_predictions = []
+    climate_results = []
+    if needs_model(fields):
+        postprocess = timer("postprocess").start()
+        with torch.no_grad():
+            if "category" in fields or "alternatives" in fields:
+                # Probabilidades para categorías
+                category_probs = F.softmax(category_logits, dim=-1)
+
+                # Top 3 predicciones de categoría (solo la mejor si no se piden alternativas)
+                k = 3 if "alternatives" in fields else 1
+                top_cat_probs, top_cat_indices = torch.topk(category_probs, k=min(k, len(classes)))
+
+                # Devolver la mejor predicción y alternativas
+                for i in range(len(top_cat_indices[0])):
+                    idx = top_cat_indices[0][i].item()
+                    prob = top_cat_probs[0][i].item()
+
+                    if idx < len(classes):
+                        class_name = classes[idx]
+                        categoria = map_to_category(class_name)
+
+                        prediction = {
+                            "clase": class_name,
+                            "confianza": float(prob),
+                            "nombre": get_spanish_name(class_name),
+                            "categoria": categoria
+                        }
+                        if "climate" in fields:
+                            prediction["climas"] = []  # Se llenará después con los climas predichos
+                        all_predictions.append(prediction)
+
+            if "climate" in fields:
+                climate_probs = F.softmax(climate_logits, dim=-1)
+
+                # Top 3 predicciones de clima
+                top_clim_probs, top_clim_indices = torch.topk(climate_probs, k=min(3, len(climate2idx)))
+
+                # Crear lista de climas
+                climate_names = list(climate2idx.keys())
+
+                # Resultados de climas (normalizados)
+                for i in range(len(top_clim_indices[0])):
+                    idx = top_clim_indices[0][i].item()
+                    prob = top_clim_probs[0][i].item()
+
+                    if idx < len(climate_names):
+                        climate_name = climate_names[idx]
+                        normalized_climate = normalize_climate_name(climate_name)
+                        climate_results.append({
+                            "clima": normalized_climate,
+                            "confianza": float(prob)
+                        })
+
+                # Actualizar climas en todas las predicciones (normalizados)
+                if all_predictions and climate_results:
+                    top_climas = [normalize_climate_name(c["clima"]) for c in climate_results[:3]]
+                    for prediction in all_predictions:
+                        prediction["climas"] = top_climas
+
+        postprocess.stop()
+
+    if needs_colors(fields):
+        if colors is None:
+            # Extraer colores de la prenda
+            logger.info("🎨 Extrayendo colores de la prenda...")
+            colors = extract_clothing_colors(color_image, num_colors=3)
+
+        # Agregar colores a todas las predicciones
+        for prediction in all_predictions:
+            prediction["colores"] = colors
+    else:
+        colors = []
+
+    best_prediction = all_predictions[0] if all_predictions else None
+    response = {
+        "predicciones": all_predictions,
+        "mejor_prediccion": best_prediction,
+        "alternativas": all_predictions[1:] if len(all_predictions) > 1 else [],
+        "predicciones_clima": climate_results,
+        "mejor_clima": climate_results[0] if climate_results else None,
+        "colores": colors,
+        "color_principal": colors[0] if colors else None
+    }
+    if fields == FIELDS:
+        return response
+    if "embedding" in fields:
+        if embedding is None:
+            raise ValueError("El backend no entrega embeddings: volver a exportar el artefacto con export_model.py")
+        # Normalizado y redondeado: se guarda en float16 y viaja como JSON por la caché
+        vector = embedding.detach().float().numpy()
+        response["embedding"] = np.round(normalize(vector), 5).tolist()
+        # La norma permite reconstruir el pooler_output y reaplicar las cabezas (reclassify.py)
+        response["norma_embedding"] = round(float(np.linalg.norm(vector)), 4)
+    if "phash" in fields:
+        response["phash"] = hash_hex(phash)
+    keys = response_keys(fields)
+    return {key: value for key, value in response.items() if key in keys}
+
+
+
+def build_detections(category_logits: torch.Tensor, climate_logits: torch.Tensor,
+                     prepared: PreparedRegions) -> Dict[str, Any]:
+    """Prendas de una foto a partir de los logits [R, N] de sus regiones.
+
+    Las regiones con la misma clase que se superponen se fusionan en la de
+    mayor confianza; las que no llegan a SW_MULTI_MIN_CONFIDENCE se descartan
+    (salvo la mejor, para no devolver una foto vacía). Los colores se extraen
+    solo de los recortes que quedan.
+    """
+    with timer("postprocess"), torch.no_grad():
+        scores, labels = F.softmax(category_logits.float(), dim=-1).max(dim=-1)
+        scores, labels = scores.tolist(), labels.tolist()
+    merged = merge_detections(prepared.boxes, labels, scores, settings.MULTI_MERGE_IOU)
+    kept = [(i, group) for i, group in merged if scores[i] >= settings.MULTI_MIN_CONFIDENCE] or merged[:1]
+
+    garments = []
+    for i, group in kept:
+        result = build_prediction(
+            category_logits[i:i + 1], climate_logits[i:i + 1], prepared.color_images[i],
+            ("category", "climate", "colors")
+        )
+        garments.append({
+            **result["mejor_prediccion"],
+            "color_principal": result["color_principal"],
+            "caja": [round(value, 4) for value in prepared.boxes[i]],
+            "regiones": len(group)
+        })
+    DETECTIONS.observe(len(garments))
+    return {"prendas": garments, "propuestas": len(prepared.boxes)}
 
 @app.get("/", response_class=HTMLResponse)
 async def get_test_interface():
@@ -589,40 +1261,410 @@ async def get_test_interface():
     """
     return HTMLResponse(content=html_content)
 
+def rejection(e: Exception) -> HTTPException:
+    """Respuesta para una subida rechazada: cola llena (503), bytes o píxeles (413), formato (415)"""
+    if isinstance(e, AdmissionRejected):
+        logger.warning(f"🚦 {e}")
+        return HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+    if isinstance(e, UploadTooLarge):
+        UPLOADS_REJECTED.inc(reason="bytes")
+        return HTTPException(status_code=413, detail=str(e))
+    UPLOADS_REJECTED.inc(reason="pixels" if e.status_code == 413 else "format")
+    logger.warning(f"🛡️ Imagen rechazada: {e}")
+    return HTTPException(status_code=e.status_code, detail=str(e))
+
+def check_embedding_ids(user: Optional[str], item: Optional[str] = None):
+    """Validar usuario y prenda de los endpoints de embeddings"""
+    if embeddings is None:
+        raise HTTPException(status_code=403, detail="Embeddings deshabilitados (SW_EMBEDDINGS_DIR)")
+    if user is None or not valid_id(user):
+        raise HTTPException(status_code=400, detail="user debe tener solo letras, números, _ o - (hasta 128)")
+    if item is not None and not valid_id(item):
+        raise HTTPException(status_code=400, detail="item debe tener solo letras, números, _ o - (hasta 128)")
+
+def embedding_meta(filename: str, result: Dict[str, Any]) -> Dict[str, Any]:
+    """Datos de la prenda que se guardan junto a su embedding (vuelven en /similar)"""
+    best = result.get("mejor_prediccion") or {}
+    color = result.get("color_principal") or {}
+    meta = {
+        "archivo": filename,
+        "clase": best.get("clase"),
+        "nombre": best.get("nombre"),
+        "categoria": best.get("categoria"),
+        "confianza": round(best["confianza"], 5) if "confianza" in best else None,
+        "climas": best.get("climas"),
+        "predicciones_clima": result.get("predicciones_clima") or None,
+        "color": color.get("hex"),
+        "phash": result.get("phash"),
+        # Con qué modelo se clasificó y la norma del pooler_output: reclassify.py los usa
+        "modelo": model_version,
+        "norma": result.get("norma_embedding"),
+    }
+    return {key: value for key, value in meta.items() if value is not None}
+
+async def store_embedding(user: str, item: Optional[str], filename: str, result: Dict[str, Any],
+                          selected: Tuple[str, ...] = FIELDS) -> Dict[str, Any]:
+    """Guardar el embedding de la predicción y devolver la respuesta con ``embedding_id``.
+
+    El embedding (con su norma) y el hash perceptual quedan en la respuesta solo si estaban en ``selected``.
+    """
+    meta = embedding_meta(filename, result)
+    vector = np.asarray(result["embedding"], dtype=np.float32)
+    dropped = response_keys(name for name in EXTRA_FIELDS if name not in selected)
+    result = {key: value for key, value in result.items() if key not in dropped}
+    item_id = await asyncio.to_thread(embeddings.add, user, vector, meta, item)
+    EMBEDDING_EVENTS.inc(event="stored")
+    return {**result, "embedding_id": item_id}
+
+def dedup_mode(dedup: Optional[str], user: Optional[str], modes: Tuple[str, ...] = DEDUP_MODES) -> str:
+    """Detección de casi duplicados de la petición: off, flag o skip (por defecto SW_DEDUP_MODE con user)"""
+    if dedup is not None and dedup not in modes:
+        raise HTTPException(status_code=400, detail=f"dedup debe ser {' o '.join(modes)}")
+    if user is None:
+        if dedup not in (None, "off"):
+            raise HTTPException(status_code=400, detail="dedup necesita user")
+        return "off"
+    return dedup or (settings.DEDUP_MODE if settings.DEDUP_MODE in modes else "flag")
+
+def computed_fields(selected: Tuple[str, ...], user: Optional[str], dedup: str) -> Tuple[str, ...]:
+    """Con user el embedding (y con dedup el hash) se calculan siempre, pero solo se devuelven si se pidieron"""
+    computed = selected
+    if user is not None:
+        computed = with_field(computed, "embedding")
+    if dedup != "off":
+        computed = with_field(computed, "phash")
+    return computed
+
+async def find_duplicates(user: str, phash: str, item: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Prendas guardadas del usuario a distancia <= SW_DEDUP_MAX_DISTANCE (sin contar la misma ``item``)"""
+    with timer("dedup"):
+        return await asyncio.to_thread(embeddings.duplicates, user, phash, item)
+
 @app.post("/predict")
-async def predict_image(file: UploadFile = File(...)):
-    """Endpoint para clasificar una imagen"""
+async def predict_image(file: UploadFile = File(...), profile: bool = False, priority: str = "interactive",
+                        fields: Optional[str] = None, mode: Optional[str] = None,
+                        user: Optional[str] = None, item: Optional[str] = None, dedup: Optional[str] = None):
+    """Endpoint para clasificar una imagen (profile=true guarda un perfil de la petición).
+
+    priority=bulk manda la imagen al carril de baja prioridad (clasificación en segundo plano).
+    fields=category,colors (o mode=fast) calcula solo esas partes de la respuesta.
+    user=<uid> guarda el embedding de la prenda (con id ``item`` o uno nuevo) para /similar.
+    dedup=flag marca las fotos casi iguales a una prenda guardada; dedup=skip no las clasifica.
+    """
+    if profile and profiles is None:
+        raise HTTPException(status_code=403, detail="Perfiles deshabilitados (SW_PROFILING_ENABLED)")
+    if priority not in LANES:
+        raise HTTPException(status_code=400, detail=f"priority debe ser {' o '.join(LANES)}")
+    try:
+        selected = parse_fields(fields, mode)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if user is not None or item is not None:
+        check_embedding_ids(user, item)
+    dedup = dedup_mode(dedup, user)
+    computed = computed_fields(selected, user, dedup)
+
     try:
         # Validar que sea una imagen
-        if not file.content_type.startswith('image/'):
+        if not (file.content_type or '').startswith('image/'):
             raise HTTPException(status_code=400, detail="El archivo debe ser una imagen")
         
-        # Leer imagen
-        image_data = await file.read()
-        image = Image.open(io.BytesIO(image_data))
+        # Leer imagen (por bloques, con el límite de SW_MAX_UPLOAD_MB)
+        image_data = await read_upload(file, MAX_UPLOAD_BYTES)
+        IMAGE_BYTES.observe(len(image_data))
         
-        logger.info(f"📸 Procesando imagen: {file.filename}, tamaño: {image.size}")
+        logger.info(f"📸 Procesando imagen: {file.filename}, {len(image_data)} bytes")
         
-        # Hacer predicción
-        result = predict_clothing(image)
+        duplicates = None
+        if dedup == "skip":
+            # Primero solo decodificar y calcular el hash: una prenda ya guardada no se vuelve a clasificar
+            probe = await predict_image_data(image_data, priority, ("phash",))
+            duplicates = await find_duplicates(user, probe["phash"], item)
+            if duplicates:
+                DUPLICATES.inc(result="skipped")
+                logger.info(f"♊ {file.filename} es casi igual a {duplicates[0]['id']} "
+                            f"(distancia {duplicates[0]['distancia']}): no se clasifica")
+                skipped = {"duplicado": True, "duplicados": duplicates}
+                return {**skipped, "phash": probe["phash"]} if "phash" in selected else skipped
+
+        # Hacer predicción fuera del event loop
+        if profile:
+            result = await profile_prediction(image_data, file.filename, computed)
+        else:
+            result = await predict_image_data(image_data, priority, computed)
+        if dedup == "flag":
+            duplicates = await find_duplicates(user, result["phash"], item)
+            if duplicates:
+                DUPLICATES.inc(result="flagged")
+        if user is not None:
+            result = await store_embedding(user, item, file.filename, result, selected)
+        if duplicates is not None:
+            result["duplicados"] = duplicates
+        PREDICTIONS.inc(result="ok")
         
-        logger.info(f"✅ Predicción completada: {result['mejor_prediccion']['nombre'] if result['mejor_prediccion'] else 'Sin resultado'}")
+        best = result.get('mejor_prediccion')
+        logger.info(f"✅ Predicción completada: {best['nombre'] if best else 'Sin resultado'}"
+                    + (f" (campos: {fields_tag(selected)})" if selected != FIELDS else ""))
         
         return result
     
+    except (AdmissionRejected, UploadTooLarge, ImageRejected) as e:
+        raise rejection(e)
+    except HTTPException:
+        raise
     except Exception as e:
+        PREDICTIONS.inc(result="error")
         logger.error(f"❌ Error en predicción: {e}")
         raise HTTPException(status_code=500, detail=f"Error procesando imagen: {str(e)}")
 
+@app.post("/predict/batch")
+async def predict_batch(files: List[UploadFile] = File(...), fields: Optional[str] = None, mode: Optional[str] = None,
+                        user: Optional[str] = None, dedup: Optional[str] = None):
+    """Clasificar muchas imágenes (o un zip) devolviendo una línea NDJSON por imagen"""
+    try:
+        selected = parse_fields(fields, mode)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if user is not None:
+        check_embedding_ids(user)
+    # En el lote las imágenes se clasifican juntas: los duplicados solo se marcan
+    dedup = dedup_mode(dedup, user, ("off", "flag"))
+    computed = computed_fields(selected, user, dedup)
+
+    uploads = []
+    remaining = MAX_BATCH_UPLOAD_BYTES
+    for file in files:
+        content_type = file.content_type or ''
+        filename = file.filename or ''
+        is_zip = 'zip' in content_type or filename.lower().endswith('.zip')
+        if not is_zip and not content_type.startswith('image/'):
+            raise HTTPException(status_code=400, detail=f"{filename}: el archivo debe ser una imagen o un zip")
+        try:
+            # Un zip puede pesar lo que el lote completo; una imagen, lo de una subida
+            data = await read_upload(file, remaining if is_zip else min(remaining, MAX_UPLOAD_BYTES))
+        except UploadTooLarge as e:
+            UPLOADS_REJECTED.inc(reason="bytes")
+            raise HTTPException(status_code=413, detail=f"{filename}: {e}")
+        remaining -= len(data)
+        uploads.append((filename, content_type, data))
+
+    try:
+        images = await asyncio.to_thread(expand_uploads, uploads)
+    except zipfile.BadZipFile as e:
+        raise HTTPException(status_code=400, detail=f"Zip inválido: {e}")
+    except UploadTooLarge as e:
+        UPLOADS_REJECTED.inc(reason="bytes")
+        raise HTTPException(status_code=413, detail=f"Zip: {e}")
+
+    if not images:
+        raise HTTPException(status_code=400, detail="No se encontraron imágenes")
+
+    if admission is not None:
+        # Todas las imágenes esperan en la cola bulk (sin límite una vez admitidas): el lote
+        # entero se rechaza antes de empezar a responder si no cabe, y con 413 si no cabría nunca
+        if len(images) > admission.max_request("bulk"):
+            raise HTTPException(
+                status_code=413,
+                detail=f"Lote de {len(images)} imágenes: el máximo por petición es {admission.max_request('bulk')} "
+                       f"(SW_ADMISSION_BULK_QUEUE_DEPTH)"
+            )
+        try:
+            admission.check("bulk", len(images))
+        except AdmissionRejected as e:
+            raise rejection(e)
+
+    logger.info(f"📚 Procesando lote de {len(images)} imágenes")
+
+    async def stream():
+        async for result in predict_many(images, computed):
+            if user is not None and "error" not in result:
+                try:
+                    duplicates = await find_duplicates(user, result["phash"]) if dedup == "flag" else None
+                    if duplicates:
+                        DUPLICATES.inc(result="flagged")
+                    result = await store_embedding(user, None, result["archivo"], result, selected)
+                    if duplicates is not None:
+                        result["duplicados"] = duplicates
+                except Exception as e:
+                    logger.error(f"❌ Error guardando embedding de {result['archivo']}: {e}")
+                    for key in ("embedding", "phash"):
+                        if key not in selected:
+                            result.pop(key, None)
+            yield json.dumps(result, ensure_ascii=False) + "\n"
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+@app.post("/predict/multi")
+async def predict_multi(file: UploadFile = File(...), priority: str = "interactive"):
+    """Detectar varias prendas en una foto (un outfit completo, una persona de cuerpo entero).
+
+    Cada prenda trae su caja normalizada (x0, y0, x1, y1), clase, climas y colores.
+    """
+    if priority not in LANES:
+        raise HTTPException(status_code=400, detail=f"priority debe ser {' o '.join(LANES)}")
+    try:
+        if not (file.content_type or '').startswith('image/'):
+            raise HTTPException(status_code=400, detail="El archivo debe ser una imagen")
+        image_data = await read_upload(file, MAX_UPLOAD_BYTES)
+        IMAGE_BYTES.observe(len(image_data))
+        logger.info(f"👗 Detectando prendas en: {file.filename}, {len(image_data)} bytes")
+
+        result = await detect_image_data(image_data, priority)
+        PREDICTIONS.inc(result="ok")
+        logger.info(f"✅ {len(result['prendas'])} prendas detectadas en {result['propuestas']} regiones: "
+                    f"{', '.join(garment['nombre'] for garment in result['prendas'])}")
+        return result
+
+    except (AdmissionRejected, UploadTooLarge, ImageRejected) as e:
+        raise rejection(e)
+    except HTTPException:
+        raise
+    except Exception as e:
+        PREDICTIONS.inc(result="error")
+        logger.error(f"❌ Error detectando prendas: {e}")
+        raise HTTPException(status_code=500, detail=f"Error procesando imagen: {str(e)}")
+
+@app.get("/similar")
+async def similar_items(user: str, item: str, k: int = 10):
+    """Prendas del usuario más parecidas a una ya guardada (sin volver a pasar por el modelo)"""
+    check_embedding_ids(user, item)
+    if not 1 <= k <= settings.SIMILAR_MAX_K:
+        raise HTTPException(status_code=400, detail=f"k debe estar entre 1 y {settings.SIMILAR_MAX_K}")
+    try:
+        with timer("similar"):
+            result = await asyncio.to_thread(embeddings.similar, user, k, item)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Prenda no encontrada")
+    SIMILAR_SEARCHES.inc(index=result["indice"])
+    return {"usuario": user, "prenda": item, **result}
+
+@app.post("/similar")
+async def similar_to_image(user: str, file: UploadFile = File(...), k: int = 10):
+    """Prendas del usuario más parecidas a una foto nueva (un forward, sin guardarla)"""
+    check_embedding_ids(user)
+    if not 1 <= k <= settings.SIMILAR_MAX_K:
+        raise HTTPException(status_code=400, detail=f"k debe estar entre 1 y {settings.SIMILAR_MAX_K}")
+    if not (file.content_type or '').startswith('image/'):
+        raise HTTPException(status_code=400, detail="El archivo debe ser una imagen")
+    try:
+        image_data = await read_upload(file, MAX_UPLOAD_BYTES)
+        prediction = await predict_image_data(image_data, "interactive", ("embedding",))
+    except (AdmissionRejected, UploadTooLarge, ImageRejected) as e:
+        raise rejection(e)
+    with timer("similar"):
+        result = await asyncio.to_thread(
+            embeddings.similar, user, k, None, np.asarray(prediction["embedding"], dtype=np.float32)
+        )
+    SIMILAR_SEARCHES.inc(index=result["indice"])
+    return {"usuario": user, **result}
+
+@app.delete("/embeddings/{user}/{item}")
+async def delete_embedding(user: str, item: str):
+    """Borrar el embedding de una prenda (por ejemplo, al eliminarla del closet)"""
+    check_embedding_ids(user, item)
+    if not await asyncio.to_thread(embeddings.remove, user, item):
+        raise HTTPException(status_code=404, detail="Prenda no encontrada")
+    EMBEDDING_EVENTS.inc(event="removed")
+    return {"usuario": user, "prenda": item, "eliminado": True}
+
+@app.post("/suggest")
+async def suggest_outfits(payload: Dict[str, Any] = Body(...)):
+    """Mejores outfits (superior + inferior + calzado) del closet para un clima o una lectura del tiempo.
+
+    El cuerpo lleva ``prendas`` (las predicciones guardadas: ``clase`` o ``climas``,
+    ``categoria`` y ``colores``), y ``clima`` o ``temperatura`` (con ``condicion`` y
+    ``viento`` opcionales). ``n`` es la cantidad de outfits (5 por defecto).
+    """
+    items = payload.get("prendas")
+    if not isinstance(items, list):
+        raise HTTPException(status_code=400, detail="prendas debe ser una lista")
+    if len(items) > settings.SUGGEST_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"Máximo {settings.SUGGEST_MAX_ITEMS} prendas por petición")
+    n = payload.get("n", 5)
+    if not isinstance(n, int) or not 1 <= n <= settings.SUGGEST_MAX_N:
+        raise HTTPException(status_code=400, detail=f"n debe estar entre 1 y {settings.SUGGEST_MAX_N}")
+
+    try:
+        climates = {}
+        if payload.get("clima"):
+            names = payload["clima"] if isinstance(payload["clima"], list) else [payload["clima"]]
+            climates = {str(name): 1.0 for name in names}
+        if payload.get("temperatura") is not None:
+            for name, weight in weather_climates(
+                float(payload["temperatura"]), payload.get("condicion"),
+                float(payload["viento"]) if payload.get("viento") is not None else None
+            ).items():
+                climates[name] = climates.get(name, 0.0) + weight
+        with timer("suggest"):
+            result = await asyncio.to_thread(outfit_engine.suggest, items, climates, n)
+    except (ValueError, TypeError, KeyError) as e:
+        raise HTTPException(status_code=400, detail=f"Petición inválida: {e}")
+
+    logger.info(f"👕 {len(result['outfits'])} outfits de {result['combinaciones']} combinaciones "
+                f"({result['evaluadas']} evaluadas)")
+    return result
+
 @app.get("/health")
 async def health_check():
     """Endpoint de salud"""
     return {
         "status": "healthy",
-        "model_loaded": model is not None,
+        "model_loaded": backend_name is not None,
+        "executor": executor.kind if executor else None,
+        "backend": backend_name,
+        "precision": settings.PRECISION,
+        "thread_budget": budget._asdict() if budget is not None else None,
         "classes_available": len(class_names) if class_names else 0
     }
 
+@app.get("/stats/cache")
+async def cache_stats():
+    """Aciertos, fallos y desalojos de la caché de predicciones"""
+    if cache is None:
+        return {"enabled": False}
+    return {"enabled": True, "model_version": model_version, **cache.stats()}
+
+@app.get("/stats/batching")
+async def batching_stats():
+    """Tamaños de batch alcanzados y tiempos de espera en cola del micro-batcher"""
+    if batcher is None:
+        raise HTTPException(status_code=503, detail="Micro-batcher no iniciado")
+    return {
+        "max_batch_size": batcher.max_batch_size,
+        "max_wait_ms": batcher.max_wait * 1000,
+        **batcher.stats.snapshot()
+    }
+
+@app.get("/stats/admission")
+async def admission_stats():
+    """Capacidad, colas y rechazos por carril (para decidir el autoescalado)"""
+    if admission is None:
+        return {"enabled": False}
+    return {"enabled": True, **admission.snapshot()}
+
+@app.get("/profiles")
+async def list_profiles():
+    """Perfiles guardados, del más reciente al más antiguo"""
+    if profiles is None:
+        raise HTTPException(status_code=404, detail="Perfiles deshabilitados (SW_PROFILING_ENABLED)")
+    return [{**entry, "url": f"/profiles/{entry['id']}"} for entry in profiles.list()]
+
+@app.get("/profiles/{profile_id}")
+async def download_profile(profile_id: str):
+    """Descargar el zip de un perfil (trace.json, cprofile.prof, cprofile.txt, meta.json)"""
+    path = profiles.path(profile_id) if profiles is not None else None
+    if path is None:
+        raise HTTPException(status_code=404, detail="Perfil no encontrado")
+    return FileResponse(path, media_type="application/zip", filename=f"perfil-{profile_id}.zip")
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Métricas en formato de texto de Prometheus"""
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+# Rutas conocidas, para no crear una serie por cada URL inexistente
+ROUTE_PATHS = {route.path for route in app.routes}
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
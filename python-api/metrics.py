@@ -0,0 +1,249 @@
+"""
+Métricas en formato de texto de Prometheus, sin dependencias externas.
+
+- ``Counter``, ``Gauge`` e ``Histogram`` con etiquetas, seguros entre hilos
+  (el forward y los colores corren en pools de hilos).
+- ``timer(stage)`` mide una etapa como context manager, decorador o con
+  ``start``/``stop`` explícitos, y la registra en ``sw_stage_seconds``. Cuesta
+  dos ``perf_counter`` y un lock, así que cualquier función puede usarlo.
+- ``REGISTRY.render()`` genera el texto que expone ``GET /metrics``.
+
+En modo ``process`` las etapas que corren dentro de los workers no llegan al
+registro del proceso principal; las métricas HTTP y de caché sí.
+"""
+
+import functools
+import math
+import threading
+import time
+from bisect import bisect_left
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+# Buckets en segundos: de 1 ms a 30 s, cubre desde el cálculo de colores hasta
+# un lote grande en CPU
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _label_text(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        try:
+            if len(labels) == len(self.labelnames):
+                return tuple([str(labels[name]) for name in self.labelnames])
+        except KeyError:
+            pass
+        raise ValueError(f"{self.name}: se esperaban las etiquetas {self.labelnames}, llegaron {tuple(labels)}")
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._function: Optional[Callable[[], Dict[Tuple[str, ...], float]]] = None
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def set_function(self, fn: Callable[[], Dict[Tuple[str, ...], float]]):
+        """Leer los valores al exponer las métricas: ``fn`` devuelve {valores de etiquetas: valor}.
+
+        Sirve para publicar contadores que ya lleva otro componente (caché, batcher).
+        """
+        self._function = fn
+
+    def samples(self) -> List[str]:
+        if self._function is not None:
+            try:
+                items = sorted(self._function().items())
+            except Exception:
+                return []
+        else:
+            with self._lock:
+                items = sorted(self._values.items())
+        return [f"{self.name}{_label_text(self.labelnames, key)} {_format_value(v)}" for key, v in items]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = float(value)
+
+    def dec(self, amount: float = 1.0, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[Tuple[str, ...], List] = {}  # clave -> [conteos por bucket, suma, total]
+
+    def observe(self, value: float, **labels):
+        self._observe(self._key(labels), value)
+
+    def _observe(self, key: Tuple[str, ...], value: float):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def count(self, **labels) -> int:
+        series = self._series.get(self._key(labels))
+        return series[2] if series else 0
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = sorted((key, (list(s[0]), s[1], s[2])) for key, s in self._series.items())
+        lines = []
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (math.inf,), counts):
+                cumulative += bucket_count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_label_text(self.labelnames, key, le)} {cumulative}")
+            labels = _label_text(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self.enabled = True
+
+    def _register(self, metric: _Metric) -> _Metric:
+        existing = self._metrics.get(metric.name)
+        if existing is not None:
+            return existing  # recargar el módulo no duplica series
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            samples = metric.samples()
+            if samples:
+                lines.extend(metric.header())
+                lines.extend(samples)
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+STAGE_SECONDS = REGISTRY.histogram(
+    "sw_stage_seconds", "Duración de cada etapa de la predicción", ["stage"]
+)
+
+# Solo se instala mientras profiling.py perfila una petición: devuelve un
+# context manager que marca la etapa en la traza
+_stage_hook: Optional[Callable[[str], Any]] = None
+
+
+def set_stage_hook(hook: Optional[Callable[[str], Any]]):
+    global _stage_hook
+    _stage_hook = hook
+
+
+class timer:
+    """Medir una etapa en sw_stage_seconds.
+
+    Se usa como ``with timer("decode"):``, como decorador ``@timer("colors")``
+    o con ``t = timer("postprocess").start()`` ... ``t.stop()``.
+    """
+
+    __slots__ = ("stage", "_key", "_started", "_span")
+
+    def __init__(self, stage: str):
+        self.stage = stage
+        self._key = (stage,)  # clave de la serie ya resuelta: sin validar etiquetas en cada medición
+        self._started = 0.0
+        self._span = None
+
+    def start(self) -> "timer":
+        if _stage_hook is not None:
+            self._span = _stage_hook(self.stage)
+            self._span.__enter__()
+        self._started = time.perf_counter()
+        return self
+
+    def stop(self) -> float:
+        elapsed = time.perf_counter() - self._started
+        if self._span is not None:
+            self._span.__exit__(None, None, None)
+            self._span = None
+        if REGISTRY.enabled:
+            STAGE_SECONDS._observe(self._key, elapsed)
+        return elapsed
+
+    def __enter__(self) -> "timer":
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+        return False
+
+    def __call__(self, fn: Callable) -> Callable:
+        stage = self.stage
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with timer(stage):
+                return fn(*args, **kwargs)
+        return wrapper
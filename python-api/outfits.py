@@ -0,0 +1,292 @@
+"""
+Sugerencia de outfits (superior + inferior + calzado) para un clima.
+
+El puntaje de un outfit combina dos términos, ambos en [0, 1]:
+
+- Clima: para cada prenda, la fila de su clase en la matriz ``climates`` del
+  checkpoint (clase x clima, 0/1) por el vector de pesos del clima pedido
+  (``frio``, o una lectura ``temperatura`` / ``condicion`` / ``viento``). Las
+  prendas sin clase usan sus ``climas`` guardados.
+- Color: compatibilidad del color principal de cada par de prendas (neutros
+  con todo, tono sobre tono, complementarios, ...).
+
+``puntaje = (1 - peso_color) * media(clima) + peso_color * media(pares)``
+
+No se recorre el producto cartesiano completo: se calcula de una vez la matriz
+superior x inferior y, para cada par, una cota superior del mejor calzado
+posible (máximos por fila de las matrices superior x calzado e inferior x
+calzado). Los pares se evalúan contra todos los calzados en bloques, de mayor
+a menor cota, y la búsqueda termina cuando la cota del siguiente par ya no
+supera al N-ésimo mejor outfit encontrado. El resultado es el mismo top-N que
+con el producto completo (``python -m benchmarks.bench_suggest`` lo verifica).
+"""
+
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+OUTFIT_CATEGORIES = ("superior", "inferior", "calzado")
+# Categorías sin las que no hay outfit; el calzado se agrega si hay
+REQUIRED_CATEGORIES = ("superior", "inferior")
+
+# Nombres de clima de la app (y otras variantes) -> climas del checkpoint
+CLIMATE_ALIASES = {
+    "frío": "frio",
+    "nieve": "frio extremo",
+    "frío extremo": "frio extremo",
+}
+RAIN_CONDITIONS = ("rain", "drizzle", "thunderstorm", "lluvia", "lluvioso", "llovizna", "tormenta")
+SNOW_CONDITIONS = ("snow", "nieve", "nevando")
+CLEAR_CONDITIONS = ("clear", "despejado", "soleado")
+WINDY_MS = 8.0  # viento (m/s) desde el que cuentan las prendas de ``viento``
+
+# Compatibilidad de colores por diferencia de tono (grados)
+NEUTRAL_SATURATION = 0.2  # con menos saturación o brillo, el color es neutro
+NEUTRAL_VALUE = 0.2
+NEUTRAL_MATCH = 0.9       # neutro con cualquier color
+ANALOGOUS_MATCH = 0.8     # hasta 30°: tono sobre tono / análogos
+COMPLEMENTARY_MATCH = 0.7  # desde 150°: complementarios
+TRIAD_MATCH = 0.5         # 90° a 150°
+CLASH_MATCH = 0.3         # 30° a 90°
+UNKNOWN_MATCH = 0.5       # prenda sin colores
+
+BLOCK_PAIRS = 256  # pares que se evalúan a la vez contra todos los calzados
+
+
+def climate_name(name: str) -> str:
+    name = name.strip().lower()
+    return CLIMATE_ALIASES.get(name, name)
+
+
+def weather_climates(temperatura: float, condicion: Optional[str] = None,
+                     viento: Optional[float] = None) -> Dict[str, float]:
+    """Pesos de clima para una lectura del tiempo (mismos umbrales que weatherService.ts)"""
+    condicion = (condicion or "").strip().lower()
+    if temperatura < 5 or condicion in SNOW_CONDITIONS:
+        climates = {"frio extremo": 1.0}
+    elif temperatura < 15:
+        climates = {"frio": 1.0}
+    elif temperatura < 25:
+        climates = {"entretiempo": 1.0}
+    else:
+        climates = {"calor": 1.0}
+    if condicion in RAIN_CONDITIONS:
+        climates["lluvia"] = 1.0
+    if condicion in CLEAR_CONDITIONS and temperatura >= 20:
+        climates["soleado"] = 0.5
+    if viento is not None and viento >= WINDY_MS:
+        climates["viento"] = 1.0
+    return climates
+
+
+def color_hsv(rgb: np.ndarray) -> np.ndarray:
+    """(N, 3) RGB uint8 -> (N, 3) tono en grados, saturación y brillo en [0, 1]"""
+    hsv = cv2.cvtColor(np.asarray(rgb, dtype=np.uint8).reshape(-1, 1, 3), cv2.COLOR_RGB2HSV_FULL)
+    hsv = hsv.reshape(-1, 3).astype(np.float32)
+    return hsv * np.array([360 / 256, 1 / 255, 1 / 255], dtype=np.float32)
+
+
+def color_compatibility(a: np.ndarray, a_known: np.ndarray, b: np.ndarray, b_known: np.ndarray) -> np.ndarray:
+    """Matriz (len(a), len(b)) de compatibilidad entre colores HSV"""
+    neutral_a = (a[:, 1] < NEUTRAL_SATURATION) | (a[:, 2] < NEUTRAL_VALUE)
+    neutral_b = (b[:, 1] < NEUTRAL_SATURATION) | (b[:, 2] < NEUTRAL_VALUE)
+    diff = np.abs(a[:, None, 0] - b[None, :, 0])
+    diff = np.minimum(diff, 360 - diff)
+
+    scores = np.select(
+        [diff <= 30, diff >= 150, diff >= 90],
+        [ANALOGOUS_MATCH, COMPLEMENTARY_MATCH, TRIAD_MATCH],
+        CLASH_MATCH
+    ).astype(np.float32)
+    scores[neutral_a[:, None] | neutral_b[None, :]] = NEUTRAL_MATCH
+    scores[~(a_known[:, None] & b_known[None, :])] = UNKNOWN_MATCH
+    return scores
+
+
+def _hex_rgb(value: str) -> Tuple[int, int, int]:
+    value = value.lstrip("#")
+    if len(value) != 6:
+        raise ValueError(f"Color inválido: #{value}")
+    return int(value[0:2], 16), int(value[2:4], 16), int(value[4:6], 16)
+
+
+def item_color(item: Dict[str, Any]) -> Optional[Tuple[int, int, int]]:
+    """Color principal de una prenda: ``colores`` de /predict o de la app, o ``color`` en hex"""
+    colors = item.get("colores") or []
+    if colors:
+        main = colors[0]
+        if isinstance(main, dict):
+            return tuple(main["rgb"]) if "rgb" in main else _hex_rgb(main["hex"])
+    if item.get("color"):
+        return _hex_rgb(item["color"])
+    return None
+
+
+class Garments:
+    """Prendas de una categoría como arreglos: puntaje de clima y color principal"""
+
+    def __init__(self, items: List[Dict[str, Any]], climate: np.ndarray, rgb: np.ndarray, known: np.ndarray):
+        self.items = items
+        self.climate = climate
+        self.hsv = color_hsv(rgb) if len(rgb) else np.zeros((0, 3), dtype=np.float32)
+        self.known = known
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+
+class OutfitEngine:
+    """Puntaje y búsqueda de outfits con la matriz de climas del checkpoint"""
+
+    def __init__(self, classes: Sequence[str], climate2idx: Dict[str, int], climates_matrix,
+                 class_categories: Dict[str, str], color_weight: float = 0.3):
+        self.class2idx = {name: i for i, name in enumerate(classes)}
+        self.climate2idx = dict(climate2idx)
+        self.matrix = np.asarray(climates_matrix, dtype=np.float32)
+        self.class_categories = class_categories
+        self.color_weight = color_weight
+
+    def climate_weights(self, climates: Dict[str, float]) -> np.ndarray:
+        """Vector de pesos sobre los climas del checkpoint (suma 1)"""
+        weights = np.zeros(len(self.climate2idx), dtype=np.float32)
+        for name, weight in climates.items():
+            index = self.climate2idx.get(climate_name(name))
+            if index is None:
+                raise ValueError(f"Clima desconocido: {name} (opciones: {', '.join(self.climate2idx)})")
+            weights[index] += weight
+        if weights.sum() <= 0:
+            raise ValueError("Hay que indicar un clima o una temperatura")
+        return weights / weights.sum()
+
+    def item_climates(self, item: Dict[str, Any]) -> np.ndarray:
+        """Fila de la matriz de climas para la clase de la prenda, o sus ``climas`` como 0/1"""
+        index = self.class2idx.get(item.get("clase"))
+        if index is not None:
+            return self.matrix[index]
+        row = np.zeros(len(self.climate2idx), dtype=np.float32)
+        for name in item.get("climas") or []:
+            climate = self.climate2idx.get(climate_name(name))
+            if climate is not None:
+                row[climate] = 1.0
+        return row
+
+    def item_category(self, item: Dict[str, Any]) -> Optional[str]:
+        return item.get("categoria") or self.class_categories.get(item.get("clase"))
+
+    def garments(self, items: Sequence[Dict[str, Any]], weights: np.ndarray) -> Dict[str, Garments]:
+        """Agrupar las prendas por categoría y calcular sus puntajes de clima de una vez"""
+        grouped = {category: ([], []) for category in OUTFIT_CATEGORIES}
+        for item in items:
+            if not isinstance(item, dict):
+                raise ValueError("Cada prenda debe ser un objeto")
+            view = item
+            if isinstance(item.get("mejor_prediccion"), dict):
+                # Respuesta de /predict tal cual: la clase y la categoría están en mejor_prediccion
+                view = {**item["mejor_prediccion"], **item}
+            category = self.item_category(view)
+            if category in grouped:
+                grouped[category][0].append(item)
+                grouped[category][1].append(view)
+
+        result = {}
+        for category, (members, views) in grouped.items():
+            rows = np.array([self.item_climates(view) for view in views], dtype=np.float32).reshape(-1, len(weights))
+            colors = [item_color(view) for view in views]
+            known = np.array([color is not None for color in colors], dtype=bool)
+            rgb = np.array([color or (0, 0, 0) for color in colors], dtype=np.uint8).reshape(-1, 3)
+            result[category] = Garments(members, rows @ weights, rgb, known)
+        return result
+
+    def suggest(self, items: Sequence[Dict[str, Any]], climates: Dict[str, float], n: int = 5) -> Dict[str, Any]:
+        """Top-``n`` outfits para el clima pedido"""
+        weights = self.climate_weights(climates)
+        groups = self.garments(items, weights)
+        categories = [c for c in OUTFIT_CATEGORIES if len(groups[c]) or c in REQUIRED_CATEGORIES]
+        candidates = {c: len(groups[c]) for c in OUTFIT_CATEGORIES}
+        combinations = int(np.prod([len(groups[c]) for c in categories]))
+
+        outfits, evaluated = [], 0
+        if combinations:
+            top, bottom = groups["superior"], groups["inferior"]
+            shoes = groups["calzado"] if "calzado" in categories else None
+            scores, indices, evaluated = search(top, bottom, shoes, self.color_weight, n)
+            for score, index in zip(scores, indices):
+                outfits.append(self.outfit(groups, categories, index, float(score)))
+
+        return {
+            "clima": {name: round(float(weights[i]), 3) for name, i in self.climate2idx.items() if weights[i] > 0},
+            "outfits": outfits,
+            "candidatos": candidates,
+            "combinaciones": combinations,
+            "evaluadas": evaluated,
+        }
+
+    def outfit(self, groups: Dict[str, Garments], categories: List[str], index: Tuple[int, ...],
+               score: float) -> Dict[str, Any]:
+        garments = [groups[category] for category in categories]
+        climate = np.mean([g.climate[i] for g, i in zip(garments, index)])
+        pairs = [
+            color_compatibility(a.hsv[i:i + 1], a.known[i:i + 1], b.hsv[j:j + 1], b.known[j:j + 1])[0, 0]
+            for x, (a, i) in enumerate(zip(garments, index))
+            for b, j in list(zip(garments, index))[x + 1:]
+        ]
+        return {
+            "puntaje": round(score, 4),
+            "clima": round(float(climate), 4),
+            "color": round(float(np.mean(pairs)), 4),
+            "prendas": {category: garment.items[i] for category, garment, i in zip(categories, garments, index)},
+        }
+
+
+def _top_n(scores: np.ndarray, n: int) -> np.ndarray:
+    """Índices de los ``n`` mayores, ordenados de mayor a menor"""
+    if n < len(scores):
+        indices = np.argpartition(-scores, n - 1)[:n]
+    else:
+        indices = np.arange(len(scores))
+    return indices[np.argsort(-scores[indices], kind="stable")]
+
+
+def search(top: Garments, bottom: Garments, shoes: Optional[Garments], color_weight: float,
+           n: int) -> Tuple[np.ndarray, List[Tuple[int, ...]], int]:
+    """Mejores ``n`` outfits: (puntajes, índices por categoría, combinaciones evaluadas)"""
+    k = 3 if shoes is not None else 2
+    unary = (1 - color_weight) / k                # peso del clima de cada prenda
+    pairwise = color_weight / (k * (k - 1) // 2)  # peso de cada par de colores
+
+    # Superior x inferior completo: con cientos de prendas son decenas de miles de celdas
+    pairs = (unary * (top.climate[:, None] + bottom.climate[None, :])
+             + pairwise * color_compatibility(top.hsv, top.known, bottom.hsv, bottom.known))
+    if shoes is None:
+        flat = pairs.ravel()
+        best = _top_n(flat, n)
+        return flat[best], [tuple(int(x) for x in np.unravel_index(i, pairs.shape)) for i in best], flat.size
+
+    # Aporte de cada calzado según el superior y según el inferior
+    with_top = unary * shoes.climate[None, :] + pairwise * color_compatibility(top.hsv, top.known, shoes.hsv, shoes.known)
+    with_bottom = pairwise * color_compatibility(bottom.hsv, bottom.known, shoes.hsv, shoes.known)
+    # Cota: el mejor calzado para el superior más el mejor para el inferior, aunque no sean el mismo
+    bound = (pairs + with_top.max(axis=1)[:, None] + with_bottom.max(axis=1)[None, :]).ravel()
+    order = np.argsort(-bound, kind="stable")
+
+    best_scores = np.zeros(0, dtype=np.float32)
+    best_index = np.zeros((0, 3), dtype=np.int64)
+    evaluated = 0
+    for start in range(0, len(order), BLOCK_PAIRS):
+        block = order[start:start + BLOCK_PAIRS]
+        if len(best_scores) == n and bound[block[0]] <= best_scores[-1]:
+            break
+        t, b = np.unravel_index(block, pairs.shape)
+        scores = pairs[t, b][:, None] + with_top[t] + with_bottom[b]  # (bloque, calzados)
+        evaluated += scores.size
+
+        flat = scores.ravel()
+        keep = _top_n(flat, n)
+        rows, s = np.unravel_index(keep, scores.shape)
+        merged_scores = np.concatenate([best_scores, flat[keep]])
+        merged_index = np.concatenate([best_index, np.stack([t[rows], b[rows], s], axis=1)])
+        chosen = _top_n(merged_scores, n)
+        best_scores, best_index = merged_scores[chosen], merged_index[chosen]
+
+    return best_scores, [tuple(int(x) for x in row) for row in best_index], evaluated
@@ -0,0 +1,128 @@
+"""
+Motor de cuantización de colores en NumPy.
+
+Reemplaza a ``KMeans(n_init=10)`` de sklearn en la extracción de colores:
+
+1. Los píxeles se agrupan en un histograma RGB reducido (5 bits por canal,
+   32K bins) con ``np.bincount``; cada bin ocupado se representa por la media
+   real de sus píxeles y su peso es la cantidad de píxeles.
+2. Se ejecutan unas pocas iteraciones de Lloyd ponderadas sobre los bins
+   desde varias inicializaciones k-means++ con semilla fija, y se conserva la
+   de menor inercia.
+
+El resultado es determinista y el costo depende del número de bins ocupados,
+no del número de píxeles.
+"""
+
+from typing import Optional, Tuple
+
+import numpy as np
+
+
+def histogram_bins(pixels: np.ndarray, bits: int = 5) -> Tuple[np.ndarray, np.ndarray]:
+    """Agrupar píxeles RGB (N, 3) en bins; devuelve (medias de cada bin (B, 3), pesos (B,))"""
+    pixels = np.ascontiguousarray(pixels, dtype=np.uint8).reshape(-1, 3)
+    shift = 8 - bits
+    quantized = (pixels >> shift).astype(np.int32)
+    index = (quantized[:, 0] << (2 * bits)) | (quantized[:, 1] << bits) | quantized[:, 2]
+
+    num_bins = 1 << (3 * bits)
+    counts = np.bincount(index, minlength=num_bins)
+    occupied = np.flatnonzero(counts)
+    weights = counts[occupied].astype(np.float64)
+
+    sums = np.empty((len(occupied), 3), dtype=np.float64)
+    for channel in range(3):
+        sums[:, channel] = np.bincount(index, weights=pixels[:, channel], minlength=num_bins)[occupied]
+
+    return sums / weights[:, None], weights
+
+
+def _squared_distances(points: np.ndarray, centers: np.ndarray, point_norms: np.ndarray) -> np.ndarray:
+    # ||p||² - 2 p·c + ||c||²: un matmul (B, 3) x (3, k) en vez de un tensor (B, k, 3)
+    centers = centers.astype(points.dtype)
+    distances = point_norms[:, None] - 2.0 * (points @ centers.T) + (centers ** 2).sum(axis=1)[None, :]
+    return np.maximum(distances, 0.0, out=distances)
+
+
+def _init_centers(points: np.ndarray, weights: np.ndarray, k: int,
+                  rng: Optional[np.random.Generator] = None) -> np.ndarray:
+    """Inicialización k-means++ sobre los bins ponderados.
+
+    Sin ``rng`` es totalmente determinista: el bin más pesado primero y luego
+    el que maximiza peso × distancia². Con ``rng`` se muestrea como k-means++.
+    """
+    if rng is None:
+        first = np.argmax(weights)
+    else:
+        first = rng.choice(len(points), p=weights / weights.sum())
+    centers = [points[first]]
+    closest = ((points - centers[0]) ** 2).sum(axis=1)
+    for _ in range(1, k):
+        scores = weights * closest
+        if rng is None or scores.sum() <= 0:
+            candidate = np.argmax(scores)
+        else:
+            candidate = rng.choice(len(points), p=scores / scores.sum())
+        centers.append(points[candidate])
+        closest = np.minimum(closest, ((points - points[candidate]) ** 2).sum(axis=1))
+    return np.array(centers, dtype=np.float64)
+
+
+def _lloyd(points: np.ndarray, weights: np.ndarray, point_norms: np.ndarray, centers: np.ndarray,
+           iterations: int, tol: float) -> Tuple[np.ndarray, np.ndarray, float]:
+    k = len(centers)
+    for _ in range(iterations):
+        labels = _squared_distances(points, centers, point_norms).argmin(axis=1)
+        cluster_weights = np.bincount(labels, weights=weights, minlength=k)
+
+        new_centers = centers.copy()  # float64: las medias se acumulan en doble precisión
+        filled = cluster_weights > 0  # los clusters vacíos conservan su centro
+        for channel in range(3):
+            channel_sums = np.bincount(labels, weights=weights * points[:, channel], minlength=k)
+            new_centers[filled, channel] = channel_sums[filled] / cluster_weights[filled]
+
+        shift = np.abs(new_centers - centers).max()
+        centers = new_centers
+        if shift < tol:
+            break
+
+    distances = _squared_distances(points, centers, point_norms)
+    labels = distances.argmin(axis=1)
+    inertia = float((weights * distances[np.arange(len(points)), labels]).sum(dtype=np.float64))
+    return centers, labels, inertia
+
+
+def weighted_lloyd(points: np.ndarray, weights: np.ndarray, k: int, iterations: int = 10,
+                   n_init: int = 4, seed: int = 42, tol: float = 1e-3) -> Tuple[np.ndarray, np.ndarray]:
+    """K-means ponderado con iteraciones fijas; devuelve (centros (k, 3), etiquetas (B,)).
+
+    Se prueban ``n_init`` inicializaciones (la primera greedy, el resto k-means++
+    con semilla fija) y se queda la de menor inercia, como ``KMeans(n_init)``.
+    La salida es determinista.
+    """
+    # Las distancias en float32 bastan para asignar bins y reducen el costo a la mitad
+    points32 = points.astype(np.float32)
+    point_norms = (points32 ** 2).sum(axis=1)
+    rng = np.random.default_rng(seed)
+    best = None
+    for attempt in range(max(1, n_init)):
+        centers = _init_centers(points, weights, k, rng=None if attempt == 0 else rng)
+        result = _lloyd(points32, weights, point_norms, centers, iterations, tol)
+        if best is None or result[2] < best[2]:
+            best = result
+    return best[0], best[1]
+
+
+def quantize_colors(pixels: np.ndarray, n_colors: int, bits: int = 5, iterations: int = 10,
+                    n_init: int = 4) -> Tuple[np.ndarray, np.ndarray]:
+    """Colores dominantes de píxeles RGB (N, 3).
+
+    Devuelve (centros (k, 3) en float, frecuencias (k,) que suman 1), con
+    ``k <= n_colors`` según cuántos bins distintos haya.
+    """
+    points, weights = histogram_bins(pixels, bits=bits)
+    k = max(1, min(n_colors, len(points)))
+    centers, labels = weighted_lloyd(points, weights, k, iterations=iterations, n_init=n_init)
+    frequencies = np.bincount(labels, weights=weights, minlength=k) / weights.sum()
+    return centers, frequencies
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Servidor multi-worker con el modelo compartido entre procesos (pre-fork).
+
+Con ``uvicorn --workers N`` cada worker ejecuta ``load_model`` en su lifespan
+y guarda su propia copia de los pesos del ViT: la memoria crece con cada
+núcleo. Aquí el proceso padre carga el modelo una sola vez, abre el socket y
+recién entonces hace ``fork`` de los workers, que heredan los tensores por
+copy-on-write. La inferencia solo lee los pesos, así que esas páginas nunca se
+copian y cada worker suma apenas su memoria propia (buffers, caché, imágenes).
+
+    python prefork.py --workers 4 --port 8000
+
+Con el ``.safetensors`` del arranque rápido los pesos ya son páginas de un
+archivo mapeado y se comparten incluso sin pre-fork; con el ``.pth``, o con
+``SW_PRECISION=int8`` (los pesos cuantizados se generan al cargar), solo el
+pre-fork evita N copias. El backend ``onnx`` no se precarga: ONNX Runtime crea
+sus hilos al abrir la sesión y no sobreviven al ``fork``.
+
+Sin ``SW_INFERENCE_SLOTS`` los núcleos se reparten entre los workers (ver
+threads.py). El padre no atiende peticiones: reenvía SIGINT/SIGTERM a los
+workers y vuelve a lanzar los que terminan inesperadamente. Comparar la memoria con
+``python -m benchmarks.load_test --launchers uvicorn prefork``.
+"""
+
+import argparse
+import gc
+import logging
+import os
+import signal
+import socket
+import time
+from typing import Dict
+
+import uvicorn
+
+import settings
+import main as api
+from threads import available_cores
+
+logger = logging.getLogger(__name__)
+
+
+def bind_socket(host: str, port: int) -> socket.socket:
+    """Socket compartido por todos los workers (el kernel reparte las conexiones)"""
+    sock = socket.socket(socket.AF_INET6 if ":" in host else socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+def share_cores(workers: int):
+    """Sin SW_INFERENCE_SLOTS, cada worker recibe su parte de los núcleos (no todos)"""
+    if not settings.INFERENCE_SLOTS:
+        settings.INFERENCE_SLOTS = workers * api.process_slots()
+        # Para los workers de proceso que se lancen con spawn dentro de cada worker
+        os.environ["SW_INFERENCE_SLOTS"] = str(settings.INFERENCE_SLOTS)
+
+
+def preload_model() -> bool:
+    """Cargar el modelo en el padre para que los workers lo hereden"""
+    if settings.BACKEND == "onnx":
+        logger.info("ℹ️ Backend onnx: cada worker abre su propia sesión de ONNX Runtime")
+        return False
+    api.load_model()
+    # Los objetos ya creados pasan a la generación permanente: el GC de los
+    # workers no los recorre y no ensucia (copia) sus páginas
+    gc.collect()
+    gc.freeze()
+    return True
+
+
+def run_worker(sock: socket.socket, host: str, port: int, log_level: str):
+    """Cuerpo de cada worker: un servidor uvicorn sobre el socket heredado"""
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    config = uvicorn.Config(api.app, host=host, port=port, log_level=log_level)
+    uvicorn.Server(config).run(sockets=[sock])
+
+
+def serve(workers: int, host: str = "127.0.0.1", port: int = 8000, log_level: str = "info"):
+    sock = bind_socket(host, port)
+    started = time.perf_counter()
+    share_cores(workers)
+    shared = preload_model()
+    logger.info(f"🧬 Pre-fork: {workers} workers en http://{host}:{port} "
+                f"(modelo {'compartido' if shared else 'cargado por worker'}, "
+                f"{time.perf_counter() - started:.1f}s de carga)")
+
+    children: Dict[int, int] = {}  # pid -> número de worker
+    stopping = False
+
+    def spawn(number: int):
+        pid = os.fork()
+        if pid == 0:
+            code = 0
+            try:
+                run_worker(sock, host, port, log_level)
+            except BaseException:
+                logger.exception(f"❌ Worker {number} terminó con error")
+                code = 1
+            finally:
+                os._exit(code)
+        children[pid] = number
+        logger.info(f"👷 Worker {number} iniciado (pid {pid})")
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+
+    for number in range(workers):
+        spawn(number)
+
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        number = children.pop(pid, None)
+        if number is not None and not stopping:
+            logger.warning(f"⚠️ Worker {number} (pid {pid}) terminó con estado {status}; reiniciando")
+            time.sleep(1)  # evitar un bucle de reinicios si falla al arrancar
+            spawn(number)
+
+    sock.close()
+    logger.info("👋 Servidor pre-fork detenido")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=0, help="procesos worker (0 = uno por núcleo)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args()
+
+    serve(args.workers or available_cores(), args.host, args.port, args.log_level)
+
+
+if __name__ == "__main__":
+    main()
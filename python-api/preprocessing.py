@@ -0,0 +1,194 @@
+"""
+Decodificación y preprocesamiento de las fotos subidas en una sola pasada.
+
+Reemplaza a ``ViTImageProcessor`` en el camino de inferencia:
+
+1. Los JPEG se decodifican con ``draft``: libjpeg escala en el dominio DCT
+   (1/2, 1/4 o 1/8) y entrega una imagen apenas mayor que lo que se necesita,
+   sin decodificar los 12 MP de una foto de celular.
+2. Se aplica la orientación EXIF, para que las fotos verticales del celular
+   lleguen derechas al modelo y al análisis de color.
+3. De esa única imagen salen el tensor normalizado de 224x224 para el modelo
+   y el buffer reducido (lado máximo 400) para extraer colores; si la
+   petición no usa uno de los dos (``fields`` en ``/predict``), no se prepara.
+   Si se pide, también sale de ella el hash perceptual (``dedup.phash``).
+4. Para ``/predict/multi`` se decodifica más grande (``max_side``) y de la
+   misma imagen salen los recortes de cada región, apilados en un solo
+   tensor [R, 3, 224, 224], con un buffer de colores por recorte.
+
+Antes de decodificar se validan el formato y las dimensiones del encabezado:
+una imagen con más de ``max_pixels`` se rechaza (``ImageRejected``, 413),
+salvo los JPEG, que se decodifican directamente reducidos con ``draft``. Así
+la memoria por petición queda acotada aunque lleguen bombas de descompresión.
+
+El tensor replica el redimensionado bilineal, reescalado y normalización de
+``ViTImageProcessor`` con los valores de ``model_config/``; la diferencia se
+mide con ``python -m benchmarks.bench_preprocess``.
+"""
+
+import io
+import json
+import os
+from typing import List, NamedTuple, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+import torch
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from dedup import phash
+from regions import Box, crop_box
+
+COLOR_MAX_SIDE = 400
+
+# Pillow no intenta abrir ningún otro formato (EPS, PSD, ...); las fotos MPO
+# de algunas cámaras entran por el plugin JPEG
+ALLOWED_FORMATS = ("JPEG", "PNG", "WEBP", "BMP", "GIF", "TIFF")
+# Formatos que Pillow puede reducir durante la decodificación (escalado DCT)
+DRAFT_FORMATS = ("JPEG", "MPO")
+
+
+class ImageRejected(ValueError):
+    """Imagen que no se decodifica: formato no admitido (415) o demasiados píxeles (413)"""
+
+    def __init__(self, message: str, status_code: int = 413):
+        # Los args completos permiten reconstruirla al volver de un worker de proceso
+        super().__init__(message, status_code)
+
+    @property
+    def status_code(self) -> int:
+        return self.args[1]
+
+    def __str__(self) -> str:
+        return self.args[0]
+
+
+class PreparedImage(NamedTuple):
+    pixel_values: Optional[torch.Tensor]  # [1, 3, 224, 224] normalizado (None sin modelo)
+    color_image: Optional[np.ndarray]     # (H, W, 3) uint8 con lado máximo COLOR_MAX_SIDE (None sin colores)
+    original_size: Tuple[int, int] = (0, 0)  # (ancho, alto) de la foto antes de reducirla
+    phash: Optional[int] = None              # hash perceptual de 64 bits (solo si se pide)
+
+
+class PreparedRegions(NamedTuple):
+    pixel_values: torch.Tensor        # [R, 3, 224, 224]: un recorte por región
+    color_images: List[np.ndarray]    # buffer de colores de cada recorte
+    boxes: List[Box]                  # cajas normalizadas (x0, y0, x1, y1)
+    original_size: Tuple[int, int] = (0, 0)
+
+
+def color_size(width: int, height: int, max_side: int = COLOR_MAX_SIDE) -> Tuple[int, int]:
+    """Tamaño del buffer de colores (el mismo cálculo que hacía select_garment_pixels)"""
+    if height > max_side or width > max_side:
+        scale = min(max_side / height, max_side / width)
+        return int(width * scale), int(height * scale)
+    return width, height
+
+
+class ImagePreprocessor:
+    """Decodificación con draft JPEG + EXIF y preprocesamiento de ViT en NumPy"""
+
+    def __init__(self, size: Tuple[int, int] = (224, 224), image_mean=(0.5, 0.5, 0.5),
+                 image_std=(0.5, 0.5, 0.5), rescale_factor: float = 1 / 255,
+                 resample: int = Image.BILINEAR, jpeg_draft: bool = True, max_pixels: int = 0):
+        self.width, self.height = size
+        self.resample = resample
+        self.jpeg_draft = jpeg_draft
+        self.max_pixels = max_pixels  # 0 = sin límite propio (queda el de Pillow)
+        mean = np.asarray(image_mean, dtype=np.float32)
+        std = np.asarray(image_std, dtype=np.float32)
+        # (x * rescale - mean) / std como una sola multiplicación y suma por píxel
+        self.scale = (np.float32(rescale_factor) / std).astype(np.float32)
+        self.offset = (-mean / std).astype(np.float32)
+
+    @classmethod
+    def from_config(cls, config_dir: str, **kwargs) -> "ImagePreprocessor":
+        """Crear desde un preprocessor_config.json de Hugging Face"""
+        with open(os.path.join(config_dir, "preprocessor_config.json"), "r", encoding="utf-8") as f:
+            config = json.load(f)
+        size = config.get("size", 224)
+        if isinstance(size, dict):
+            size = (size["width"], size["height"])
+        else:
+            size = (size, size)
+        return cls(
+            size=size,
+            image_mean=config.get("image_mean", (0.5, 0.5, 0.5)),
+            image_std=config.get("image_std", (0.5, 0.5, 0.5)),
+            rescale_factor=config.get("rescale_factor", 1 / 255) if config.get("do_rescale", True) else 1.0,
+            resample=config.get("resample", Image.BILINEAR),
+            **kwargs
+        )
+
+    def decode(self, image_data: bytes, max_side: int = COLOR_MAX_SIDE) -> Image.Image:
+        """Decodificar a RGB, reducida en el decodificador JPEG y con la orientación EXIF aplicada.
+
+        ``max_side`` es el lado que tiene que conservar la imagen reducida
+        (el del buffer de colores, o más para recortar regiones).
+        """
+        try:
+            # open solo lee el encabezado: formato y dimensiones sin decodificar
+            image = Image.open(io.BytesIO(image_data), formats=ALLOWED_FORMATS)
+        except UnidentifiedImageError:
+            raise ImageRejected(f"Formato no admitido (se aceptan {', '.join(ALLOWED_FORMATS)})", 415)
+        except Image.DecompressionBombError as e:
+            raise ImageRejected(f"Imagen demasiado grande: {e}")
+        original_size = image.size
+        too_large = self.max_pixels and image.width * image.height > self.max_pixels
+        if (self.jpeg_draft or too_large) and image.format in DRAFT_FORMATS:
+            # draft elige la mayor reducción DCT que aún cubre ambos destinos
+            color_width, color_height = color_size(*image.size, max_side)
+            image.draft("RGB", (max(self.width, color_width), max(self.height, color_height)))
+            too_large = self.max_pixels and image.width * image.height > self.max_pixels
+        if too_large:
+            raise ImageRejected(f"La imagen tiene {image.width}x{image.height} píxeles; "
+                                f"el máximo es {self.max_pixels / 1e6:.0f} MP")
+        image.load()
+        image = ImageOps.exif_transpose(image)
+        if image.mode != "RGB":
+            image = image.convert("RGB")
+        image.info["original_size"] = original_size
+        return image
+
+    def model_tensor(self, image: Image.Image) -> torch.Tensor:
+        """Tensor [1, 3, H, W] para el modelo (resize bilineal, reescalado y normalización)"""
+        if image.mode != "RGB":
+            image = image.convert("RGB")
+        resized = image.resize((self.width, self.height), resample=self.resample)
+        pixels = np.asarray(resized, dtype=np.float32) * self.scale + self.offset
+        return torch.from_numpy(np.ascontiguousarray(pixels.transpose(2, 0, 1)))[None]
+
+    def color_buffer(self, image: Image.Image) -> np.ndarray:
+        """Arreglo RGB uint8 reducido para el análisis de colores"""
+        if image.mode != "RGB":
+            image = image.convert("RGB")
+        pixels = np.asarray(image)
+        width, height = color_size(image.width, image.height)
+        if (width, height) != image.size:
+            pixels = cv2.resize(pixels, (width, height))
+        return pixels
+
+    def prepare_image(self, image: Image.Image, model: bool = True, colors: bool = True,
+                      perceptual_hash: bool = False) -> PreparedImage:
+        """Tensor del modelo, buffer de colores y/o hash perceptual (lo que no se pide queda en None)"""
+        original_size = image.info.get("original_size", image.size)
+        return PreparedImage(
+            self.model_tensor(image) if model else None,
+            self.color_buffer(image) if colors else None,
+            original_size,
+            phash(image) if perceptual_hash else None
+        )
+
+    def prepare_regions(self, image: Image.Image, boxes: Sequence[Box]) -> PreparedRegions:
+        """Recortar cada caja de la imagen decodificada: tensores apilados y buffers de colores"""
+        crops = [image.crop(crop_box(box, image.width, image.height)) for box in boxes]
+        return PreparedRegions(
+            torch.cat([self.model_tensor(crop) for crop in crops]),
+            [self.color_buffer(crop) for crop in crops],
+            list(boxes),
+            image.info.get("original_size", image.size)
+        )
+
+    def prepare(self, image_data: bytes) -> PreparedImage:
+        """Decodificar una vez y producir el tensor del modelo y el buffer de colores"""
+        return self.prepare_image(self.decode(image_data))
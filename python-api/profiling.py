@@ -0,0 +1,172 @@
+"""
+Perfiles de una petición puntual: cProfile + profiler de PyTorch.
+
+Con ``SW_PROFILING_ENABLED=true``, ``POST /predict?profile=true`` ejecuta la
+predicción completa (decodificación, modelo, post-procesamiento y colores) en
+un solo hilo, sin caché ni micro-batching, bajo ambos profilers, y guarda un
+zip con:
+
+- ``trace.json``: línea de tiempo Chrome/Perfetto con los operadores de torch
+  y un rango por etapa (``decode``, ``preprocess``, ``forward``,
+  ``postprocess``, ``colors``) dentro de ``predict_clothing``.
+- ``cprofile.prof`` / ``cprofile.txt``: estadísticas por función de Python
+  (p. ej. cuántas iteraciones hizo la paleta), para ``snakeviz`` o ``pstats``.
+- ``meta.json``: tamaño, formato y modo de la imagen y duración total.
+
+Sin el flag nada de esto se importa ni se ejecuta en el camino de la petición.
+"""
+
+import cProfile
+import io
+import json
+import logging
+import os
+import pstats
+import re
+import tempfile
+import threading
+import time
+import uuid
+import zipfile
+from contextlib import nullcontext
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import torch
+from PIL import Image
+from torch.profiler import ProfilerActivity, profile, record_function
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+PROFILE_ID = re.compile(r"^[0-9]{8}-[0-9]{6}-[0-9a-f]{6}$")
+
+
+def default_profile_dir() -> str:
+    return os.path.join(tempfile.gettempdir(), "smart-wardrobe-profiles")
+
+
+class ProfileStore:
+    """Zips de perfiles en disco; conserva los ``max_files`` más recientes"""
+
+    def __init__(self, directory: str = "", max_files: int = 20):
+        self.directory = directory or default_profile_dir()
+        self.max_files = max(1, max_files)
+        os.makedirs(self.directory, exist_ok=True)
+
+    def path(self, profile_id: str) -> Optional[str]:
+        if not PROFILE_ID.match(profile_id):
+            return None
+        path = os.path.join(self.directory, f"{profile_id}.zip")
+        return path if os.path.exists(path) else None
+
+    def save(self, profile_id: str, files: Dict[str, bytes]) -> str:
+        path = os.path.join(self.directory, f"{profile_id}.zip")
+        tmp_path = f"{path}.tmp"
+        with zipfile.ZipFile(tmp_path, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+            for name, data in files.items():
+                archive.writestr(name, data)
+        os.replace(tmp_path, path)
+        self._prune()
+        return path
+
+    def list(self) -> List[Dict[str, Any]]:
+        entries = []
+        for name in os.listdir(self.directory):
+            profile_id, ext = os.path.splitext(name)
+            if ext == ".zip" and PROFILE_ID.match(profile_id):
+                stat = os.stat(os.path.join(self.directory, name))
+                entries.append({"id": profile_id, "creado": stat.st_mtime, "bytes": stat.st_size})
+        return sorted(entries, key=lambda e: e["creado"], reverse=True)
+
+    def _prune(self):
+        for entry in self.list()[self.max_files:]:
+            try:
+                os.remove(os.path.join(self.directory, f"{entry['id']}.zip"))
+            except OSError:
+                pass
+
+
+# Un perfil a la vez: los profilers son globales al proceso
+_lock = threading.Lock()
+
+
+def _stage_ranges(thread_id: int):
+    """Hook para metrics.timer: cada etapa del hilo perfilado abre un rango en la traza"""
+    def hook(stage: str):
+        return record_function(stage) if threading.get_ident() == thread_id else nullcontext()
+    return hook
+
+
+def _cprofile_text(profiler: cProfile.Profile, limit: int = 40) -> str:
+    buffer = io.StringIO()
+    stats = pstats.Stats(profiler, stream=buffer)
+    stats.sort_stats("cumulative").print_stats(limit)
+    return buffer.getvalue()
+
+
+def image_meta(image_data: bytes) -> Dict[str, Any]:
+    """Formato, modo y dimensiones leídos del encabezado, sin decodificar"""
+    try:
+        with Image.open(io.BytesIO(image_data)) as image:
+            return {"formato": image.format, "modo": image.mode, "ancho": image.width, "alto": image.height}
+    except Exception as e:
+        return {"error_encabezado": str(e)}
+
+
+def profile_call(fn: Callable, *args, meta: Optional[Dict[str, Any]] = None) -> Tuple[Any, Dict[str, Any], Dict[str, bytes]]:
+    """Ejecutar ``fn(*args)`` bajo cProfile y el profiler de torch.
+
+    Devuelve (resultado, metadatos con id y duración, archivos del zip). Corre
+    en el hilo que la llama; se espera que sea un hilo del pool, no el event loop.
+    """
+    profile_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:6]}"
+    with _lock:
+        metrics.set_stage_hook(_stage_ranges(threading.get_ident()))
+        profiler = cProfile.Profile()
+        try:
+            with profile(activities=[ProfilerActivity.CPU], record_shapes=True) as torch_profiler:
+                started = time.perf_counter()
+                profiler.enable()
+                try:
+                    with record_function("predict_clothing"):
+                        result = fn(*args)
+                finally:
+                    profiler.disable()
+                    elapsed = time.perf_counter() - started
+        finally:
+            metrics.set_stage_hook(None)
+
+    with tempfile.NamedTemporaryFile(suffix=".json", delete=False) as tmp:
+        trace_path = tmp.name
+    try:
+        torch_profiler.export_chrome_trace(trace_path)
+        with open(trace_path, "rb") as f:
+            trace = f.read()
+    finally:
+        os.remove(trace_path)
+
+    with tempfile.NamedTemporaryFile(suffix=".prof", delete=False) as tmp:
+        stats_path = tmp.name
+    try:
+        profiler.dump_stats(stats_path)
+        with open(stats_path, "rb") as f:
+            stats = f.read()
+    finally:
+        os.remove(stats_path)
+
+    meta = {
+        "id": profile_id,
+        "duracion_ms": round(elapsed * 1000, 2),
+        "torch_threads": torch.get_num_threads(),
+        **(meta or {}),
+    }
+    files = {
+        "trace.json": trace,
+        "cprofile.prof": stats,
+        "cprofile.txt": _cprofile_text(profiler).encode("utf-8"),
+        "torch_ops.txt": torch_profiler.key_averages().table(sort_by="self_cpu_time_total", row_limit=30).encode("utf-8"),
+        "meta.json": json.dumps(meta, ensure_ascii=False, indent=2).encode("utf-8"),
+    }
+    logger.info(f"🔬 Perfil {profile_id}: {elapsed * 1000:.1f} ms")
+    return result, meta, files
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Reclasificar las prendas guardadas con las cabezas de otro checkpoint, sin
+volver a pasar las fotos por el ViT.
+
+Las cabezas (``category_head`` y ``climate_head``) son dos capas lineales
+sobre el ``pooler_output`` del backbone, y ese vector ya está guardado por
+prenda en SW_EMBEDDINGS_DIR (normalizado, con su norma en ``norma``). Si se
+reentrenan solo las cabezas, o cambian las clases del checkpoint, alcanza con
+reconstruir ``norma * vector`` y multiplicarlo por las dos cabezas apiladas:
+un producto [filas, 768] x [768, clases + climas] por bloque de filas.
+
+De cada prenda se reescriben ``clase``, ``nombre``, ``categoria``,
+``confianza``, ``climas`` y ``predicciones_clima`` tal como los calcula
+/predict, y ``modelo`` con la versión del checkpoint. Las que ya tienen esa
+versión se saltan, así que el trabajo se puede cortar y retomar. Los vectores
+no se tocan y el servidor ve los datos nuevos en su próxima lectura.
+
+Las prendas guardadas antes de registrar la norma usan la mediana de las
+normas conocidas (o ``--norm``): el pooler_output sale de una tanh y su norma
+varía poco entre fotos.
+
+    python reclassify.py --checkpoint nuevo.pth
+    python reclassify.py --checkpoint nuevo.pth --users u1 u2 --dry-run
+"""
+
+import argparse
+import sys
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import torch
+
+import settings
+from embeddings import EmbeddingStore, UserIndex
+from main import (checkpoint_model_version, get_spanish_name, load_checkpoint, map_to_category,
+                  normalize_climate_name)
+
+# Filas por producto de matrices (~200 MB en float32)
+BLOCK_ROWS = 65536
+TOP_CLIMATES = 3
+
+
+def softmax(logits: np.ndarray) -> np.ndarray:
+    probs = logits - logits.max(axis=1, keepdims=True)
+    np.exp(probs, out=probs)
+    probs /= probs.sum(axis=1, keepdims=True)
+    return probs
+
+
+class Heads:
+    """Cabezas de categoría y clima de un checkpoint, apiladas en una sola matriz [768, C + K]"""
+
+    def __init__(self, checkpoint: Dict[str, Any], version: str):
+        state = checkpoint["model_state_dict"]
+        weight = torch.cat([state["category_head.weight"], state["climate_head.weight"]]).float()
+        bias = torch.cat([state["category_head.bias"], state["climate_head.bias"]]).float()
+        self.weight = np.ascontiguousarray(weight.numpy().T)
+        self.bias = bias.numpy()
+        self.classes = list(checkpoint["classes"])
+        self.version = version
+        # Lo mismo que arma build_prediction, calculado una vez por clase y por clima
+        self.labels = [{"clase": name, "nombre": get_spanish_name(name), "categoria": map_to_category(name)}
+                       for name in self.classes]
+        self.climates = [normalize_climate_name(name) for name in checkpoint["climate2idx"]]
+
+    def predict(self, vectors: np.ndarray) -> List[Dict[str, Any]]:
+        """Datos de la prenda para cada pooler_output [N, 768]"""
+        logits = vectors @ self.weight + self.bias
+        categories = softmax(logits[:, :len(self.classes)])
+        climates = softmax(logits[:, len(self.classes):])
+        best = categories.argmax(axis=1)
+        confidence = categories[np.arange(len(best)), best]
+        top = np.argsort(-climates, axis=1, kind="stable")[:, :TOP_CLIMATES]
+
+        results = []
+        for i, (label, climate_rows) in enumerate(zip(best, top)):
+            predicted = [{"clima": self.climates[j], "confianza": round(float(climates[i, j]), 5)}
+                         for j in climate_rows]
+            results.append({
+                **self.labels[label],
+                "confianza": round(float(confidence[i]), 5),
+                "climas": [c["clima"] for c in predicted],
+                "predicciones_clima": predicted,
+                "modelo": self.version,
+            })
+        return results
+
+
+def known_norm(indexes: List[UserIndex]) -> Optional[float]:
+    """Mediana de las normas guardadas (None si ninguna prenda la tiene)"""
+    norms = [meta["norma"] for index in indexes for _, meta in index.items() if meta.get("norma")]
+    return float(np.median(norms)) if norms else None
+
+
+def reclassify(index: UserIndex, heads: Heads, default_norm: Optional[float] = None, block_rows: int = BLOCK_ROWS,
+               force: bool = False, dry_run: bool = False) -> Dict[str, int]:
+    """Reclasificar las prendas de un usuario por bloques y guardar sus datos nuevos"""
+    stats = {"prendas": 0, "reclasificadas": 0, "cambios_de_clase": 0, "sin_norma": 0, "guardadas": 0}
+    pending: List[Tuple[int, Dict[str, Any], float]] = []
+    for row, meta in index.items():
+        stats["prendas"] += 1
+        if not force and meta.get("modelo") == heads.version:
+            continue
+        norm = meta.get("norma") or default_norm
+        if norm is None:
+            stats["sin_norma"] += 1
+            continue
+        pending.append((row, meta, norm))
+
+    matrix = index.matrix()
+    for start in range(0, len(pending), block_rows):
+        block = pending[start:start + block_rows]
+        rows = np.fromiter((row for row, _, _ in block), dtype=np.int64, count=len(block))
+        norms = np.fromiter((norm for _, _, norm in block), dtype=np.float32, count=len(block))
+        vectors = np.asarray(matrix[rows], dtype=np.float32) * norms[:, None]
+        changes = []
+        for (row, meta, _), prediction in zip(block, heads.predict(vectors)):
+            stats["cambios_de_clase"] += meta.get("clase") != prediction["clase"]
+            changes.append((meta["id"], row, prediction))
+        stats["reclasificadas"] += len(changes)
+        if not dry_run:
+            stats["guardadas"] += index.update(changes)
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--checkpoint", default=settings.CHECKPOINT_PATH, help=".pth o .safetensors con las cabezas nuevas")
+    parser.add_argument("--embeddings-dir", default=settings.EMBEDDINGS_DIR)
+    parser.add_argument("--users", nargs="+", help="solo estos usuarios (por defecto todos)")
+    parser.add_argument("--norm", type=float, help="norma para las prendas guardadas sin ella")
+    parser.add_argument("--block-rows", type=int, default=BLOCK_ROWS)
+    parser.add_argument("--force", action="store_true", help="reclasificar también las que ya tienen esta versión")
+    parser.add_argument("--dry-run", action="store_true", help="contar los cambios sin guardarlos")
+    args = parser.parse_args()
+
+    if not args.embeddings_dir:
+        print("❌ Falta la carpeta de embeddings (--embeddings-dir o SW_EMBEDDINGS_DIR)")
+        sys.exit(1)
+
+    print(f"🤖 Cargando cabezas de {args.checkpoint}...")
+    checkpoint = load_checkpoint(args.checkpoint)
+    heads = Heads(checkpoint, checkpoint_model_version(checkpoint, args.checkpoint))
+    print(f"📊 {len(heads.classes)} clases, {len(heads.climates)} climas, versión {heads.version}")
+
+    store = EmbeddingStore(args.embeddings_dir, hash_distance=settings.DEDUP_MAX_DISTANCE)
+    indexes = [store.index(user) for user in (args.users or store.users())]
+    default_norm = args.norm or known_norm(indexes)
+    if default_norm is None:
+        print("⚠️ Ninguna prenda tiene la norma guardada: las anteriores se saltan (usar --norm)")
+    else:
+        print(f"📏 Norma para las prendas guardadas sin ella: {default_norm:.3f}")
+
+    started = time.perf_counter()
+    total = {}
+    for index in indexes:
+        stats = reclassify(index, heads, default_norm, args.block_rows, args.force, args.dry_run)
+        total = {key: total.get(key, 0) + value for key, value in stats.items()}
+        if stats["reclasificadas"]:
+            print(f"  {index.directory}: {stats['reclasificadas']}/{stats['prendas']} prendas, "
+                  f"{stats['cambios_de_clase']} cambian de clase")
+
+    elapsed = time.perf_counter() - started
+    print(f"✅ {len(indexes)} usuarios, {total.get('reclasificadas', 0)} prendas reclasificadas en {elapsed:.1f}s "
+          f"({total.get('reclasificadas', 0) / max(elapsed, 1e-9):,.0f} por segundo), "
+          f"{total.get('cambios_de_clase', 0)} cambian de clase, {total.get('sin_norma', 0)} sin norma"
+          + (" (sin guardar: --dry-run)" if args.dry_run else ""))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+"""
+Propuestas de regiones para detectar varias prendas en una foto (``/predict/multi``).
+
+El modelo clasifica una prenda por imagen. Para una foto con varias (un
+outfit sobre la cama, una persona de cuerpo entero) se recortan regiones
+candidatas, se clasifican todas en un solo forward y se fusionan las que
+resultan ser la misma prenda. Las propuestas salen en CPU sin otro modelo:
+
+1. Máscara de primer plano: el color del fondo se estima con la mediana del
+   borde de la foto y todo lo que se aleja de él (distancia en Lab) es prenda.
+   Cada componente conexo grande es un candidato (en la foto de una sola
+   prenda, el único: queda casi igual que en ``/predict``).
+2. Franjas fijas sobre los componentes alargados que son el sujeto de la
+   foto (el único componente, o uno que ocupa buena parte de ella): una
+   persona o un conjunto colgado es un solo componente alto, así que se
+   agregan las franjas de arriba, del medio y de abajo (torso, piernas,
+   pies); en uno ancho, las mitades izquierda y derecha. Un pantalón suelto
+   junto a otras prendas no se divide.
+
+Las cajas van normalizadas a [0, 1] como (x0, y0, x1, y1), así que sirven
+para cualquier resolución de la misma foto.
+"""
+
+from typing import List, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+Box = Tuple[float, float, float, float]
+
+WORK_SIDE = 192        # lado máximo de la imagen donde se calcula la máscara
+BORDER = 0.04          # ancho del borde que se toma como fondo (fracción del lado)
+FOREGROUND_DISTANCE = 18.0  # distancia Lab al fondo desde la que un píxel es prenda
+MIN_AREA = 0.02        # área mínima de un componente (fracción de la foto)
+PADDING = 0.04         # margen alrededor de cada caja (fracción de su lado)
+DUPLICATE_IOU = 0.85   # propuestas más parecidas que esto se descartan
+
+# Franjas (inicio, fin) a lo alto de un componente alto y a lo ancho de uno ancho
+TALL_BANDS = ((0.0, 0.45), (0.35, 0.8), (0.75, 1.0))
+WIDE_BANDS = ((0.0, 0.55), (0.45, 1.0))
+ELONGATION = 1.6       # relación de aspecto desde la que se agregan franjas
+SUBJECT_AREA = 0.3     # área de la caja (fracción de la foto) desde la que se divide en franjas
+
+FULL_IMAGE: Box = (0.0, 0.0, 1.0, 1.0)
+
+
+def box_area(box: Box) -> float:
+    return max(0.0, box[2] - box[0]) * max(0.0, box[3] - box[1])
+
+
+def intersection(a: Box, b: Box) -> float:
+    return box_area((max(a[0], b[0]), max(a[1], b[1]), min(a[2], b[2]), min(a[3], b[3])))
+
+
+def iou(a: Box, b: Box) -> float:
+    inter = intersection(a, b)
+    union = box_area(a) + box_area(b) - inter
+    return inter / union if union > 0 else 0.0
+
+
+def overlap(a: Box, b: Box) -> float:
+    """Intersección sobre la caja más chica: 1.0 si una contiene a la otra"""
+    smaller = min(box_area(a), box_area(b))
+    return intersection(a, b) / smaller if smaller > 0 else 0.0
+
+
+def foreground_mask(pixels: np.ndarray) -> np.ndarray:
+    """Máscara uint8 (0/1) de lo que no es fondo, para un arreglo RGB uint8 chico"""
+    lab = cv2.cvtColor(pixels, cv2.COLOR_RGB2LAB).astype(np.float32)
+    height, width = lab.shape[:2]
+    border = max(1, int(round(BORDER * min(height, width))))
+    edge = np.concatenate([
+        lab[:border].reshape(-1, 3), lab[-border:].reshape(-1, 3),
+        lab[:, :border].reshape(-1, 3), lab[:, -border:].reshape(-1, 3)
+    ])
+    distance = np.linalg.norm(lab - np.median(edge, axis=0), axis=2)
+    mask = (distance > FOREGROUND_DISTANCE).astype(np.uint8)
+    # Cerrar los huecos de la tela (estampados parecidos al fondo) y borrar el ruido
+    mask = cv2.morphologyEx(mask, cv2.MORPH_CLOSE, np.ones((5, 5), np.uint8))
+    return cv2.morphologyEx(mask, cv2.MORPH_OPEN, np.ones((3, 3), np.uint8))
+
+
+def bands(box: Box) -> List[Box]:
+    """Franjas de un componente alargado (ninguna si es más o menos cuadrado)"""
+    x0, y0, x1, y1 = box
+    width, height = x1 - x0, y1 - y0
+    if height >= ELONGATION * width:
+        return [(x0, y0 + start * height, x1, y0 + end * height) for start, end in TALL_BANDS]
+    if width >= ELONGATION * height:
+        return [(x0 + start * width, y0, x0 + end * width, y1) for start, end in WIDE_BANDS]
+    return []
+
+
+def pad(box: Box, margin: float = PADDING) -> Box:
+    x0, y0, x1, y1 = box
+    dx, dy = margin * (x1 - x0), margin * (y1 - y0)
+    return float(max(0.0, x0 - dx)), float(max(0.0, y0 - dy)), float(min(1.0, x1 + dx)), float(min(1.0, y1 + dy))
+
+
+def deduplicate(boxes: Sequence[Box], threshold: float = DUPLICATE_IOU) -> List[Box]:
+    """Quitar las cajas casi iguales a una anterior (el orden es la prioridad)"""
+    kept: List[Box] = []
+    for box in boxes:
+        if all(iou(box, other) < threshold for other in kept):
+            kept.append(box)
+    return kept
+
+
+def propose_regions(pixels: np.ndarray, max_regions: int = 6, min_area: float = MIN_AREA) -> List[Box]:
+    """Cajas candidatas (normalizadas) para un arreglo RGB uint8, de la prenda más grande a la más chica.
+
+    Las franjas van después de todos los componentes: si no entran en
+    ``max_regions``, se pierden antes las franjas que una prenda separada.
+    """
+    height, width = pixels.shape[:2]
+    scale = WORK_SIDE / max(height, width)
+    if scale < 1:
+        pixels = cv2.resize(pixels, (max(1, int(width * scale)), max(1, int(height * scale))),
+                            interpolation=cv2.INTER_AREA)
+        height, width = pixels.shape[:2]
+
+    count, _, stats, _ = cv2.connectedComponentsWithStats(foreground_mask(pixels), connectivity=8)
+    components = [
+        (x / width, y / height, (x + w) / width, (y + h) / height)
+        for x, y, w, h, area in stats[1:count]
+        if area >= min_area * width * height
+    ]
+    if not components:
+        # Sin fondo reconocible (foto recortada a la prenda): la foto completa
+        return [FULL_IMAGE]
+    components.sort(key=box_area, reverse=True)
+
+    candidates = list(components)
+    for component in components:
+        if len(components) == 1 or box_area(component) >= SUBJECT_AREA:
+            candidates += bands(component)
+    return deduplicate([pad(box) for box in candidates])[:max(1, max_regions)]
+
+
+def crop_box(box: Box, width: int, height: int) -> Tuple[int, int, int, int]:
+    """Caja normalizada a píxeles (para ``Image.crop``), de al menos 1x1"""
+    x0, y0 = int(box[0] * width), int(box[1] * height)
+    return x0, y0, max(x0 + 1, int(round(box[2] * width))), max(y0 + 1, int(round(box[3] * height)))
+
+
+def merge_detections(boxes: Sequence[Box], labels: Sequence[int], scores: Sequence[float],
+                     threshold: float = 0.5) -> List[Tuple[int, List[int]]]:
+    """Fusionar las detecciones de la misma clase que se superponen (NMS por clase).
+
+    Dos regiones con la misma clase son la misma prenda si su IoU o la fracción
+    de la más chica cubierta por la otra llega a ``threshold``. Devuelve
+    (índice que se queda, índices fusionados en él) de mayor a menor puntaje.
+    """
+    order = sorted(range(len(boxes)), key=lambda i: scores[i], reverse=True)
+    kept: List[Tuple[int, List[int]]] = []
+    for i in order:
+        for best, merged in kept:
+            if labels[best] == labels[i] and max(iou(boxes[best], boxes[i]), overlap(boxes[best], boxes[i])) >= threshold:
+                merged.append(i)
+                break
+        else:
+            kept.append((i, [i]))
+    return kept
@@ -0,0 +1,113 @@
+"""
+Configuración de Smart Wardrobe AI leída desde variables de entorno
+"""
+
+import os
+
+
+def env_int(name: str, default: int) -> int:
+    """Leer un entero desde el entorno"""
+    value = os.environ.get(name)
+    return int(value) if value not in (None, "") else default
+
+
+def env_float(name: str, default: float) -> float:
+    """Leer un número decimal desde el entorno"""
+    value = os.environ.get(name)
+    return float(value) if value not in (None, "") else default
+
+
+def env_bool(name: str, default: bool) -> bool:
+    """Leer un booleano desde el entorno (1/true/yes/on)"""
+    value = os.environ.get(name)
+    if value in (None, ""):
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+def env_str(name: str, default: str) -> str:
+    """Leer un texto desde el entorno"""
+    value = os.environ.get(name)
+    return value if value not in (None, "") else default
+
+
+# Checkpoint del modelo
+CHECKPOINT_PATH = env_str("SW_CHECKPOINT_PATH", "../vit_clothes_prediction.pth")
+# Versión usada en las claves de caché (por defecto se deriva del checkpoint)
+MODEL_VERSION = env_str("SW_MODEL_VERSION", "")
+
+# Arranque rápido: pesos desde .safetensors mapeado en memoria si existe
+FAST_STARTUP = env_bool("SW_FAST_STARTUP", True)
+WEIGHTS_PATH = env_str("SW_WEIGHTS_PATH", "")  # por defecto junto al checkpoint
+
+# Decodificar los JPEG reducidos (escalado DCT) al tamaño que se necesita
+JPEG_DRAFT = env_bool("SW_JPEG_DRAFT", True)
+
+# Extraer los colores en otro hilo mientras corre el forward del ViT
+OVERLAP_COLORS = env_bool("SW_OVERLAP_COLORS", True)
+
+# Límites de las subidas (uploads.py y preprocessing.py)
+MAX_UPLOAD_MB = env_float("SW_MAX_UPLOAD_MB", 20.0)  # por imagen
+MAX_BATCH_UPLOAD_MB = env_float("SW_MAX_BATCH_UPLOAD_MB", 200.0)  # cuerpo completo de /predict/batch
+MAX_IMAGE_MEGAPIXELS = env_float("SW_MAX_IMAGE_MEGAPIXELS", 50.0)  # los JPEG mayores se reducen al decodificar
+
+# Embeddings por usuario para /similar (embeddings.py); vacío = desactivado
+EMBEDDINGS_DIR = env_str("SW_EMBEDDINGS_DIR", "")
+SIMILAR_ANN_MIN_ITEMS = env_int("SW_SIMILAR_ANN_MIN_ITEMS", 20000)  # índice aproximado desde N prendas (0 = nunca)
+SIMILAR_ANN_PROBES = env_int("SW_SIMILAR_ANN_PROBES", 8)  # listas del índice que recorre cada consulta
+SIMILAR_MAX_K = env_int("SW_SIMILAR_MAX_K", 100)
+
+# Fotos casi duplicadas en /predict?user= (dedup.py): off | flag | skip
+DEDUP_MODE = env_str("SW_DEDUP_MODE", "flag")
+DEDUP_MAX_DISTANCE = env_int("SW_DEDUP_MAX_DISTANCE", 6)  # bits distintos del hash perceptual (de 64)
+
+# Sugerencia de outfits para /suggest (outfits.py)
+SUGGEST_COLOR_WEIGHT = env_float("SW_SUGGEST_COLOR_WEIGHT", 0.3)  # peso de los colores frente al clima (0-1)
+SUGGEST_MAX_ITEMS = env_int("SW_SUGGEST_MAX_ITEMS", 5000)  # prendas por petición
+SUGGEST_MAX_N = env_int("SW_SUGGEST_MAX_N", 50)  # outfits por respuesta
+
+# Varias prendas por foto en /predict/multi (regions.py)
+MULTI_MAX_REGIONS = env_int("SW_MULTI_MAX_REGIONS", 6)  # recortes por foto (un solo forward)
+MULTI_MIN_CONFIDENCE = env_float("SW_MULTI_MIN_CONFIDENCE", 0.25)  # por debajo se descarta la región
+MULTI_MERGE_IOU = env_float("SW_MULTI_MERGE_IOU", 0.5)  # superposición para fusionar la misma clase
+MULTI_DECODE_SIDE = env_int("SW_MULTI_DECODE_SIDE", 1024)  # lado de la foto decodificada antes de recortar
+
+# Backend de inferencia: eager | torchscript | compile | onnx
+BACKEND = env_str("SW_BACKEND", "eager")
+# Artefacto exportado (por defecto junto al checkpoint: .onnx o .ts.pt)
+BACKEND_ARTIFACT = env_str("SW_BACKEND_ARTIFACT", "")
+ONNX_THREADS = env_int("SW_ONNX_THREADS", 0)  # 0 = los hilos del presupuesto (threads.py)
+# Precisión del modelo eager/compile: fp32 | int8 | bf16
+PRECISION = env_str("SW_PRECISION", "fp32")
+
+# Pool de inferencia: thread | process | inline
+EXECUTOR = env_str("SW_EXECUTOR", "thread")
+WORKERS = env_int("SW_WORKERS", 0)  # 0 = automático según núcleos
+
+# Presupuesto de hilos (threads.py): núcleos repartidos en slots x hilos
+CPU_CORES = env_int("SW_CPU_CORES", 0)  # 0 = detectar (afinidad y cuota del contenedor)
+INFERENCE_SLOTS = env_int("SW_INFERENCE_SLOTS", 0)  # 0 = uno por worker de proceso (o 1)
+THREADS_PER_SLOT = env_int("SW_THREADS_PER_SLOT", 0)  # 0 = núcleos / slots
+
+# Micro-batching del modelo
+BATCH_MAX_SIZE = env_int("SW_BATCH_MAX_SIZE", 16)
+BATCH_MAX_WAIT_MS = env_float("SW_BATCH_MAX_WAIT_MS", 10.0)
+
+# Control de admisión (admission.py): lugares en curso y colas por carril
+ADMISSION_ENABLED = env_bool("SW_ADMISSION_ENABLED", True)
+ADMISSION_CAPACITY = env_int("SW_ADMISSION_CAPACITY", 0)  # 0 = un batch completo o un lugar por worker
+ADMISSION_QUEUE_DEPTH = env_int("SW_ADMISSION_QUEUE_DEPTH", 32)  # carril interactive
+ADMISSION_BULK_QUEUE_DEPTH = env_int("SW_ADMISSION_BULK_QUEUE_DEPTH", 128)  # carril bulk
+ADMISSION_RESERVED = env_int("SW_ADMISSION_RESERVED", -1)  # lugares solo interactive (-1 = un cuarto)
+
+# Caché de predicciones
+CACHE_ENABLED = env_bool("SW_CACHE_ENABLED", True)
+CACHE_MAX_ENTRIES = env_int("SW_CACHE_MAX_ENTRIES", 1024)
+CACHE_TTL_SECONDS = env_float("SW_CACHE_TTL_SECONDS", 3600.0)
+CACHE_DIR = env_str("SW_CACHE_DIR", "")  # vacío = sin nivel en disco
+CACHE_DISK_TTL_SECONDS = env_float("SW_CACHE_DISK_TTL_SECONDS", 7 * 24 * 3600.0)
+
+# Perfiles por petición (POST /predict?profile=true); desactivado por defecto
+PROFILING_ENABLED = env_bool("SW_PROFILING_ENABLED", False)
+PROFILE_DIR = env_str("SW_PROFILE_DIR", "")  # vacío = carpeta temporal del sistema
+PROFILE_MAX_FILES = env_int("SW_PROFILE_MAX_FILES", 20)
@@ -0,0 +1,9 @@
+"""
+Los módulos de la API son planos (``import admission``): las pruebas los
+importan desde la carpeta python-api como lo hace el servidor.
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
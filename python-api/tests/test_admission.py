@@ -0,0 +1,167 @@
+"""
+Pruebas del control de admisión (admission.py): prioridad entre carriles,
+cancelaciones, colas llenas y Retry-After. Sin modelo: solo asyncio.
+"""
+
+import asyncio
+
+import pytest
+
+from admission import AdmissionController, AdmissionRejected
+
+
+async def settle():
+    """Dejar correr a las tareas listas (despertar a los que recibieron lugar)"""
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def test_interactive_preempts_queued_bulk():
+    async def scenario():
+        admission = AdmissionController(capacity=2, queue_depth=8, bulk_queue_depth=8, reserved=0)
+        await admission.acquire("bulk")
+        await admission.acquire("bulk")
+        order = []
+
+        async def waiter(lane):
+            await admission.acquire(lane)
+            order.append(lane)
+
+        bulk = asyncio.create_task(waiter("bulk"))
+        await settle()
+        interactive = asyncio.create_task(waiter("interactive"))
+        await settle()
+        assert admission.queue_depth("bulk") == 1 and admission.queue_depth("interactive") == 1
+
+        # El bulk llegó antes, pero el primer lugar libre es para interactive
+        admission._release("bulk", 1, 0.0)
+        await settle()
+        assert order == ["interactive"]
+        assert admission.queue_depth("bulk") == 1
+
+        admission._release("bulk", 1, 0.0)
+        await settle()
+        assert order == ["interactive", "bulk"]
+        await asyncio.gather(bulk, interactive)
+
+    asyncio.run(scenario())
+
+
+def test_bulk_never_takes_reserved_slots():
+    async def scenario():
+        admission = AdmissionController(capacity=4, queue_depth=8, bulk_queue_depth=8, reserved=1)
+        assert admission.lane_limit("bulk") == 3
+        await admission.acquire("bulk", 3)
+        waiting = asyncio.create_task(admission.acquire("bulk"))
+        await settle()
+        assert not waiting.done()
+        # El lugar reservado sigue libre para una subida interactiva
+        assert await admission.acquire("interactive") == 1
+        waiting.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiting
+
+    asyncio.run(scenario())
+
+
+def test_weight_above_lane_limit_is_rejected():
+    async def scenario():
+        admission = AdmissionController(capacity=16, reserved=4)
+        with pytest.raises(ValueError):
+            await admission.acquire("bulk", 16)
+        assert admission.in_service("bulk") == 0
+        assert await admission.acquire("bulk", 12) == 12
+
+    asyncio.run(scenario())
+
+
+def test_cancelled_waiter_leaves_queue_and_next_one_is_served():
+    async def scenario():
+        admission = AdmissionController(capacity=1, queue_depth=8, reserved=0)
+        await admission.acquire("interactive")
+        first = asyncio.create_task(admission.acquire("interactive"))
+        second = asyncio.create_task(admission.acquire("interactive"))
+        await settle()
+        assert admission.queue_depth("interactive") == 2
+
+        first.cancel()
+        await settle()
+        assert admission.queue_depth("interactive") == 1
+
+        admission._release("interactive", 1, 0.0)
+        await settle()
+        assert second.done() and admission.in_service("interactive") == 1
+
+    asyncio.run(scenario())
+
+
+def test_cancel_after_grant_returns_the_slot():
+    async def scenario():
+        admission = AdmissionController(capacity=1, queue_depth=8, reserved=0)
+        await admission.acquire("interactive")
+        waiter = asyncio.create_task(admission.acquire("interactive"))
+        await settle()
+
+        # Se le otorga el lugar y se cancela antes de que la tarea vuelva a correr
+        admission._release("interactive", 1, 0.0)
+        assert admission.in_service("interactive") == 1
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        assert admission.in_service("interactive") == 0
+        assert admission.queue_depth("interactive") == 0
+
+    asyncio.run(scenario())
+
+
+def test_full_queue_raises_admission_rejected():
+    async def scenario():
+        admission = AdmissionController(capacity=1, queue_depth=2, reserved=0)
+        await admission.acquire("interactive")
+        queued = [asyncio.create_task(admission.acquire("interactive")) for _ in range(2)]
+        await settle()
+
+        with pytest.raises(AdmissionRejected) as rejected:
+            await admission.acquire("interactive")
+        assert rejected.value.lane == "interactive"
+        assert rejected.value.retry_after >= 1
+        assert admission.stats["interactive"].rejected == 1
+        # bounded=False (petición ya admitida) espera aunque la cola esté llena
+        unbounded = asyncio.create_task(admission.acquire("interactive", bounded=False))
+        await settle()
+        assert admission.queue_depth("interactive") == 3
+        for task in queued + [unbounded]:
+            task.cancel()
+        await asyncio.gather(*queued, unbounded, return_exceptions=True)
+
+    asyncio.run(scenario())
+
+
+def test_check_counts_the_whole_request():
+    admission = AdmissionController(capacity=4, queue_depth=8, bulk_queue_depth=10, reserved=1)
+    assert admission.max_request("bulk") == 10
+    admission.check("bulk", 3)  # cabe en servicio ahora mismo
+    admission._in_service["bulk"] = 3
+    admission.check("bulk", 10)  # cabe entero en la cola vacía
+    with pytest.raises(AdmissionRejected):
+        admission.check("bulk", 11)
+    assert admission.stats["bulk"].rejected == 11
+
+
+def test_retry_after_counts_work_ahead():
+    admission = AdmissionController(capacity=2, queue_depth=8, bulk_queue_depth=8, reserved=0)
+    assert admission.retry_after("interactive") == 1  # sin historial: al menos un segundo
+    admission._service_time = 4.0
+    admission._in_service["interactive"] = 2
+    loop = asyncio.new_event_loop()
+    try:
+        admission._waiting["interactive"].append((2, loop.create_future()))
+        admission._waiting["bulk"].append((4, loop.create_future()))
+        # interactive: 2 en curso + 2 en cola, repartidos en 2 lugares de 4 s
+        assert admission.retry_after("interactive") == 8
+        # bulk además espera a su propia cola
+        assert admission.retry_after("bulk") == 16
+        admission._service_time = 100.0
+        assert admission.retry_after("bulk") == 60
+    finally:
+        loop.close()
@@ -0,0 +1,103 @@
+"""
+Pruebas de la caché de predicciones (cache.py): single-flight de
+``get_or_compute``, cancelaciones, errores y nivel en disco. Sin modelo.
+"""
+
+import asyncio
+
+import pytest
+
+from cache import PredictionCache, content_key
+
+
+def counting(result, delay: float = 0.01):
+    """Cálculo falso que cuenta cuántas veces se ejecutó"""
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(delay)
+        return result
+
+    return compute, calls
+
+
+def test_concurrent_identical_keys_compute_once():
+    async def scenario():
+        cache = PredictionCache()
+        compute, calls = counting({"clase": "jeans"})
+        results = await asyncio.gather(*(cache.get_or_compute("k", compute) for _ in range(8)))
+        assert len(calls) == 1
+        assert results == [{"clase": "jeans"}] * 8
+        assert cache.counters["misses"] == 1 and cache.counters["coalesced"] == 7
+        assert cache.stats()["inflight"] == 0
+        # Después ya es un acierto, sin volver a calcular
+        assert await cache.get_or_compute("k", compute) == {"clase": "jeans"}
+        assert len(calls) == 1 and cache.counters["hits"] == 1
+
+    asyncio.run(scenario())
+
+
+def test_different_keys_compute_separately():
+    async def scenario():
+        cache = PredictionCache()
+        compute, calls = counting({"clase": "boots"})
+        await asyncio.gather(cache.get_or_compute("a", compute), cache.get_or_compute("b", compute))
+        assert len(calls) == 2
+
+    asyncio.run(scenario())
+
+
+def test_cancelled_caller_does_not_cancel_shared_computation():
+    async def scenario():
+        cache = PredictionCache()
+        compute, calls = counting({"clase": "coat"}, delay=0.05)
+        first = asyncio.create_task(cache.get_or_compute("k", compute))
+        second = asyncio.create_task(cache.get_or_compute("k", compute))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        assert await second == {"clase": "coat"}
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        assert len(calls) == 1 and len(cache) == 1
+
+    asyncio.run(scenario())
+
+
+def test_error_reaches_every_caller_and_is_not_cached():
+    async def scenario():
+        cache = PredictionCache()
+        calls = []
+
+        async def failing():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            raise RuntimeError("forward falló")
+
+        results = await asyncio.gather(*(cache.get_or_compute("k", failing) for _ in range(3)),
+                                       return_exceptions=True)
+        assert all(isinstance(result, RuntimeError) for result in results)
+        assert len(calls) == 1 and cache.counters["errors"] == 1
+        # El error no queda en caché: el siguiente intento vuelve a calcular
+        compute, retried = counting({"clase": "hat"})
+        assert await cache.get_or_compute("k", compute) == {"clase": "hat"}
+        assert len(retried) == 1
+
+    asyncio.run(scenario())
+
+
+def test_disk_tier_survives_a_new_instance(tmp_path):
+    async def scenario():
+        compute, calls = counting({"clase": "scarf"})
+        await PredictionCache(disk_dir=str(tmp_path)).get_or_compute("k" * 40, compute)
+        restarted = PredictionCache(disk_dir=str(tmp_path))
+        assert await restarted.get_or_compute("k" * 40, compute) == {"clase": "scarf"}
+        assert len(calls) == 1 and restarted.counters["disk_hits"] == 1
+
+    asyncio.run(scenario())
+
+
+def test_content_key_depends_on_bytes_and_model_version():
+    assert content_key(b"foto", "v1") == content_key(b"foto", "v1")
+    assert content_key(b"foto", "v1") != content_key(b"foto", "v2")
+    assert content_key(b"foto", "v1") != content_key(b"otra", "v1")
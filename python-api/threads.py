@@ -0,0 +1,107 @@
+"""
+Reparto de los núcleos entre las inferencias simultáneas.
+
+Sin límites, cada forward de PyTorch, cada resize de OpenCV y cada llamada a
+BLAS/OpenMP (sklearn, NumPy) intentan usar todos los núcleos a la vez: con
+varias peticiones en paralelo la CPU queda sobresuscrita y los hilos se
+estorban entre sí. El presupuesto divide los núcleos en ``slots`` (inferencias
+que corren al mismo tiempo: workers de proceso, workers de prefork.py) de
+``threads`` hilos cada uno, y configura todas las bibliotecas con ese número.
+
+La mejor combinación depende del host; se mide con
+``python -m benchmarks.tune_threads``.
+"""
+
+import logging
+import math
+import os
+from typing import NamedTuple, Optional
+
+logger = logging.getLogger(__name__)
+
+# Variables que leen las bibliotecas BLAS/OpenMP al cargarse (y los procesos hijos)
+THREAD_ENV_VARS = ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS",
+                   "VECLIB_MAXIMUM_THREADS", "NUMEXPR_NUM_THREADS")
+
+
+class ThreadBudget(NamedTuple):
+    cores: int    # núcleos disponibles para el proceso (o el pod)
+    slots: int    # inferencias simultáneas
+    threads: int  # hilos por inferencia
+
+    def describe(self) -> str:
+        return f"{self.cores} núcleos = {self.slots} slots x {self.threads} hilos"
+
+
+def _cgroup_cpu_limit() -> Optional[float]:
+    """Cuota de CPU del contenedor (cgroup v2 o v1), o None si no hay límite"""
+    try:
+        with open("/sys/fs/cgroup/cpu.max", "r") as f:
+            quota, period = f.read().split()[:2]
+            if quota != "max":
+                return int(quota) / int(period)
+            return None
+    except (OSError, ValueError):
+        pass
+    try:
+        with open("/sys/fs/cgroup/cpu/cpu.cfs_quota_us", "r") as f:
+            quota = int(f.read())
+        with open("/sys/fs/cgroup/cpu/cpu.cfs_period_us", "r") as f:
+            period = int(f.read())
+        if quota > 0 and period > 0:
+            return quota / period
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+def available_cores() -> int:
+    """Núcleos utilizables: afinidad del proceso, acotada por la cuota del cgroup"""
+    try:
+        cores = len(os.sched_getaffinity(0))
+    except AttributeError:  # macOS / Windows
+        cores = os.cpu_count() or 1
+    limit = _cgroup_cpu_limit()
+    if limit is not None:
+        cores = min(cores, max(1, math.floor(limit)))
+    return max(1, cores)
+
+
+def plan_budget(cores: int = 0, slots: int = 1, threads: int = 0) -> ThreadBudget:
+    """Presupuesto para ``slots`` inferencias simultáneas (0 = detectar / repartir)"""
+    cores = cores or available_cores()
+    slots = max(1, slots)
+    threads = threads or max(1, cores // slots)
+    if slots * threads > cores:
+        logger.warning(f"⚠️ {slots} slots x {threads} hilos superan los {cores} núcleos disponibles")
+    return ThreadBudget(cores, slots, threads)
+
+
+def apply_budget(budget: ThreadBudget):
+    """Limitar PyTorch, OpenCV y BLAS/OpenMP a ``budget.threads`` hilos en este proceso"""
+    import cv2
+    import torch
+
+    threads = str(budget.threads)
+    for name in THREAD_ENV_VARS:
+        # Para las bibliotecas que aún no se cargaron y para los workers de proceso
+        os.environ[name] = threads
+
+    torch.set_num_threads(budget.threads)
+    try:
+        # El paralelismo entre operadores no se usa en inferencia; solo se puede
+        # fijar antes del primer forward
+        torch.set_num_interop_threads(1)
+    except RuntimeError:
+        pass
+    cv2.setNumThreads(budget.threads)
+
+    try:
+        from threadpoolctl import threadpool_limits
+    except ImportError:
+        pass
+    else:
+        # BLAS/OpenMP ya cargados (NumPy, sklearn)
+        threadpool_limits(limits=budget.threads)
+
+    logger.info(f"🧮 Presupuesto de hilos: {budget.describe()}")
@@ -0,0 +1,121 @@
+"""
+Límites de tamaño para las subidas, aplicados mientras llega el cuerpo.
+
+- ``BodyLimitMiddleware`` rechaza con 413 por ``Content-Length`` antes de leer
+  nada y, si el cliente no lo envía (o miente), corta en cuanto los bytes
+  recibidos superan el límite de la ruta: el multipart nunca llega a
+  guardarse completo.
+- ``read_upload`` lee un ``UploadFile`` por bloques con el mismo límite.
+- ``read_zip_member`` extrae un archivo de un zip sin confiar en el tamaño que
+  declara el propio zip (las bombas de descompresión mienten ahí).
+
+Los límites de píxeles (dimensiones leídas del encabezado antes de
+decodificar) están en ``preprocessing.py``.
+"""
+
+import json
+import zipfile
+from typing import Dict
+
+CHUNK_SIZE = 1024 * 1024
+# Margen para los encabezados del multipart alrededor del archivo
+MULTIPART_OVERHEAD = 64 * 1024
+
+
+class UploadTooLarge(Exception):
+    def __init__(self, limit: int):
+        super().__init__(f"La subida supera el máximo de {limit / 1024 / 1024:.0f} MB")
+        self.limit = limit
+
+
+class BodyLimitMiddleware:
+    """Middleware ASGI: máximo de bytes del cuerpo por ruta"""
+
+    def __init__(self, app, limits: Dict[str, int], on_reject=None):
+        self.app = app
+        self.limits = limits
+        self.on_reject = on_reject  # callback(path) para contar rechazos
+
+    async def _reject(self, send, limit: int):
+        body = json.dumps({"detail": str(UploadTooLarge(limit))}, ensure_ascii=False).encode("utf-8")
+        await send({
+            "type": "http.response.start",
+            "status": 413,
+            "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode()),
+                        (b"connection", b"close")],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+    async def __call__(self, scope, receive, send):
+        limit = self.limits.get(scope.get("path")) if scope["type"] == "http" else None
+        if limit is None:
+            await self.app(scope, receive, send)
+            return
+
+        for name, value in scope.get("headers", ()):
+            if name == b"content-length" and value.isdigit() and int(value) > limit:
+                if self.on_reject:
+                    self.on_reject(scope["path"])
+                await self._reject(send, limit)
+                return
+
+        received = 0
+        exceeded = False
+        responded = False
+
+        async def limited_receive():
+            nonlocal received, exceeded
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    exceeded = True
+                    raise UploadTooLarge(limit)
+            return message
+
+        async def guarded_send(message):
+            nonlocal responded
+            if exceeded:
+                # FastAPI convierte el error de lectura del formulario en un 400:
+                # se reemplaza por el 413 correspondiente
+                if message["type"] == "http.response.start" and not responded:
+                    responded = True
+                    if self.on_reject:
+                        self.on_reject(scope["path"])
+                    await self._reject(send, limit)
+                return
+            if message["type"] == "http.response.start":
+                responded = True
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, guarded_send)
+        except UploadTooLarge:
+            if not responded:
+                if self.on_reject:
+                    self.on_reject(scope["path"])
+                await self._reject(send, limit)
+
+
+async def read_upload(file, limit: int) -> bytes:
+    """Leer un UploadFile por bloques, sin pasar de ``limit`` bytes"""
+    chunks, size = [], 0
+    while True:
+        chunk = await file.read(CHUNK_SIZE)
+        if not chunk:
+            return b"".join(chunks)
+        size += len(chunk)
+        if size > limit:
+            raise UploadTooLarge(limit)
+        chunks.append(chunk)
+
+
+def read_zip_member(archive: zipfile.ZipFile, info: zipfile.ZipInfo, limit: int) -> bytes:
+    """Descomprimir un miembro del zip leyendo como máximo ``limit`` bytes"""
+    if info.file_size > limit:
+        raise UploadTooLarge(limit)
+    with archive.open(info) as member:
+        data = member.read(limit + 1)
+    if len(data) > limit:
+        raise UploadTooLarge(limit)
+    return data
@@ -0,0 +1,85 @@
+"""
+Arranque rápido y sin conexión del modelo.
+
+- La arquitectura del ViT y el preprocesamiento se leen de la configuración
+  incluida en ``model_config/`` en vez de ``from_pretrained``, que descargaba
+  pesos de ImageNet solo para sobrescribirlos con el checkpoint.
+- Los pesos entrenados pueden venir de un artefacto ``.safetensors`` que se
+  mapea en memoria: no se copia el archivo a RAM ni se deserializa con pickle,
+  y las páginas se comparten entre procesos que lean el mismo archivo.
+
+El artefacto se genera con ``python export_model.py --format safetensors``.
+"""
+
+import json
+import logging
+import os
+from typing import Any, Dict
+
+import torch
+from transformers import ViTConfig, ViTImageProcessor
+
+logger = logging.getLogger(__name__)
+
+CONFIG_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "model_config", "vit-base-patch16-224")
+CLIMATES_KEY = "meta.climates"  # la matriz clase x clima viaja junto a los pesos
+
+
+def vit_config() -> ViTConfig:
+    """Configuración de google/vit-base-patch16-224 incluida en el repo"""
+    return ViTConfig.from_json_file(os.path.join(CONFIG_DIR, "config.json"))
+
+
+def load_processor() -> ViTImageProcessor:
+    """Procesador de imágenes de ViT desde la configuración local (sin Hugging Face Hub)"""
+    return ViTImageProcessor.from_pretrained(CONFIG_DIR, local_files_only=True)
+
+
+def export_safetensors(checkpoint: Dict[str, Any], path: str, version: str = ""):
+    """Guardar pesos, clases y climas del checkpoint .pth como .safetensors"""
+    from safetensors.torch import save_file
+
+    tensors = {name: tensor.contiguous() for name, tensor in checkpoint['model_state_dict'].items()}
+    tensors[CLIMATES_KEY] = torch.as_tensor(checkpoint['climates']).contiguous()
+    metadata = {
+        "classes": json.dumps(checkpoint['classes'], ensure_ascii=False),
+        "class2idx": json.dumps(checkpoint['class2idx'], ensure_ascii=False),
+        "climate2idx": json.dumps(checkpoint['climate2idx'], ensure_ascii=False),
+        "version": version,
+    }
+    tmp_path = f"{path}.tmp"
+    save_file(tensors, tmp_path, metadata=metadata)
+    os.replace(tmp_path, path)
+
+
+def safetensors_version(path: str) -> str:
+    """Versión del checkpoint registrada en el artefacto (solo lee el encabezado)"""
+    from safetensors import safe_open
+
+    with safe_open(path, framework="pt", device="cpu") as f:
+        return (f.metadata() or {}).get("version", "")
+
+
+def load_safetensors(path: str) -> Dict[str, Any]:
+    """Cargar un artefacto .safetensors con el mismo formato que el checkpoint .pth.
+
+    Los tensores quedan respaldados por el archivo mapeado en memoria; el
+    modelo los adopta sin copiarlos con ``load_state_dict(assign=True)``.
+    """
+    from safetensors import safe_open
+
+    state_dict = {}
+    with safe_open(path, framework="pt", device="cpu") as f:
+        metadata = f.metadata()
+        for name in f.keys():
+            state_dict[name] = f.get_tensor(name)
+
+    climates = state_dict.pop(CLIMATES_KEY)
+    return {
+        "classes": json.loads(metadata["classes"]),
+        "class2idx": json.loads(metadata["class2idx"]),
+        "climate2idx": json.loads(metadata["climate2idx"]),
+        "climates": climates,
+        "model_state_dict": state_dict,
+        "version": metadata.get("version", ""),
+    }
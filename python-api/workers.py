@@ -0,0 +1,69 @@
+"""
+Pool de workers para sacar la inferencia bloqueante del event loop.
+
+- ``thread``: pool de hilos que comparte el modelo cargado en el proceso.
+- ``process``: pool de procesos; cada worker carga el modelo una sola vez
+  en su inicializador y resuelve peticiones completas. El proceso principal
+  no carga el modelo (solo clases, climas y preprocesador).
+- ``inline``: comportamiento original, todo corre en el event loop
+  (solo útil para comparar en benchmarks).
+"""
+
+import asyncio
+import logging
+import multiprocessing
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+EXECUTOR_KINDS = ("thread", "process", "inline")
+
+
+def default_workers() -> int:
+    """Número de workers por defecto según los núcleos disponibles"""
+    return max(1, min(4, os.cpu_count() or 1))
+
+
+class InferenceExecutor:
+    """Ejecuta funciones bloqueantes en hilos o procesos y las expone como awaitables"""
+
+    def __init__(self, kind: str = "thread", workers: Optional[int] = None,
+                 initializer: Optional[Callable] = None):
+        if kind not in EXECUTOR_KINDS:
+            raise ValueError(f"Executor desconocido: {kind} (opciones: {', '.join(EXECUTOR_KINDS)})")
+
+        self.kind = kind
+        self.workers = workers or default_workers()
+        self._pool: Optional[Executor] = None
+
+        if kind == "thread":
+            self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="inference")
+        elif kind == "process":
+            # spawn evita heredar los hilos de torch/OpenMP del proceso padre
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=initializer
+            )
+
+        logger.info(f"🧵 Executor de inferencia: {kind} ({self.workers if self._pool else 0} workers)")
+
+    async def run(self, fn: Callable, *args):
+        """Ejecutar ``fn(*args)`` sin bloquear el event loop"""
+        if self._pool is None:
+            return fn(*args)
+        return await asyncio.get_running_loop().run_in_executor(self._pool, fn, *args)
+
+    def warmup(self, fn: Callable) -> List:
+        """Forzar el arranque de todos los workers (carga del modelo en modo process) y devolver ``fn()`` de cada uno"""
+        if isinstance(self._pool, ProcessPoolExecutor):
+            futures = [self._pool.submit(fn) for _ in range(self.workers)]
+            return [future.result() for future in futures]
+        return []
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+            self._pool = None